@@ -0,0 +1,29 @@
+"""
+Throughput benchmark for sampling exercises from exercise_catalogue.CATALOGUE.
+
+Run from the repository root with: python -m benchmarks.exercise_catalogue
+"""
+from timeit import repeat
+
+from code_exercise import Exercise
+from exercise_catalogue import ExerciseCatalogue
+
+
+def run(number: int = 20000) -> dict:
+    catalogue = ExerciseCatalogue(seed=0)
+    exercise = Exercise()
+    cases = {
+        'generate_exercise(over=True)': lambda: exercise.generate_exercise(over=True, catalogue=catalogue),
+        'generate_exercise(over=False)': lambda: exercise.generate_exercise(over=False, catalogue=catalogue),
+        'sample(over=True, tens=3)': lambda: catalogue.sample(over=True, tens=3),
+    }
+    results = {}
+    for name, case in cases.items():
+        best = min(repeat(case, number=number, repeat=5))
+        results[name] = number / best
+    return results
+
+
+if __name__ == '__main__':
+    for name, per_second in run().items():
+        print('%-32s %12.0f exercises/s' % (name, per_second))
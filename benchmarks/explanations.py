@@ -0,0 +1,51 @@
+"""
+Cold and warm cost of explain_exercise: making every explanation of the catalogue, looking them up once they are made,
+and loading them from a file made by precompute.
+
+Run from the repository root with: python -m benchmarks.explanations
+"""
+import os
+import tempfile
+import time
+
+import explain_exercise
+from exercise_catalogue import CATALOGUE, LEVELS
+
+
+def run() -> dict:
+    keys = [(level, first, second) for level in LEVELS
+            for first, second in zip(CATALOGUE.first_number.tolist(), CATALOGUE.second_number.tolist())]
+    results = {}
+
+    explain_exercise._explanations.clear()
+    explain_exercise._parts.clear()
+    start = time.perf_counter()
+    for key in keys:
+        explain_exercise.explain_exercise(*key)
+    results['cold'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        explain_exercise.explain_exercise(*key)
+    results['warm'] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'explanations.json')
+        explain_exercise.precompute(path=path)
+        explain_exercise._explanations.clear()
+        explain_exercise._parts.clear()
+        start = time.perf_counter()
+        explain_exercise.precompute(path=path)
+        results['load'] = time.perf_counter() - start
+        results['file_bytes'] = os.path.getsize(path)
+    results['explanations'] = len(keys)
+    return results
+
+
+if __name__ == '__main__':
+    results = run()
+    count = results['explanations']
+    for name in ('cold', 'warm'):
+        print('%-5s %8.3f s  %8.2f us per explanation' % (name, results[name], results[name] / count * 1e6))
+    print('load  %8.3f s  (%d explanations, %d bytes)' % (results['load'], count, results['file_bytes']))
+    print('Speedup warm over cold: %.0fx' % (results['cold'] / results['warm']))
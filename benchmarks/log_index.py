@@ -0,0 +1,72 @@
+"""
+Indexing session logs: a full index of many logs of simulated sessions, an incremental update after a session was
+appended to every log, and a check that both give the same tables.
+
+Run from the repository root with: python -m benchmarks.log_index
+"""
+import contextlib
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from exercise_catalogue import CATALOGUE
+from lesson_simulator import ScriptedStudent, SimulatedLesson, SimulatedRobot
+from log_index import LogIndex
+
+
+def simulate_log(directory: str, student: str, sessions: int, seed: int = 0) -> str:
+    """:return: path of the log of the student, after the given number of simulated sessions of 20 minutes"""
+    for i in range(sessions):
+        random.seed(seed + i)
+        CATALOGUE.seed(seed + i)
+        robot = SimulatedRobot(ScriptedStudent(seed=seed + i))
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            SimulatedLesson(robot, i % 4 + 1, 'after_correct', student, directory, 20 * 60).run()
+    return os.path.join(directory, student + '.log')
+
+
+def run(logs: int = 100, sessions: int = 4) -> dict:
+    """
+    :param logs: number of logs (students)
+    :param sessions: number of sessions per log, one more session is appended to every log for the incremental update
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [simulate_log(directory, 'student_%d' % i, sessions, seed=i * 100) for i in range(logs)]
+        results['megabytes'] = round(sum(os.path.getsize(path) for path in paths) / 1e6, 2)
+
+        start = time.perf_counter()
+        for path in paths:
+            index = LogIndex(path)
+            index.update()
+            index.save()
+        results['full'] = time.perf_counter() - start
+
+        for i in range(logs):
+            simulate_log(directory, 'student_%d' % i, 1, seed=i * 100 + sessions)
+        start = time.perf_counter()
+        indexes = [LogIndex.load(path) for path in paths]
+        results['incremental'] = time.perf_counter() - start
+
+        results['differences'] = results['sessions'] = results['exercises'] = 0
+        for index, path in zip(indexes, paths):
+            full = LogIndex(path)
+            full.update()
+            results['differences'] += sum(
+                not np.array_equal(getattr(index, table)[name], getattr(full, table)[name],
+                                   equal_nan=name == 'mean_latency')
+                for table in ('sessions', 'exercises') for name in getattr(full, table))
+            results['sessions'] += len(full.sessions['offset'])
+            results['exercises'] += len(full.exercises['offset'])
+    return results
+
+
+if __name__ == '__main__':
+    results = run()
+    print('%d sessions, %d exercises, %s MB' % (results['sessions'], results['exercises'], results['megabytes']))
+    print('full index          %.3f s' % results['full'])
+    print('incremental update  %.3f s' % results['incremental'])
+    print('columns that differ between incremental and full: %d' % results['differences'])
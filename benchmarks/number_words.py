@@ -0,0 +1,32 @@
+"""
+Throughput benchmark for number_words.parse_number, which first checks that every sample gives the expected number.
+
+Run from the repository root with: python -m benchmarks.number_words
+"""
+from timeit import repeat
+
+from number_words import parse_number
+
+# sample -> the number it should give; separate number words are not joined ('negen tien' is 10, not 19)
+SAMPLES = {'47': 47, 'zevenenveertig': 47, 'zeven en veertig': 47, 'tweeëntwintig': 22, 'het is drieënveertig': 43,
+           'forty-seven': 47, '83 min 10 is 73': 73, 'ik weet het niet': None, 'een negentien': 19, 'honderd': 100,
+           'negen tien': 10, 'zes tien': 10, 'twee drie': 3, 'drie komma twee': None}
+
+
+def check() -> dict:
+    """:return: the samples that do not give the expected number, with the number they give"""
+    return {sample: parse_number(sample) for sample, expected in SAMPLES.items() if parse_number(sample) != expected}
+
+
+def run(number: int = 20000) -> dict:
+    results = {}
+    for sample in SAMPLES:
+        best = min(repeat(lambda: parse_number(sample), number=number, repeat=5))
+        results[sample] = number / best
+    return results
+
+
+if __name__ == '__main__':
+    print('Samples with an unexpected number: %s' % (check() or 0))
+    for sample, per_second in run().items():
+        print('%-25s %12.0f parses/s' % (repr(sample), per_second))
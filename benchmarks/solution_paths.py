@@ -0,0 +1,46 @@
+"""
+Consistency check for solution_paths: the usual path of every exercise in the catalogue must be the steps of the
+catalogue, and every path must be accepted step by step by Exercise.
+
+Run from the repository root with: python -m benchmarks.solution_paths
+"""
+import time
+
+from code_exercise import Exercise
+from exercise_catalogue import CATALOGUE, LEVELS
+from solution_paths import solution_graph
+
+
+def check() -> dict:
+    """
+    :return: number of graphs, paths and differences, and the seconds it took to build all graphs
+    """
+    start = time.perf_counter()
+    graphs = [(level, solution_graph(first, second, level)) for level in LEVELS
+              for first, second in zip(CATALOGUE.first_number.tolist(), CATALOGUE.second_number.tolist())]
+    seconds = time.perf_counter() - start
+
+    paths = differences = 0
+    for level, graph in graphs:
+        index = CATALOGUE.indices()[(CATALOGUE.first_number == graph.first_number) &
+                                    (CATALOGUE.second_number == graph.second_number)][0]
+        if [step for step, _ in graph.usual_path()] != [step for step in CATALOGUE.steps[level][index] if step]:
+            differences += 1
+        for path in graph.paths():
+            paths += 1
+            exercise = Exercise()
+            exercise.first_number, exercise.second_number = graph.first_number, graph.second_number
+            exercise.current_first, exercise.current_second = graph.first_number, graph.second_number
+            exercise.step_accepted = False
+            for step, action_level in path:
+                if exercise.take_step(step, level) != (True, action_level):
+                    differences += 1
+                exercise.acceptable_answer(exercise.current_first)
+            if exercise.current_second != 0:
+                differences += 1
+    return {'graphs': len(graphs), 'paths': paths, 'differences': differences, 'build_seconds': round(seconds, 3)}
+
+
+if __name__ == '__main__':
+    for name, value in check().items():
+        print('%-14s %s' % (name, value))
@@ -0,0 +1,74 @@
+"""
+Time to the first word of an explanation, said as one text or streamed sentence by sentence with SpeechStream.
+
+The robot is a stand-in that synthesizes a text before it says it (SYNTHESIS seconds per word) and then speaks
+(SPEAKING seconds per word). It synthesizes the next text while it says the current one, like a robot that gets the
+next sentence in time. Times are scaled down, so the benchmark takes a few seconds.
+
+Run from the repository root with: python -m benchmarks.speech_stream
+"""
+import time
+from queue import Queue
+from threading import Thread
+
+from explain_exercise import explanation_parts
+from social_interaction_cloud.action import ActionRunner
+from social_interaction_cloud.clock import SystemClock
+from speech_stream import SpeechStream
+
+SYNTHESIS = 0.002
+SPEAKING = 0.004
+
+
+class SynthesizingRobot:
+    """Says texts in order: one thread synthesizes them, another one speaks them."""
+
+    def __init__(self):
+        self.clock = SystemClock()
+        self.listeners = {'TextStarted': Queue(), 'TextDone': Queue()}
+        self.texts = Queue()
+        self.synthesized = Queue()
+        Thread(target=self.__synthesize, daemon=True).start()
+        Thread(target=self.__speak, daemon=True).start()
+
+    def say(self, text: str, callback: callable = None) -> None:
+        self.texts.put((text, callback))
+
+    def subscribe_event_listener(self, event: str, callback: callable) -> None:
+        self.listeners[event].put(callback)
+
+    def subscribe_touch_listener(self, touch_event: str, callback: callable) -> None:
+        pass
+
+    def unsubscribe_touch_listener(self, touch_event: str) -> None:
+        pass
+
+    def __synthesize(self) -> None:
+        while True:
+            text, callback = self.texts.get()
+            time.sleep(len(text.split()) * SYNTHESIS)
+            self.synthesized.put((text, callback))
+
+    def __speak(self) -> None:
+        while True:
+            text, callback = self.synthesized.get()
+            if not self.listeners['TextStarted'].empty():
+                self.listeners['TextStarted'].get()()
+            time.sleep(len(text.split()) * SPEAKING)
+            if callback:
+                callback()
+
+
+def run(level: int = 1, first_number: int = 73, second_number: int = 28) -> dict:
+    parts = explanation_parts(level, first_number, second_number)
+    results = {}
+    for name, items in (('whole text', [' '.join(parts)]), ('streamed', parts)):
+        stream = SpeechStream(ActionRunner(SynthesizingRobot()))
+        results[name] = stream.say(items)
+    return results
+
+
+if __name__ == '__main__':
+    for name, result in run().items():
+        print('%-10s first word after %.3f s, done after %.3f s (%d utterances)' % (
+            name, result['first_word'], result['seconds'], result['done']))
@@ -0,0 +1,59 @@
+"""
+Consistency check and microbenchmark for code_exercise.STEP_TABLE, the precomputed rules of Exercise.acceptable_step.
+
+Run from the repository root with: python -m benchmarks.step_table
+"""
+from timeit import repeat
+
+from code_exercise import NUMBERS, Exercise, lookup_step, step_outcome
+from exercise_catalogue import LEVELS
+
+
+def check() -> int:
+    """
+    Compare the table with the rules (step_outcome) for every level, units of the first number, current second number,
+    step (also some outside of the table) and whether a step was taken already.
+
+    :return: number of differences
+    """
+    differences = 0
+    for level in LEVELS:
+        for first_units in range(10):
+            current_first = 50 + first_units
+            for current_second in range(NUMBERS):
+                for second_number in (current_second, current_second + 10):
+                    for step in range(-5, NUMBERS + 5):
+                        expected = step_outcome(current_first, current_second, second_number, step, level)
+                        if lookup_step(current_first, current_second, second_number, step, level) != expected:
+                            differences += 1
+    return differences
+
+
+def run(number: int = 200000) -> dict:
+    """:return: steps per second of the rules, the table and Exercise.acceptable_step (which uses the table)"""
+    # (current_first, current_second, second_number, step_taken, level): a step of ten, splitting the units, a wrong
+    # step and all units at once
+    cases = [(73, 45, 45, 10, 2), (33, 5, 45, 3, 3), (73, 45, 45, 7, 1), (70, 4, 34, 4, 4)]
+    exercises = []
+    for current_first, current_second, second_number, step, level in cases:
+        exercise = Exercise()
+        exercise.current_first, exercise.current_second, exercise.second_number = current_first, current_second, \
+            second_number
+        exercises.append((exercise.acceptable_step, step, level))
+
+    results = {}
+    for name, function in (('step_outcome', step_outcome), ('lookup_step', lookup_step)):
+        best = min(repeat(lambda: [function(*case) for case in cases], number=number // len(cases), repeat=5))
+        results[name] = number / best
+    best = min(repeat(lambda: [acceptable_step(step, level) for acceptable_step, step, level in exercises],
+                      number=number // len(cases), repeat=5))
+    results['acceptable_step'] = number / best
+    return results
+
+
+if __name__ == '__main__':
+    print('Differences between the table and the rules: %s' % check())
+    results = run()
+    for name, per_second in results.items():
+        print('%-16s %12.0f steps/s' % (name, per_second))
+    print('Speedup of the table: %.1fx' % (results['lookup_step'] / results['step_outcome']))
@@ -0,0 +1,316 @@
+"""
+Microbenchmarks of the hot paths of the SIC client stack: dispatching received messages (__listen, per channel),
+publishing (__send), the one-shot listeners of BasicSICConnector, ActionRunner.run_waiting_action, parsing a
+DetectionResult, and Exercise and explain_exercise.
+
+By default the connector runs on FakeTransport, which needs no server: published messages are only counted, and a
+say is answered at once with TextDone, like a robot that is done immediately. With --redis the connector uses a local
+Redis server (without TLS) instead, and a small echo robot on its own connection answers the says, so __send and
+run_waiting_action include the round trip through Redis. __listen is always called directly, so its numbers are the
+cost of the dispatch itself.
+
+A run gives the best time per call, in microseconds, of a few repeats of every benchmark. The suite is run several
+times and the result of a benchmark is the median of the runs. The results can be written to JSON and compared with a
+stored baseline (benchmarks/suite_baseline.json by default). A benchmark is only reported as a regression when every
+run was more than the tolerance slower than the baseline. On a busy computer all benchmarks of a run can be up to
+twice as slow, so one slow run is not a regression.
+
+Run from the repository root with: python -m benchmarks.suite [--redis localhost] [--runs 5] [--output results.json]
+[--baseline benchmarks/suite_baseline.json] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+from google.protobuf.struct_pb2 import Value
+
+import explain_exercise
+from code_exercise import Exercise
+from exercise_catalogue import CATALOGUE, LEVELS
+from social_interaction_cloud.abstract_connector import SICTransport
+from social_interaction_cloud.action import ActionRunner
+from social_interaction_cloud.basic_connector import BasicSICConnector
+from social_interaction_cloud.detected_intent import DetectedIntent
+from social_interaction_cloud.detection_result_pb2 import DetectionResult
+from solution_paths import solution_graph
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'suite_baseline.json')
+DEVICE = 'bench-nao'
+DEVICES = {'robot': [DEVICE], 'mic': [DEVICE], 'speaker': [DEVICE], 'tablet': [DEVICE]}
+
+
+def detection_result() -> bytes:
+    """:return: a serialized DetectionResult like the ones of the answer intent"""
+    message = DetectionResult(intent='answer', confidence=87, text='zevenenveertig', source='dialogflow')
+    message.parameters['number'].CopyFrom(Value(number_value=47))
+    message.parameters['name'].list_value.values.add().struct_value.update({'name': 'Sanne'})
+    return message.SerializeToString()
+
+
+# payload of a typical message on every channel that is benchmarked; audio_newfile and picture_newfile are left out,
+# because they write a file for every message
+MESSAGES = {
+    'events': b'TextDone',
+    'audio_language': b'nl-NL',
+    'audio_intent': detection_result(),
+    'detected_emotion': b'happy',
+    'robot_audio_loaded': b'3',
+    'robot_posture_changed': b'Stand',
+    'robot_battery_charge_changed': b'87',
+    'robot_charging_changed': b'0',
+    'robot_hot_device_detected': b'HeadYaw;LShoulderPitch',
+    'tablet_answer': b'47',
+}
+
+
+class FakeRedis:
+    """The part of a Redis client that the connector uses to publish."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.published = 0
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def publish(self, channel: str, data) -> None:
+        self.published += 1
+        if self.transport.on_publish:
+            self.transport.on_publish(channel, data)
+
+    def close(self) -> None:
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.messages = []
+
+    def publish(self, channel: str, data) -> None:
+        self.messages.append((channel, data))
+
+    def execute(self) -> None:
+        for channel, data in self.messages:
+            self.redis.publish(channel, data)
+        self.messages = []
+
+
+class FakeTransport:
+    """
+    A SICTransport without a server. Messages can be delivered to the subscribed handlers with deliver(), and
+    on_publish (if set) is called with every message that is published.
+    """
+
+    def __init__(self):
+        self.redis = FakeRedis(self)
+        self.handlers = {}
+        self.on_publish = None
+
+    def subscribe(self, channels: list, handler: callable) -> None:
+        self.handlers.update(dict.fromkeys(channels, handler))
+
+    def unsubscribe(self, channels: list) -> None:
+        for channel in channels:
+            self.handlers.pop(channel, None)
+
+    def deliver(self, channel: str, data: bytes) -> None:
+        self.handlers[channel]({'channel': channel.encode('utf-8'), 'data': data})
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+def fake_connection():
+    """:return: a connector on a FakeTransport that answers every say with TextDone, and a function to stop it"""
+    transport = FakeTransport()
+    sic = BasicSICConnector('127.0.0.1', transport=transport, devices=DEVICES)
+
+    def on_publish(channel, data):
+        if channel == DEVICE + '_action_say':
+            transport.deliver(DEVICE + '_events', b'TextDone')
+
+    transport.on_publish = on_publish
+    return sic, transport.stop
+
+
+def redis_connection(address: str):
+    """:return: a connector on a local Redis server, with an echo robot that answers every say with TextDone"""
+    from redis import Redis
+
+    host, _, port = address.partition(':')
+    transport = SICTransport(Redis(host=host, port=int(port or 6379)))
+    sic = BasicSICConnector(host, transport=transport, devices=DEVICES)
+    transport.start()
+
+    robot = Redis(host=host, port=int(port or 6379))
+    pubsub = robot.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{DEVICE + '_action_say': lambda message: robot.publish(DEVICE + '_events', b'TextDone')})
+    robot_thread = pubsub.run_in_thread(sleep_time=0.001)
+    time.sleep(0.1)  # give both subscriptions some time to be made
+
+    def stop():
+        robot_thread.stop()
+        transport.stop()
+        robot.close()
+
+    return sic, stop
+
+
+def measure(function: callable, repeat: int = 5) -> float:
+    """:return: the best time of a call of the function, in microseconds"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def run(redis: str = None, repeat: int = 5) -> dict:
+    """
+    :param redis: address (host or host:port) of a local Redis server to use instead of the FakeTransport
+    :param repeat: number of times every benchmark is repeated, the best one counts
+    :return: microseconds per call, by benchmark name
+    """
+    sic, stop = redis_connection(redis) if redis else fake_connection()
+    listen = sic._AbstractSICConnector__listen
+    send = sic._AbstractSICConnector__send
+    results = {}
+    try:
+        for channel, data in MESSAGES.items():
+            message = {'channel': (DEVICE + '_' + channel).encode('utf-8'), 'data': data}
+            results['listen.' + channel] = measure(lambda: listen(message), repeat)
+
+        results['send.action_say'] = measure(lambda: send('action_say', 'Hallo'), repeat)
+        results['send.action_gesture'] = measure(lambda: send('action_gesture', 'animations/Stand/Gestures/Hey_1'),
+                                                 repeat)
+
+        def register_and_notify():
+            sic.subscribe_event_listener('BenchmarkEvent', callback)
+            sic.on_event('BenchmarkEvent')
+
+        callback = lambda *args: None
+        results['listeners.register_notify'] = measure(register_and_notify, repeat)
+        results['listeners.notify_unheard'] = measure(lambda: sic.on_event('UnheardEvent'), repeat)
+
+        runner = ActionRunner(sic)
+        results['action.run_waiting_action'] = measure(lambda: runner.run_waiting_action('say', 'Hallo'), repeat)
+
+        data = MESSAGES['audio_intent']
+
+        def parse():
+            DetectionResult().ParseFromString(data)
+
+        def detected_intent():
+            intent = DetectedIntent(data)
+            return intent.intent, intent.parameters
+
+        results['detection_result.parse'] = measure(parse, repeat)
+        results['detection_result.detected_intent'] = measure(detected_intent, repeat)
+    finally:
+        stop()
+
+    exercise = Exercise()
+
+    def solve():
+        exercise.generate_exercise(over=True)
+        for step, _ in solution_graph(exercise.first_number, exercise.second_number, 3).usual_path():
+            exercise.take_step(step, 3)
+            exercise.acceptable_answer(exercise.current_first)
+
+    CATALOGUE.seed(0)
+    results['exercise.generate'] = measure(lambda: exercise.generate_exercise(over=True), repeat)
+    results['exercise.solve'] = measure(solve, repeat)
+
+    keys = [(level, first, second) for level in LEVELS
+            for first, second in zip(CATALOGUE.first_number.tolist(), CATALOGUE.second_number.tolist())]
+
+    def explain_all():
+        explain_exercise._explanations.clear()
+        explain_exercise._parts.clear()
+        # the solution graphs are all kept once they are built, so they are cleared as well
+        solution_graph.cache_clear()
+        for key in keys:
+            explain_exercise.explain_exercise(*key)
+
+    results['explain_exercise.cold'] = min(timeit.repeat(explain_all, repeat=repeat, number=1)) / len(keys) * 1e6
+    results['explain_exercise.warm'] = measure(lambda: explain_exercise.explain_exercise(3, 83, 64), repeat)
+    return results
+
+
+def run_all(redis: str = None, repeat: int = 3, runs: int = 5) -> dict:
+    """
+    :param runs: number of times the whole suite is run
+    :return: the microseconds per call of every run, by benchmark name
+    """
+    results = {}
+    for _ in range(runs):
+        for name, value in run(redis, repeat).items():
+            results.setdefault(name, []).append(value)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    :param results: the microseconds per call of every run, by benchmark name
+    :param tolerance: fraction a benchmark can be slower than the baseline
+    :return: (name, median microseconds, baseline microseconds or None, ratio of the median or None, regression) of
+    every result; a regression is a benchmark of which even the fastest run is more than the tolerance slower
+    """
+    rows = []
+    for name, values in results.items():
+        before = baseline.get(name)
+        median = statistics.median(values)
+        ratio = median / before if before else None
+        regression = before is not None and min(values) / before > 1 + tolerance
+        rows.append((name, median, before, ratio, regression))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Microbenchmarks of the SIC client stack.')
+    parser.add_argument('--redis', default=None, help='host or host:port of a local Redis server to use')
+    parser.add_argument('--repeat', type=int, default=3, help='repeats per benchmark in a run, the best one counts')
+    parser.add_argument('--runs', type=int, default=5, help='number of runs, the median counts')
+    parser.add_argument('--output', default=None, help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=BASELINE, help='JSON file with the results to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='fraction every run of a benchmark can be slower than the baseline before it is a '
+                             'regression')
+    arguments = parser.parse_args()
+
+    results = run_all(arguments.redis, arguments.repeat, arguments.runs)
+    report = {'transport': 'redis ' + arguments.redis if arguments.redis else 'fake',
+              'python': platform.python_version(), 'platform': platform.platform(), 'runs': arguments.runs,
+              'results': {name: round(statistics.median(values), 3) for name, values in results.items()},
+              'runs_results': {name: [round(value, 3) for value in values] for name, values in results.items()}}
+
+    baseline = {}
+    if os.path.isfile(arguments.baseline) and not arguments.save_baseline:
+        with open(arguments.baseline) as file:
+            stored = json.load(file)
+        if stored.get('transport') != report['transport']:
+            print('The baseline was made with transport %s, not %s' % (stored.get('transport'), report['transport']))
+        baseline = stored['results']
+
+    regressions = 0
+    print('%-36s %12s %12s %7s' % ('benchmark', 'median us', 'baseline', 'ratio'))
+    for name, value, before, ratio, regression in compare(results, baseline, arguments.tolerance):
+        regressions += regression
+        print('%-36s %12.3f %12s %7s%s' % (name, value, '%.3f' % before if before else '-',
+                                           '%.2f' % ratio if ratio else '-', '  REGRESSION' if regression else ''))
+
+    for path in [arguments.output] + ([arguments.baseline] if arguments.save_baseline else []):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+    if regressions:
+        print('%d regressions: slower than the baseline in all %d runs' % (regressions, arguments.runs))
+        sys.exit(1)
@@ -0,0 +1,42 @@
+"""
+Rendering the sentences of the state machine: str.format on the text (as before) against the compiled templates, with
+and without cache. Also checks that both give the same sentences.
+
+Run from the repository root with: python -m benchmarks.utterance_templates
+"""
+from timeit import repeat
+
+import lesson_lookahead  # registers the announcement
+import lesson_state_machine
+from utterance_templates import Template, TEMPLATES
+
+VALUES = {'first_number': 73, 'second_number': 28, 'previous_first': 63, 'previous_second': 18, 'step': 10,
+          'given': 45, 'expecting': 'step'}
+
+
+def check() -> int:
+    """:return: number of sentences that differ from str.format, for every template and some values"""
+    differences = 0
+    for template in TEMPLATES.templates.values():
+        domains = {slot: [0, 7, 45, 99, None, 'step'] for slot in template.slots}
+        for values, sentence in template.expand(**domains):
+            if sentence != template.text.format(**values):
+                differences += 1
+    return differences
+
+
+def run(number: int = 100000) -> dict:
+    text = lesson_state_machine.SENTENCES['context']
+    compiled = Template('context', text)
+    cached = Template('context', text, cache=True)
+    results = {}
+    for name, function in (('str.format', lambda: text.format(**VALUES)), ('template', lambda: compiled.render(VALUES)),
+                           ('cached template', lambda: cached.render(VALUES))):
+        results[name] = number / min(repeat(function, number=number, repeat=5))
+    return results
+
+
+if __name__ == '__main__':
+    print('Differences with str.format: %s' % check())
+    for name, per_second in run().items():
+        print('%-16s %12.0f sentences/s' % (name, per_second))
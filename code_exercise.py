@@ -1,97 +1,123 @@
-import random
 import logging
 
-class Exercise:
-
-    def generate_exercise(self, over=False):
-
-        # generating two random tens
-        tens_a = random.randint(2, 9) * 10
-        tens_b = random.randint(2, 9) * 10
+from exercise_catalogue import CATALOGUE, LEVELS
 
-        # exercises that go past the tens ("met overbrugging")
-        if over:
 
-            units_a = random.randint(1, 8)
-            units_b = random.randint(1, 8)
+def step_outcome(current_first, current_second, second_number, step_taken, level=1):
+    """
+    The rules of Exercise.acceptable_step, without an exercise (also used by solution_paths.py).
 
-            while units_a == units_b:
-                units_b = random.randint(1, 8)
+    :return: (acceptable, action_level, doing_units); doing_units is None when the exercise is already done
+    """
+    current_units = current_second % 10
+    current_tens = int((current_second - current_units) / 10)
 
-            while tens_a == tens_b:
-                tens_b = random.randint(2, 9) * 10
+    #when second number is fully subtracted
+    if current_second == 0:
+        return False, 'already done', None
 
-            self.first_number = max(tens_a, tens_b) + min(units_a, units_b)
-            self.current_first = self.first_number
+    if current_tens != 0:
+        #all tens at once
+        if current_second == second_number and step_taken == current_tens * 10:
+            action_level = 'above tens' if level < 3 else 'on level tens'
+            return True, action_level, False
+        #steps of ten at a time
+        elif step_taken == 10:
+            action_level = 'below tens' if level > 2 else 'on level tens'
+            return True, action_level, False
+        #incorrect step tens
+        else:
+            return False, 'incorrect tens', False
 
-            self.second_number = min(tens_a, tens_b) + max(units_a, units_b)
-            self.current_second = self.second_number
+    #splitting the units, to get to a ten
+    elif current_first % 10 != 0 and current_second > current_first % 10 and step_taken == current_first % 10:
+        action_level = 'below units' if level == 4 else 'on level units'
+        return True, action_level, True
 
-        # exercises that do not go past the tens ("zonder overbrugging")
+    #all current units at once
+    elif step_taken == current_second:
+        if current_first % 10 == 0:
+            return True, 'on level units', True
         else:
-            units_a = random.randint(1, 9)
-            units_b = random.randint(1, 9)
+            action_level = 'on level units' if level == 4 else 'above units'
+            return True, action_level, True
+
+    #incorrect step units
+    else:
+        return False, 'incorrect units', True
+
+
+# current_second and step_taken are looked up from 0 up to (not including) this number
+NUMBERS = 100
+
+
+def _build_step_table():
+    # per level, whether no step was taken yet (current_second == second_number), current_first % 10 and
+    # current_second: the outcome of every step. The rules only accept 10, all tens, the units of the first number and
+    # all that is left, every other step has the same outcome. Most rows are the same, so equal rows are shared.
+    shared = {}
+    table = []
+    for level in LEVELS:
+        level_rows = []
+        for at_start in (False, True):
+            start_rows = []
+            for first_units in range(10):
+                rows = []
+                for current_second in range(NUMBERS):
+                    second_number = current_second if at_start else current_second + 10
+                    row = [step_outcome(first_units, current_second, second_number, -1, level)] * NUMBERS
+                    for step in {10, current_second - current_second % 10, first_units, current_second}:
+                        if 0 <= step < NUMBERS:
+                            row[step] = step_outcome(first_units, current_second, second_number, step, level)
+                    row = tuple(row)
+                    rows.append(shared.setdefault(row, row))
+                start_rows.append(tuple(rows))
+            level_rows.append(tuple(start_rows))
+        table.append(tuple(level_rows))
+    return tuple(table)
+
+
+# STEP_TABLE[level - 1][at_start][current_first % 10][current_second][step_taken], see lookup_step
+STEP_TABLE = _build_step_table()
+
+
+def lookup_step(current_first, current_second, second_number, step_taken, level=1):
+    """
+    The outcome of step_outcome, looked up in STEP_TABLE. Numbers outside of the table use the rules themselves.
+
+    :return: (acceptable, action_level, doing_units)
+    """
+    if type(step_taken) is int and 0 <= step_taken < NUMBERS and 0 <= current_second < NUMBERS and \
+            0 < level <= len(LEVELS):
+        return STEP_TABLE[level - 1][current_second == second_number][current_first % 10][current_second][step_taken]
+    return step_outcome(current_first, current_second, second_number, step_taken, level)
 
-            if max(tens_a, tens_b) == 90:
 
-                while max(units_a, units_b) == 9 or units_a == units_b:
-                    units_a = random.randint(1, 9)
-                    units_b = random.randint(1, 9)
+class Exercise:
 
-            self.first_number = max(tens_a, tens_b) + max(units_a, units_b)
-            self.current_first = self.first_number
+    def generate_exercise(self, over=False, catalogue=CATALOGUE):
 
-            self.second_number = min(tens_a, tens_b) + min(units_a, units_b)
-            self.current_second = self.second_number
+        # exercises that go past the tens ("met overbrugging") or not ("zonder overbrugging"), drawn from all possible
+        # exercises at once, see exercise_catalogue.py
+        self.first_number, self.second_number = catalogue.sample(over=over)
+        self.current_first = self.first_number
+        self.current_second = self.second_number
 
         self.step_accepted = False
 
 
     def acceptable_step(self, step_taken, level=1):
 
-        current_units = self.current_second % 10
-        current_tens = int((self.current_second - current_units) / 10)
+        #the rules are looked up in a table that is computed once, see lookup_step
+        acceptable, action_level, doing_units = lookup_step(self.current_first, self.current_second, self.second_number, step_taken, level)
 
         #when second number is fully subtracted
-        if self.current_second == 0:
+        if doing_units is None:
             print('The exercise is already done.')
-            return False, 'already done'
-
-        if current_tens != 0:
-            self.doing_units = False
-            #all tens at once
-            if self.current_second == self.second_number and step_taken == current_tens * 10:
-                action_level = 'above tens' if level < 3 else 'on level tens'
-                return True, action_level
-            #steps of ten at a time
-            elif step_taken == 10:
-                action_level = 'below tens' if level > 2 else 'on level tens'
-                return True, action_level
-            #incorrect step tens
-            else:
-                return False, 'incorrect tens'
-
-        #splitting the units, to get to a ten
-        elif self.current_first % 10 != 0 and self.current_second > self.current_first % 10 and step_taken == self.current_first % 10:
-            self.doing_units = True
-            action_level = 'below units' if level == 4 else 'on level units'
-            return True, action_level
-
-        #all current units at once
-        elif step_taken == self.current_second:
-            if self.current_first % 10 == 0:
-                self.doing_units = True
-                action_level = 'on level units'
-                return True, action_level
-            else:
-                self.doing_units = True
-                action_level = 'on level units' if level == 4 else 'above units'
-                return True, action_level
-
-        #incorrect step units
         else:
-            self.doing_units = True
-            return False, 'incorrect units'
+            self.doing_units = doing_units
+
+        return acceptable, action_level
 
 
     def take_step(self, step_taken, level=1):
@@ -108,6 +134,22 @@ class Exercise:
             print('Unacceptable step! No numbers were updated.')
             return False, action_level
 
+    def to_dict(self):
+        return {'first_number': self.first_number, 'second_number': self.second_number,
+                'current_first': self.current_first, 'current_second': self.current_second,
+                'step_accepted': self.step_accepted, 'doing_units': getattr(self, 'doing_units', False)}
+
+    @classmethod
+    def from_dict(cls, data):
+        exercise = cls()
+        exercise.first_number = data['first_number']
+        exercise.second_number = data['second_number']
+        exercise.current_first = data['current_first']
+        exercise.current_second = data['current_second']
+        exercise.step_accepted = data['step_accepted']
+        exercise.doing_units = data['doing_units']
+        return exercise
+
     def acceptable_answer(self, answer_given):
         if answer_given == self.current_first and self.step_accepted:
             self.step_accepted = False
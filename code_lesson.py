@@ -1,897 +1,442 @@
 from social_interaction_cloud.action import ActionRunner, Action, ActionFactory
 from social_interaction_cloud.basic_connector import BasicSICConnector
-from social_interaction_cloud.detection_result_pb2 import DetectionResult
-from code_exercise import Exercise
-import time
-from time import sleep
-import logging
+from social_interaction_cloud.detected_intent import DetectedIntent
+from social_interaction_cloud.profiling import AggregateProfiler, CaptureProfiler
+import json
+import os
+import sys
 import randomized_responses
-from explain_exercise import explain_exercise
-
-#Classes used for touch listeners:
-class Feet_Chosen:
-    def __call__(self):
-        print('Feet touched')
-        lesson.feet_pressed = True
-
-class Tactil_Chosen:
-    def __call__(self):
-        print('Tactil touched')
-        lesson.head_pressed = True
-
-class Feet_For_Step:
-    def __call__(self):
-        print('Feet pressed to give step')
-        lesson.ready_for_step = True
-
-class Feet_For_Answer:
-    def __call__(self):
-        print('Feet pressed to give answer')
-        lesson.ready_for_answer = True
-
-class Head_For_Start_Lesson:
-    def __call__(self):
-        print('Head pressed to start the lesson')
-        lesson.waiting_for_start_lesson = False
+from code_exercise import Exercise
+from lesson_state_machine import ExerciseStateMachine, SENTENCES
+from lesson_metrics import SessionMetrics, SUMMARY
+from number_words import parse_number
+from lesson_logging import SessionLog
+from prompt_catalogue import PromptCatalogue
+from lesson_lookahead import Lookahead
+from lesson_checkpoint import Checkpoint
+from speech_stream import SpeechStream
+
+#Touch events used to wait for the student:
+FEET = ['RightBumperPressed', 'LeftBumperPressed', 'BackBumperPressed']
+HEAD = ['FrontTactilTouched', 'MiddleTactilTouched', 'RearTactilTouched']
 
 
 class Lesson:
 
-    def __init__(self, server_ip, robot, dialogflow_key_file, dialogflow_agent_id):
-        self.sic = BasicSICConnector(server_ip, robot, dialogflow_key_file, dialogflow_agent_id)
+    def __init__(self, server_ip, robot, dialogflow_key_file, dialogflow_agent_id, level=1, student='student_x', transport=None, devices=None, clock=None,
+                 sic=None, directory='.', duration_lesson=20, profiler=None, seed=None):
+        #transport and devices are only needed when several lessons share one connection, see lesson_server.py
+        #sic can be an already created connector, e.g. the simulated robot of lesson_simulator.py
+        if sic and (clock or profiler):
+            raise ValueError('The clock and profiler are those of the given connector (sic), pass them to the connector instead')
+        self.sic = sic if sic else BasicSICConnector(server_ip, robot, dialogflow_key_file, dialogflow_agent_id, transport=transport, devices=devices, clock=clock, profiler=profiler)
+        #all timing goes through the clock of the connector, a SimulatedClock makes a lesson run without waiting
+        self.clock = self.sic.clock
+        #the phases of the lesson are spans of the profiler of the connector, see social_interaction_cloud/profiling.py
+        self.profiler = self.sic.profiler
+
+        self.level = level
+        self.student = student
+        self.duration_lesson = duration_lesson # time in seconds
+        #seed of the feedback lines, None for different lines every session
+        self.seed = seed
+        #the log, metrics and checkpoint of the session are written to this directory
+        self.directory = directory
+        #every lesson has its own log, named after the student, written on a background thread
+        self.session_log = SessionLog(student, directory)
+        self.logger = self.session_log.logger
 
         self.user_model = {}
         self.recognition_manager = {'attempt_success': False, 'attempt_number': 0}
 
     def run(self):
-        #  self.sic.start()
-        self.action_runner = ActionRunner(self.sic)
-        print("doing stuff")
-
-        self.action_runner.run_waiting_action('set_language', 'nl-NL')
-        self.action_runner.run_waiting_action('wake_up')
-        self.sic.do_gesture('sitting_down/behavior_1') # Todo: fix that the robot's sitting down
+        self.start_session()
 
-        self.exercise = Exercise()
+        self.logger.info('------------------------------ BEGIN OF SESSION ------------------------------')
 
+        self.logger.info('- Level = %s' % (self.level))
 
-### ### Change before each session: ### ###
-
-        #change level of the student:
-        self.level = 1
-        #change filename:
-        logging.basicConfig(filename='student_x.log', format='%(asctime)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p', level=logging.DEBUG)
-
-### ### End change before each session  ### ###
-
-        duration_lesson = int(20) # 20 minutes, time in seconds
-
-        logging.info('------------------------------ BEGIN OF SESSION ------------------------------')
+        self.previous_exercise_correct = True
 
-        logging.info('- Level = %s' % (self.level))
+        #counters and per-exercise records, written to <student>.jsonl next to the log
+        self.metrics = SessionMetrics(self.student, self.level, path=self.path('.jsonl'), clock=self.clock)
 
-        self.waiting_for_start_lesson = True
-        self.previous_exercise_correct = True
+        #the state of the session is saved after every step, so it can be resumed after a crash
+        self.checkpoint = Checkpoint(self.path('.checkpoint'))
+        self.checkpoint.clear()
 
-        #variables needed for logging:
-            #basic statistics
-        self.number_of_exercises_done = 0
-        self.times_finished_sum_correct = 0
-        self.times_finished_sum_incorrect = 0
-            #at making the first mistake in an exercise, the student gets the choice to either hear the explanation, or to try the sum again
-        self.times_asked_for_explanation = 0
-        self.times_tried_sum_again = 0
-            #mistakes can be made when subtracting tens, or when subtracting units
-        self.mistake_in_tens = 0
-        self.end_in_tens = 0
-        self.mistake_in_units = 0
-        self.end_in_units = 0
-            #mistakes can be made when doing the steps (in level 2, 3, 4), or when giving the (intermediate) answers
-        self.mistake_in_step = 0
-        self.end_in_step = 0
-        self.mistake_in_answer = 0
-        self.end_in_answer = 0
-            #when the student presses the feet to give an answer, but the student either says nothing, or the robot does not recognize a number
-        self.robot_did_not_hear_number = 0
-            #students get a level assigned, and they can either answer on that level, under, or above the level
-        self.bigger_steps_than_level_tens = 0
-        self.bigger_steps_than_level_units = 0
-        self.steps_on_level_tens = 0
-        self.steps_on_level_units = 0
-        self.smaller_steps_than_level_tens = 0
-        self.smaller_steps_than_level_units = 0
-
-
-        logging.info('- Play introduction')
-        self.play_introduction(self.level)
-        logging.info('- Done with introduction')
+        self.logger.info('- Play introduction')
+        with self.profiler.phase('introduction'):
+            self.play_introduction(self.level)
+        self.logger.info('- Done with introduction')
         
-        start_time = time.time()
+        self.start_time = self.clock.time()
+        self.machine = None
+        self.save_checkpoint()
+
+        self.do_exercises()
+        self.end_session()
+
+    def resume(self):
+        #continue a session that stopped, without the introduction. Starts a new session if there is nothing to resume
+        state = Checkpoint.load(self.path('.checkpoint'))
+        if state is None:
+            print('No session to resume, starting a new one')
+            return self.run()
+
+        #all state is restored before start_session, which already prepares the next exercise for this level
+        self.level = state['level']
+        self.previous_exercise_correct = state['previous_exercise_correct']
+        self.over = state['over']
+        self.metrics = SessionMetrics.from_dict(state, self.student, self.level, path=self.path('.jsonl'), clock=self.clock)
+        self.checkpoint = Checkpoint.resume(self.path('.checkpoint'))
+
+        self.machine = None
+        if state['machine'] and self.metrics.current:
+            #continue the exercise the student was working on
+            self.exercise = Exercise.from_dict(state['exercise'])
+            self.explanation = state['explanation']
+            self.machine = ExerciseStateMachine.from_dict(state['machine'], self.exercise)
+
+        self.start_session()
+
+        self.logger.info('------------------------------ RESUME OF SESSION ------------------------------')
+        self.logger.info('- Level = %s' % (self.level))
+
+        self.start_time = self.clock.time() - state['elapsed']
+
+        if self.machine:
+            self.logger.info('--------- Resume sum: %s - %s ---------' % (self.exercise.first_number, self.exercise.second_number))
+            with self.profiler.phase('exercise %s (resumed)' % (self.metrics.number_of_exercises_done + 1)):
+                if not self.machine.done:
+                    self.perform([('say', self.machine.render(SENTENCES['context']))])
+                    self.answer_structure(self.level, machine=self.machine)
+                self.finish_exercise()
+
+        self.do_exercises()
+        self.end_session()
+
+    def start_session(self):
+        #  self.sic.start()
+        self.action_runner = ActionRunner(self.sic)
 
-        while (time.time() - start_time) < duration_lesson:
+        self.action_runner.run_waiting_action('set_language', 'nl-NL')
+        self.action_runner.run_waiting_action('wake_up')
 
-            #if the previous exercise was solved by the student, they will do a more difficult exercise (over), than when the previous exercise was explained by the robot
-            if self.previous_exercise_correct:
-                self.over = True
-            else:
-                self.over = False
+        #load the fixed sentences on the robot, so they do not have to be synthesized every time
+        self.prompts = PromptCatalogue(self.action_runner)
+        #every lesson has its own pools of feedback lines, loaded first so the feedback can be played right away
+        self.responses = randomized_responses.session_pools(self.seed)
+        for pool in self.responses.values():
+            pool.preload(self.prompts)
+        print('Prompts loaded:', self.prompts.warm_up())
+        #long texts, like the explanation, are said sentence by sentence
+        self.speech = SpeechStream(self.action_runner)
+        self.sic.do_gesture('sitting_down/behavior_1') # Todo: fix that the robot's sitting down
 
-            logging.info('')
-            logging.info('========= New exercise =========')
+        #the next exercise is prepared while the student works on the current one (or listens to the introduction)
+        self.lookahead = Lookahead(self.level)
+        self.lookahead.prepare()
 
-            #generating a new exercise
-            self.exercise.generate_exercise(over=self.over)
+        self.session_log.start()
+        self.profiler.start()
 
-            #variables that need to be reset before every new exercise
-            self.wrong_responses = 0
-            self.feet_pressed = False
-            self.head_pressed = False
-            self.ready_for_answer = False
-            self.ready_for_step = False
-            self.asked_for_help = False
+    def do_exercises(self):
 
-            logging.info('--------- Sum: %s - %s ---------' % (self.exercise.first_number, self.exercise.second_number))
-            print('De som is: ', self.exercise.first_number, 'min', self.exercise.second_number)
-            self.action_runner.run_waiting_action('say', 'De som die we nu gaan doen is' + str(self.exercise.first_number) + 'min' + str(self.exercise.second_number))
+        while (self.clock.time() - self.start_time) < self.duration_lesson:
 
-            self.answer_structure(self.level)
+            with self.profiler.phase('exercise %s' % (self.metrics.number_of_exercises_done + 1)):
+                self.do_exercise()
 
-            self.number_of_exercises_done += 1
-            logging.info('- number_of_exercises_done += 1')
+    def do_exercise(self):
+        self.over = self.next_over()
 
-            if (time.time() - start_time) < (duration_lesson - 4):
-                self.action_runner.run_waiting_action('say', randomized_responses.text_next_sum())
+        self.logger.info('')
+        self.logger.info('========= New exercise =========')
 
-            sleep(2)
+        #taking the prepared exercise, and starting on the one after it
+        prepared = self.lookahead.take(self.over)
+        self.lookahead.prepare()
+        self.exercise = prepared.exercise
+        self.explanation = prepared.explanation
 
-        logging.info('')
+        self.logger.info('--------- Sum: %s - %s ---------' % (self.exercise.first_number, self.exercise.second_number))
+        print('De som is: ', self.exercise.first_number, 'min', self.exercise.second_number)
+        self.action_runner.run_waiting_action('say', prepared.announcement)
 
-        logging.info('- Play conclusion')
-        self.play_conclusion()
-        logging.info('- Done with conclusion')
+        self.metrics.start_exercise(self.exercise.first_number, self.exercise.second_number, self.over)
+        self.answer_structure(self.level)
+        self.finish_exercise()
 
-        logging.info('')
-        logging.info('')
+    def next_over(self):
+        #if the previous exercise was solved by the student, they will do a more difficult exercise (over), than when the previous exercise was explained by the robot
+        return self.previous_exercise_correct
 
-        #logging at the end of the session:
-        logging.info('- Number of exercises done: %s' % (self.number_of_exercises_done))
-        logging.info('- Times finished sum correctly: %s' % (self.times_finished_sum_correct))
-        logging.info('- Times student did not finish the sum: %s' % (self.times_finished_sum_incorrect))
+    def finish_exercise(self):
+        self.metrics.end_exercise(self.machine.outcome)
+        self.logger.info('- number_of_exercises_done: %s' % (self.metrics.number_of_exercises_done))
+        self.save_checkpoint()
 
-        logging.info('- Times asked for explanation: %s' % (self.times_asked_for_explanation))
-        logging.info('- Times tried sum again: %s' % (self.times_tried_sum_again))
+        if (self.clock.time() - self.start_time) < (self.duration_lesson - 4):
+            self.prompts.say(self.responses['next_sum'].draw())
 
-        logging.info('- Times student made mistake in tens: %s' % (self.mistake_in_tens))
-        logging.info('- Times student stranded while doing the tens: %s' % (self.end_in_tens))
-        logging.info('- Times student made mistake in units: %s' % (self.mistake_in_units))
-        logging.info('- Times student stranded while doing the units: %s' % (self.end_in_units))
+        self.clock.sleep(2)
 
-        logging.info('- Times student made mistake in step: %s' % (self.mistake_in_step))
-        logging.info('- Times student stranded while giving a steps: %s' % (self.end_in_step))
-        logging.info('- Times student made mistake in answer: %s' % (self.mistake_in_answer))
-        logging.info('- Times student stranded while giving an answer: %s' % (self.end_in_answer))
+    def end_session(self):
+        self.logger.info('')
 
-        logging.info('- Times the robot did not hear the student: %s' % (self.robot_did_not_hear_number))
+        self.logger.info('- Play conclusion')
+        with self.profiler.phase('conclusion'):
+            self.play_conclusion()
+        self.logger.info('- Done with conclusion')
 
-        logging.info('- Exercises where student took bigger steps in tens than level: %s' % (self.bigger_steps_than_level_tens))
-        logging.info('- Exercises where student took bigger steps in units than level: %s' % (self.bigger_steps_than_level_units))
-        logging.info('- Exercises where student took steps on level in tens: %s' % (self.steps_on_level_tens))
-        logging.info('- Exercises where student took steps on level in units: %s' % (self.steps_on_level_units))
-        logging.info('- Exercises where student took smaller steps in tens than level: %s' % (self.smaller_steps_than_level_tens))
-        logging.info('- Exercises where student took smaller steps in units than level: %s' % (self.smaller_steps_than_level_units))
+        self.logger.info('')
+        self.logger.info('')
 
-        logging.info('------------------------------ END OF SESSION ------------------------------')
+        #logging at the end of the session:
+        totals = self.metrics.totals()
+        for name, label in SUMMARY:
+            self.logger.info('- %s: %s' % (label, totals[name]))
+        self.logger.info('- Summary: %s' % (json.dumps(self.metrics.summary())))
+        self.metrics.flush()
 
+        self.logger.info('------------------------------ END OF SESSION ------------------------------')
 
-        self.action_runner.run_waiting_action('rest')
-        self.sic.stop()
+        #the session ended normally, so there is nothing to resume
+        self.checkpoint.clear()
 
+        self.lookahead.close()
+        self.prompts.clear()
+        self.action_runner.run_waiting_action('rest')
 
+        #where the time of every phase went, also written to <student>.profile.json
+        self.profiler.stop()
+        self.profiler.save(self.path(''))
+        for line in self.profiler.summary():
+            print(line)
+        self.stop()
+
+    def path(self, extension):
+        #file of this session with the given extension, e.g. student_x.jsonl
+        return os.path.join(self.directory, self.student + extension)
+
+    def save_checkpoint(self):
+        state = {'level': self.level,
+                 'elapsed': self.clock.time() - self.start_time,
+                 'previous_exercise_correct': self.previous_exercise_correct,
+                 'over': getattr(self, 'over', True),
+                 'exercise': self.exercise.to_dict() if self.machine else None,
+                 'explanation': self.explanation if self.machine else None,
+                 'machine': self.machine.to_dict() if self.machine else None}
+        state.update(self.metrics.to_dict())
+        self.checkpoint.save(state)
+
+    def stop(self):
+        #disconnect from the robot and write what is left of the log
+        self.sic.stop()
+        self.session_log.stop()
 
-    def answer_structure(self, level=None):
 
-        if level == 1:
-            first_step = True
-            last_step = False
-
-            self.action_runner.run_waiting_action('say', 'Als we ' + str(self.exercise.first_number) + ' min ' + str(self.exercise.second_number) + ' moeten doen, gaan we eerst de tientallen eraf halen. Dit kunnen we best in sprongen van 10 tegelijk doen!')
-
-            while self.exercise.current_second != 0:
-
-                previous_first = self.exercise.current_first
-                previous_second = self.exercise.current_second
-
-                tens = int(self.exercise.current_second/10)
-                last_tens_step = tens == 1
-                doing_tens = tens > 0
-
-                if doing_tens:
-                    self.exercise.take_step(int(10))
-                    if first_step == True:
-                        while not self.recognition_manager['attempt_success']:
-                            self.action_runner.run_waiting_action('say', 'Wat is ' + str(self.exercise.first_number) + ' min 10?')
-                            self.listen_for_answer()
-                        self.reset_recognition_management()
-                        first_step = False
-                    else:
-                        while not self.recognition_manager['attempt_success']:
-                            self.listen_for_answer()
-                        self.reset_recognition_management()
-
-                elif not self.over or last_step:
-                    while not self.recognition_manager['attempt_success']:
-                        self.action_runner.run_waiting_action('say', ' Wat is ' + str(self.exercise.current_first) + ' min ' + str(self.exercise.current_second) + ".")
-                        self.listen_for_answer()
-                    self.reset_recognition_management()
-                    self.exercise.take_step(self.exercise.current_second)
 
-                else:
-                    while not self.recognition_manager['attempt_success']:
-                        self.action_runner.run_waiting_action('say', ' Wat is ' + str(self.exercise.current_first) + ' min ' + str(self.exercise.current_first % 10) + ".")
-                        self.listen_for_answer()
-                    self.reset_recognition_management()
-                    self.exercise.take_step(self.exercise.current_first % 10)
-
-                if doing_tens:
-
-                    if self.answer != self.exercise.current_first:
-                        logging.info('- wrong answer given: %s' % (self.answer))
-                        self.wrong_responses += 1
-                        logging.info('- wrong_responses += 1')
-                        self.mistake_in_tens += 1
-                        logging.info('- mistake_in_tens += 1')
-                        self.mistake_in_answer += 1
-                        logging.info('- mistake_in_answer += 1')
-
-                        self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.answer) + '.')
-                        self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                        if self.wrong_responses != 2:
-                            self.choice_after_incorrect_answer()
-
-                            if self.asked_for_help:
-                                self.end_in_tens += 1
-                                logging.info('- end_in_tens += 1')
-                                self.end_in_answer += 1
-                                logging.info('- end_in_answer += 1')
-                                self.times_finished_sum_incorrect += 1
-                                logging.info('- times_finished_sum_incorrect += 1')
-                                self.previous_exercise_correct = False
-                                break
-
-                            else:
-                                self.action_runner.run_waiting_action('say', 'De som was ' + str(self.exercise.first_number) + ' min ' + str(self.exercise.second_number) + '. Er moet nog ' + str(previous_second) + ' af. We zijn gebleven bij ' + str(previous_first) + '.')
-
-                                while not self.recognition_manager['attempt_success']:
-                                    self.action_runner.run_waiting_action('say', ' Wat is ' + str(previous_first) + ' min 10?')
-                                    self.listen_for_answer()
-                                self.reset_recognition_management()
-
-                                if self.answer != self.exercise.current_first:
-                                    logging.info('- wrong answer given: %s' % (self.answer))
-                                    self.wrong_responses += 1
-                                    logging.info('- wrong_responses += 1')
-                                    self.mistake_in_tens += 1
-                                    logging.info('- mistake_in_tens += 1')
-                                    self.mistake_in_answer += 1
-                                    logging.info('- mistake_in_answer += 1')
-                                    self.end_in_tens += 1
-                                    logging.info('- end_in_tens += 1')
-                                    self.end_in_answer += 1
-                                    logging.info('- end_in_answer += 1')
-                                    self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.answer) + '.')
-                                    self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                                else:
-                                    self.exercise.step_accepted = False
-                                    if not last_tens_step:
-                                        self.action_runner.run_waiting_action('say', ' Wat is ' + str(self.exercise.current_first) + ' min 10?')
-
-                        else:
-                            self.end_in_tens += 1
-                            logging.info('- end_in_tens += 1')
-                            self.end_in_answer += 1
-                            logging.info('- end_in_answer += 1')
-
-                    else:
-                        self.exercise.step_accepted = False
-                        if not last_tens_step:
-                            self.action_runner.run_waiting_action('say', ' Wat is ' + str(self.exercise.current_first) + ' min 10?')
-
-                elif (not self.over) or last_step:
-
-                    if self.answer != self.exercise.current_first:
-                        logging.info('- wrong answer given: %s' % (self.answer))
-                        self.wrong_responses += 1
-                        logging.info('- wrong_responses += 1')
-                        self.mistake_in_units += 1
-                        logging.info('- mistake_in_units += 1')
-                        self.mistake_in_answer += 1
-                        logging.info('- mistake_in_answer += 1')
-                        self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.answer) + '.')
-                        self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                        if self.wrong_responses != 2:
-
-                            self.choice_after_incorrect_answer()
-
-                            if self.asked_for_help:
-                                print('The student has asked for help, so the exercise ends.')
-                                self.end_in_units += 1
-                                logging.info('- end_in_units += 1')
-                                self.end_in_answer += 1
-                                logging.info('- end_in_answer += 1')
-                                self.times_finished_sum_incorrect += 1
-                                logging.info('- times_finished_sum_incorrect += 1')
-                                self.previous_exercise_correct = False
-
-                                break
-
-                            else:
-                                self.action_runner.run_waiting_action('say', 'De som was ' + str(self.exercise.first_number) + ' min ' + str(self.exercise.second_number) + '. Er moet nog ' + str(previous_second) + ' af. We zijn gebleven bij ' + str(previous_first) + '.')
-
-                                while not self.recognition_manager['attempt_success']:
-                                    self.action_runner.run_waiting_action('say', ' Wat is ' + str(previous_first) + ' min ' + str(previous_second) + ".")
-                                    self.listen_for_answer()
-                                self.reset_recognition_management()
-
-                                if self.answer != self.exercise.current_first:
-                                    logging.info('- wrong answer given: %s' % (self.answer))
-                                    self.wrong_responses += 1
-                                    logging.info('- wrong_responses += 1')
-                                    self.mistake_in_units += 1
-                                    logging.info('- mistake_in_units += 1')
-                                    self.end_in_units += 1
-                                    logging.info('- end_in_units += 1')
-                                    self.mistake_in_answer += 1
-                                    logging.info('- mistake_in_answer += 1')
-                                    self.end_in_answer += 1
-                                    logging.info('- end_in_answer += 1')
-                                    self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.answer) + '.')
-                                    self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                                else:
-                                    self.action_runner.run_waiting_action('say', randomized_responses.response_correct_exercise())
-                                    print('End of the exercise, none left to subtract, 1 mistake was made')
-                                    self.times_finished_sum_correct += 1
-                                    logging.info('- times_finished_sum_correct += 1')
-                                    logging.info('- one mistake was made')
-                                    self.previous_exercise_correct = True
-                        else:
-                            self.end_in_units += 1
-                            logging.info('- end_in_units += 1')
-                            self.end_in_answer += 1
-                            logging.info('- end_in_answer += 1')
-
-
-                    else:
-                        self.action_runner.run_waiting_action('say', randomized_responses.response_correct_exercise())
-                        print('End of the exercise, none left to subtract, no mistake was made')
-                        self.times_finished_sum_correct += 1
-                        logging.info('- times_finished_sum_correct += 1')
-                        logging.info('- no mistake was made')
-                        self.previous_exercise_correct = True
+    def answer_structure(self, level=None, machine=None):
 
-                else:
-                    last_step = True
-
-                    if self.answer != self.exercise.current_first:
-                        logging.info('- wrong answer given: %s' % (self.answer))
-                        self.wrong_responses += 1
-                        logging.info('- wrong_responses += 1')
-                        self.mistake_in_units += 1
-                        logging.info('- mistake_in_units += 1')
-                        self.mistake_in_answer += 1
-                        logging.info('- mistake_in_answer += 1')
-                        self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.answer) + '.')
-                        self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                        if self.wrong_responses != 2:
-
-                            self.choice_after_incorrect_answer()
-
-                            if self.asked_for_help:
-                                print('The student has asked for help, so the exercise ends.')
-                                self.end_in_units += 1
-                                logging.info('- end_in_units += 1')
-                                self.end_in_answer += 1
-                                logging.info('- end_in_answer += 1')
-                                self.times_finished_sum_incorrect += 1
-                                logging.info('- times_finished_sum_incorrect += 1')
-                                self.previous_exercise_correct = False
-                                break
-
-                            else:
-                                self.action_runner.run_waiting_action('say', 'De som was ' + str(self.exercise.first_number) + ' min ' + str(self.exercise.second_number) + '. Er moet nog ' + str(previous_second) + ' af. We zijn gebleven bij ' + str(previous_first) + '.')
-
-                                while not self.recognition_manager['attempt_success']:
-                                    self.action_runner.run_waiting_action('say', ' Wat is ' + str(previous_first) + ' min ' + str(previous_first % 10) + ".")
-                                    self.listen_for_answer()
-                                self.reset_recognition_management()
-
-                                if self.answer != self.exercise.current_first:
-                                    logging.info('- wrong answer given: %s' % (self.answer))
-                                    self.wrong_responses += 1
-                                    logging.info('- wrong_responses += 1')
-                                    self.mistake_in_units += 1
-                                    logging.info('- mistake_in_units += 1')
-                                    self.end_in_units += 1
-                                    logging.info('- end_in_units += 1')
-                                    self.mistake_in_answer += 1
-                                    logging.info('- mistake_in_answer += 1')
-                                    self.end_in_answer += 1
-                                    logging.info('- end_in_answer += 1')
-                                    self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.answer) + '.')
-                                    self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                                else:
-                                    self.exercise.step_accepted = False
-
-                        else:
-                            self.end_in_units += 1
-                            logging.info('- end_in_units += 1')
-                            self.end_in_answer += 1
-                            logging.info('- end_in_answer += 1')
-
-                    else:
-                        self.exercise.step_accepted = False
-
-
-                if self.wrong_responses == 2:
-                    self.action_runner.run_waiting_action('say', explain_exercise(self.level, first_number=self.exercise.first_number, second_number=self.exercise.second_number))
-                    self.times_finished_sum_incorrect += 1
-                    logging.info('- times_finshed_sum_incorrect += 1')
-                    self.previous_exercise_correct = False
-                    break
-
-            logging.info('- End of the exercise, left to subtract: %s' % (self.exercise.current_second))
-
-
-        if level == 2 or level == 3 or level == 4:
-            bigger_steps_than_level_tens_occured = False
-            steps_on_level_tens_occured = False
-            smaller_steps_than_level_tens_occured = False
-            bigger_steps_than_level_units_occured = False
-            steps_on_level_units_occured = False
-            smaller_steps_than_level_units_occured = False
-
-            while self.exercise.current_second != 0:
-
-                previous_first = self.exercise.current_first
-                previous_second = self.exercise.current_second
-
-                while not self.recognition_manager['attempt_success']:
-                    self.action_runner.run_waiting_action('say', 'Welk getal haal je er af?')
+        if machine:
+            #resuming an exercise that was already started
+            self.machine = machine
+        else:
+            self.machine = ExerciseStateMachine(level, self.exercise)
+            self.perform(self.machine.start())
+            self.save_checkpoint()
+
+        while not self.machine.done:
+
+            if self.machine.expecting == 'choice':
+                choice = self.choice_after_incorrect_answer()
+                self.metrics.record_input('choice', choice, True)
+                self.perform(self.machine.feed(choice))
+                self.save_checkpoint()
+                continue
+
+            while not self.recognition_manager['attempt_success']:
+                self.prompts.say(self.machine.prompt())
+                if self.machine.expecting == 'step':
                     self.listen_for_step()
-                self.reset_recognition_management()
-
-                step_accepted, action_level = self.exercise.take_step(self.step, level)
-
-                if action_level == 'above tens':
-                    bigger_steps_than_level_tens_occured = True
-                elif action_level == 'on level tens':
-                    steps_on_level_tens_occured = True
-                elif action_level == 'below tens':
-                    smaller_steps_than_level_tens_occured = True
-                elif action_level == 'above units':
-                    bigger_steps_than_level_units_occured = True
-                elif action_level == 'on level units':
-                    steps_on_level_units_occured = True
-                elif action_level == 'below units':
-                    smaller_steps_than_level_units_occured = True
-                elif action_level == 'incorrect tens':
-                    self.mistake_in_tens += 1
-                    logging.info('- mistake_in_tens += 1')
-                    if self.wrong_responses == 1:
-                        self.end_in_tens += 1
-                        logging.info('- end_in_tens += 1')
-                elif action_level == 'incorrect units':
-                    self.mistake_in_units += 1
-                    logging.info('- mistake_in_units += 1')
-                    if self.wrong_responses == 1:
-                        self.end_in_units += 1
-                        logging.info('- end_in_units += 1')
-
-                if not step_accepted:
-                    logging.info('- wrong step given: %s' % (self.step))
-                    self.wrong_responses += 1
-                    logging.info('- wrong_responses += 1')
-                    self.mistake_in_step += 1
-                    logging.info('- mistake_in_step += 1')
-                    self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.step) + '.')
-                    self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                    if self.wrong_responses != 2:
-
-                        self.choice_after_incorrect_answer()
-
-                        if self.asked_for_help:
-                            print('The student has asked for help, so the exercise ends.')
-                            self.end_in_step += 1
-                            logging.info('- end_in_step += 1')
-
-                            if action_level == 'incorrect tens':
-                                self.end_in_tens += 1
-                                logging.info('- end_in_tens += 1')
-                                print('END incorrect tens')
-                            elif action_level == 'incorrect units':
-                                self.end_in_units += 1
-                                logging.info('- end_in_units += 1')
-                                print('END incorrect units')
-
-                            self.times_finished_sum_incorrect += 1
-                            logging.info('- times_finished_sum_incorrect += 1')
-                            self.previous_exercise_correct = False
-                            break
-
-                        else:
-                            self.action_runner.run_waiting_action('say', 'De som was ' + str(self.exercise.first_number) + ' min ' + str(self.exercise.second_number) + '. Er moet nog ' + str(self.exercise.current_second) + ' af. We zijn gebleven bij ' + str(self.exercise.current_first) + '.')
-
-                            while not self.recognition_manager['attempt_success']: #and self.recognition_manager['attempt_number'] < 2:
-                                self.action_runner.run_waiting_action('say', 'Welk getal haal je er af?')
-                                self.listen_for_step()
-                            self.reset_recognition_management()
-
-                            step_accepted, action_level = self.exercise.take_step(self.step, level)
-
-                            if action_level == 'above tens':
-                                bigger_steps_than_level_tens_occured = True
-                            elif action_level == 'on level tens':
-                                steps_on_level_tens_occured = True
-                            elif action_level == 'below tens':
-                                smaller_steps_than_level_tens_occured = True
-                            elif action_level == 'above units':
-                                bigger_steps_than_level_units_occured = True
-                            elif action_level == 'on level units':
-                                steps_on_level_units_occured = True
-                            elif action_level == 'below units':
-                                smaller_steps_than_level_units_occured = True
-                            elif action_level == 'incorrect tens':
-                                self.mistake_in_tens += 1
-                                logging.info('- mistake_in_tens += 1')
-                                if self.wrong_responses == 1:
-                                    self.end_in_tens += 1
-                                    logging.info('- end_in_tens += 1')
-                            elif action_level == 'incorrect units':
-                                self.mistake_in_units += 1
-                                logging.info('- mistake_in_units += 1')
-                                if self.wrong_responses == 1:
-                                    self.end_in_units += 1
-                                    logging.info('- end_in_units += 1')
-
-                            if not step_accepted:
-                                logging.info('- wrong step given: %s' % (self.step))
-                                self.wrong_responses += 1
-                                logging.info('- wrong_responses += 1')
-                                self.mistake_in_step += 1
-                                logging.info('- mistake_in_step += 1')
-                                self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.step) + '.')
-                                self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                if self.wrong_responses == 2:
-                    self.action_runner.run_waiting_action('say', explain_exercise(self.level, first_number=self.exercise.first_number, second_number=self.exercise.second_number))
-                    self.end_in_step += 1
-                    logging.info('- end_in_step += 1')
-                    self.times_finished_sum_incorrect += 1
-                    logging.info('- times_finished_sum_incorrect += 1')
-                    self.previous_exercise_correct = False
-
-                    break
-
-                while not self.recognition_manager['attempt_success']:
-                    self.action_runner.run_waiting_action('say', 'Op welk getal kom je uit?')
+                else:
                     self.listen_for_answer()
-                self.reset_recognition_management()
-
-                answer_accepted, answer_type = self.exercise.acceptable_answer(self.answer)
-
-                if answer_type == 'incorrect tens':
-                    self.mistake_in_tens += 1
-                    logging.info('- mistake_in_tens += 1')
-                    if self.wrong_responses == 1:
-                        self.end_in_tens += 1
-                        logging.info('- end_in_tens += 1')
-                elif answer_type == 'incorrect units':
-                    self.mistake_in_units += 1
-                    logging.info('- mistake_in_units += 1')
-                    if self.wrong_responses == 1:
-                        self.end_in_units += 1
-                        logging.info('- end_in_units += 1')
-
-                if not answer_accepted:
-                    logging.info('- wrong answer given: %s' % (self.answer))
-                    self.wrong_responses += 1
-                    logging.info('- wrong_responses += 1')
-                    self.mistake_in_answer += 1
-                    logging.info('- mistake_in_answer += 1')
-                    self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.answer) + '.')
-                    self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                    if self.wrong_responses != 2:
-
-                        self.choice_after_incorrect_answer()
-
-                        if self.asked_for_help:
-                            print('The student has asked for help, so the exercise ends.')
-                            self.end_in_answer += 1
-                            logging.info('- end_in_answer += 1')
-
-                            if answer_type == 'incorrect tens':
-                                self.end_in_tens += 1
-                                logging.info('- end_in_tens += 1')
-                                print('END incorrect tens')
-                            elif answer_type == 'incorrect units':
-                                self.end_in_units += 1
-                                logging.info('- end_in_units += 1')
-                                print('END incorrect units')
-
-                            self.times_finished_sum_incorrect += 1
-                            logging.info('- times_finished_sum_incorrect += 1')
-
-                            self.previous_exercise_correct = False
-                            break
-
-                        else:
-                            self.action_runner.run_waiting_action('say', 'De som was ' + str(self.exercise.first_number) + ' min ' + str(self.exercise.second_number) + '. Er moet nog ' + str(previous_second) + ' af. We zijn gebleven bij ' + str(previous_first) + '.')
-
-                            while not self.recognition_manager['attempt_success']: #and self.recognition_manager['attempt_number'] < 2:
-                                self.action_runner.run_waiting_action('say', 'Op welk getal kom je uit?')
-                                self.listen_for_answer()
-                            self.reset_recognition_management()
-
-                            answer_accepted, answer_type = self.exercise.acceptable_answer(self.answer)
-
-                            if answer_type == 'incorrect tens':
-                                self.mistake_in_tens += 1
-                                logging.info('- mistake_in_tens += 1')
-                                if self.wrong_responses == 1:
-                                    self.end_in_tens += 1
-                                    logging.info('- end_in_tens += 1')
-                            elif answer_type == 'incorrect units':
-                                self.mistake_in_units += 1
-                                logging.info('- mistake_in_units += 1')
-                                if self.wrong_responses == 1:
-                                    self.end_in_units += 1
-                                    logging.info('- end_in_units += 1')
-
-                            if not answer_accepted:
-                                logging.info('- wrong answer given: %s' % (self.answer))
-                                self.wrong_responses += 1
-                                logging.info('- wrong_responses += 1')
-                                self.mistake_in_answer += 1
-                                logging.info('- mistake_in_answer += 1')
-                                self.action_runner.run_waiting_action('say', 'Volgens mij zei je ' + str(self.answer) + '.')
-                                self.action_runner.run_waiting_action('say', randomized_responses.response_incorrect_answer())
-
-                if self.wrong_responses == 2:
-                    self.action_runner.run_waiting_action('say', explain_exercise(self.level, first_number=self.exercise.first_number, second_number=self.exercise.second_number))
-                    self.end_in_answer += 1
-                    logging.info('- end_in_answer += 1')
-                    self.times_finished_sum_incorrect += 1
-                    logging.info('- times_finished_sum_incorrect += 1')
-                    self.previous_exercise_correct = False
-                    break
-
-            # Update logging parameters
-            if bigger_steps_than_level_tens_occured:
-                self.bigger_steps_than_level_tens += 1
-                logging.info('- bigger_steps_than_level_tens += 1')
-            if steps_on_level_tens_occured:
-                self.steps_on_level_tens += 1
-                logging.info('- steps_on_level_tens += 1')
-            if smaller_steps_than_level_tens_occured:
-                self.smaller_steps_than_level_tens += 1
-                logging.info('- smaller_steps_than_level_tens += 1')
-            if bigger_steps_than_level_units_occured:
-                self.bigger_steps_than_level_units += 1
-                logging.info('- bigger_steps_than_level_units += 1')
-            if steps_on_level_units_occured:
-                self.steps_on_level_units += 1
-                logging.info('- steps_on_level_units += 1')
-            if smaller_steps_than_level_units_occured:
-                self.smaller_steps_than_level_units += 1
-                logging.info('- smaller_steps_than_level_units += 1')
-
-            if self.wrong_responses < 2 and not self.asked_for_help:
-                self.action_runner.run_waiting_action('say', randomized_responses.response_correct_exercise())
-                self.times_finished_sum_correct += 1
-                logging.info('- times_finished_sum_correct += 1')
-                self.previous_exercise_correct = True
-
-            print('End of the exercise, left to subtract:', self.exercise.current_second)
-            logging.info('- End of the exercise, left to subtract: %s' % (self.exercise.current_second))
+            self.reset_recognition_management()
+
+            expecting = self.machine.expecting
+            given = self.step if expecting == 'step' else self.answer
+            wrong_responses = self.machine.wrong_responses
+            effects = self.machine.feed(given)
+            self.metrics.record_input(expecting, given, self.machine.wrong_responses == wrong_responses)
+            self.perform(effects)
+            self.save_checkpoint()
+
+        self.previous_exercise_correct = self.machine.outcome == 'correct'
+
+        print('End of the exercise, left to subtract:', self.exercise.current_second)
+        self.logger.info('- End of the exercise, left to subtract: %s' % (self.exercise.current_second))
+
+
+    def perform(self, effects):
+        #carry out the effects returned by the state machine of the exercise
+        for kind, value in effects:
+            if kind == 'say':
+                self.prompts.say(value)
+            elif kind == 'feedback':
+                if value == 'correct':
+                    self.prompts.say(self.responses['correct'].draw())
+                else:
+                    self.prompts.say(self.responses['incorrect'].draw())
+            elif kind == 'explain':
+                #the student can stop the explanation by touching the head of the robot
+                with self.profiler.span('explanation'):
+                    stream = self.speech.say(self.explanation, interrupt_events=HEAD)
+                self.logger.info('- Explanation: %s of %s parts said, first word after %s s' % (stream['done'], len(self.explanation), stream['first_word']))
+            elif kind == 'count':
+                self.metrics.count(value)
+            elif kind == 'log':
+                self.logger.info(value)
 
 
     def listen_for_step(self):
 
-        self.sic.subscribe_touch_listener('RightBumperPressed', Feet_For_Step())
-        self.sic.subscribe_touch_listener('LeftBumperPressed', Feet_For_Step())
-        self.sic.subscribe_touch_listener('BackBumperPressed', Feet_For_Step())
-        self.ready_for_step = False
-
-        while True:
-
-            if self.ready_for_step:
-                self.sic.unsubscribe_touch_listener('RightBumperPressed')
-                self.sic.unsubscribe_touch_listener('LeftBumperPressed')
-                self.sic.unsubscribe_touch_listener('BackBumperPressed')
-
-                self.action_runner.run_action('set_eye_color', 'green')
-                self.action_runner.run_waiting_action('speech_recognition', 'answer_sum', 3, additional_callback=self.on_intent_number)
-
-                try:
-                    self.step = int(self.user_model['number'])
-                    self.action_runner.run_action('set_eye_color', 'white')
-
-                    print(self.step)
-                    logging.info('- step: %s' % (self.step))
-                    return self.step
-
-                except:
-                    print('there is no number yet.')
-                    sleep(1)
-                    break
+        self.step = self.listen_for_number()
+        if self.step is not None:
+            self.logger.info('- step: %s' % (self.step))
+        return self.step
 
 
     def listen_for_answer(self):
 
-        self.sic.subscribe_touch_listener('RightBumperPressed', Feet_For_Answer())
-        self.sic.subscribe_touch_listener('LeftBumperPressed', Feet_For_Answer())
-        self.sic.subscribe_touch_listener('BackBumperPressed', Feet_For_Answer())
-        self.ready_for_answer = False
+        self.answer = self.listen_for_number()
+        if self.answer is not None:
+            self.logger.info('- answer: %s' % (self.answer))
+        return self.answer
 
-        while True:
 
-            if self.ready_for_answer:
-                self.sic.unsubscribe_touch_listener('RightBumperPressed')
-                self.sic.unsubscribe_touch_listener('LeftBumperPressed')
-                self.sic.unsubscribe_touch_listener('BackBumperPressed')
+    def listen_for_number(self):
+        #wait until one of the feet is pressed, then listen for 3 seconds
+        waiting_since = self.clock.time()
+        self.action_runner.wait_for_first({'feet': FEET})
+        self.metrics.record_latency(self.clock.time() - waiting_since)
 
-                self.action_runner.run_action('set_eye_color', 'green')
-                self.action_runner.run_waiting_action('speech_recognition', 'answer_sum', 3, additional_callback=self.on_intent_number)
+        self.action_runner.run_action('set_eye_color', 'green')
+        self.user_model.pop('number', None)
+        self.user_model.pop('not_heard', None)
+        self.action_runner.run_waiting_action('speech_recognition', 'answer_sum', 3, additional_callback=self.on_intent_number)
+        self.action_runner.run_action('set_eye_color', 'white')
 
-                try:
-                    self.answer = int(self.user_model['number'])
-                    self.action_runner.run_action('set_eye_color', 'white')
+        if 'number' in self.user_model:
+            number = int(self.user_model['number'])
+            print(number)
+            return number
 
-                    print(self.answer)
-                    logging.info('- answer: %s' % (self.answer))
-                    return self.answer
+        if self.user_model.pop('not_heard', False):
+            self.not_heard()
 
-                except:
-                    print('there is no number yet.')
-                    sleep(1)
-                    break
+        print('there is no number yet.')
+        self.clock.sleep(1)
+        return None
 
 
     def choice_after_incorrect_answer(self):
-        self.action_runner.run_waiting_action('say', 'Wil je deze som nog een keer proberen, of zal ik uitleggen hoe ik hem heb opgelost? Als je het nog een keer wilt proberen mag je zachtjes op mijn hoofd drukken, en als je wilt dat ik de som voordoe kan je tegen mijn voet-en drukken.')
-
-        self.sic.subscribe_touch_listener('RightBumperPressed', Feet_Chosen())
-        self.sic.subscribe_touch_listener('LeftBumperPressed', Feet_Chosen())
-        self.sic.subscribe_touch_listener('BackBumperPressed', Feet_Chosen())
-        self.sic.subscribe_touch_listener('FrontTactilTouched', Tactil_Chosen())
-        self.sic.subscribe_touch_listener('MiddleTactilTouched', Tactil_Chosen())
-        self.sic.subscribe_touch_listener('RearTactilTouched', Tactil_Chosen())
-
-        while True:
-
-            if self.feet_pressed:
-
-                self.sic.unsubscribe_touch_listener('RightBumperPressed')
-                self.sic.unsubscribe_touch_listener('LeftBumperPressed')
-                self.sic.unsubscribe_touch_listener('BackBumperPressed')
-                self.sic.unsubscribe_touch_listener('FrontTactilTouched')
-                self.sic.unsubscribe_touch_listener('MiddleTactilTouched')
-                self.sic.unsubscribe_touch_listener('RearTactilTouched')
-
-                self.times_asked_for_explanation += 1
-                logging.info('- times_asked_for_explanation += 1')
-
-                sleep(1)
-
-                self.action_runner.run_waiting_action('say', explain_exercise(self.level, first_number=self.exercise.first_number, second_number=self.exercise.second_number))
-
-                print('End of the exercise, the assignment was explained.')
-
-                self.asked_for_help = True
-                break
+        self.prompts.play('choice')
 
+        choice = self.action_runner.wait_for_first({'feet': FEET, 'head': HEAD})
+        print(choice.capitalize() + ' touched')
 
-            elif self.head_pressed:
-                self.sic.unsubscribe_touch_listener('RightBumperPressed')
-                self.sic.unsubscribe_touch_listener('LeftBumperPressed')
-                self.sic.unsubscribe_touch_listener('BackBumperPressed')
-                self.sic.unsubscribe_touch_listener('FrontTactilTouched')
-                self.sic.unsubscribe_touch_listener('MiddleTactilTouched')
-                self.sic.unsubscribe_touch_listener('RearTactilTouched')
+        self.clock.sleep(1)
 
-                sleep(1)
-
-                self.times_tried_sum_again += 1
-                logging.info('- times_tried_sum_again += 1')
-                break
+        if choice == 'feet':
+            print('The student has asked for help, so the exercise ends.')
+            return 'explain'
+        return 'retry'
 
 
     def play_introduction(self, level=None):
 
 #        while not self.recognition_manager['attempt_success'] and self.recognition_manager['attempt_number'] < 2:
-        self.action_runner.run_waiting_action('say', 'Hoi, ik ben Nao. Hoe heet jij?')
+        self.prompts.play('ask_name')
         self.action_runner.run_waiting_action('speech_recognition', 'answer_name', 3, additional_callback=self.on_intent_name)
-        sleep(1)
-        print("naam printen") 
-        print(self.user_model['name'])
+        self.clock.sleep(1)
         try:
             print(self.user_model['name'])
-            logging.info('- name detected: %s' % (self.user_model['name']))
+            self.logger.info('- name detected: %s' % (self.user_model['name']))
         except:
             print('No name recognized')
-            logging.info('- no name detected')
+            self.logger.info('- no name detected')
 
         self.reset_recognition_management()
 
         
 
-        self.action_runner.run_waiting_action('say', 'Leuk dat je er bent! Wij gaan vandaag sámen rekenen. We gaan minsommen oefenen. Ik ga je eerst kort uitleggen hoe we dit ook alweer doen. Daarna gaan we 20 minuten sommen maken. Als je een fout maakt is dat niet erg, dan proberen we het gewoon opnieuw. Of leg ik je uit hoe ik het zou doen. Volgens mij kan je dat!')
+        self.prompts.play('welcome')
 
-        sleep(1)
+        self.clock.sleep(1)
 
-        self.action_runner.run_waiting_action('say', 'We gaan straks minsommen oefenen onder de honderd. We doen eerst de tientallen eraf, en dan de eenheden eraf.')
+        self.prompts.play('subject')
 
         if level == 1:
-            self.action_runner.run_waiting_action('say', 'Zullen we samen de sommen maken? Dan zeg ik steeds welk getal we eraf halen, en dan mag jij zeggen op welk getal we uitkomen. ')
+            self.prompts.play('level_1')
 
         elif level == 2:
-            self.action_runner.run_waiting_action('say', 'Zullen we sprongen van 10 tegelijk nemen? Dan doen we daarna de eenheden.')
+            self.prompts.play('level_2')
 
         elif level == 3:
-            self.action_runner.run_waiting_action('say', 'Zullen we grote sprongen van alle tientallen tegelijk nemen, en daarna de eenheden eraf doen?')
+            self.prompts.play('level_3')
 
         elif level == 4:
-            self.action_runner.run_waiting_action('say', 'Zullen we grote sprongen van alle tientallen tegelijk nemen? Dan halen we daarna alle eenheden er in 1 keer af.')
-
-        self.action_runner.run_waiting_action('say', 'Zorg ervoor dat je de som die ik zeg altijd meteen opschrijft. Als je het antwoord weet, kan je tegen een van mijn voeten drukken. Zodra mijn ogen groen zijn, kan jij je antwoord geven! Zorg ervoor dat je duidelijk en hardop je antwoord geeft. Zullen we dan nu beginnen met rekenen? Als je er klaar voor bent mag je zachtjes op mijn hoofd drukken!')
+            self.prompts.play('level_4')
 
-        while self.waiting_for_start_lesson:
-            self.sic.subscribe_touch_listener('FrontTactilTouched', Head_For_Start_Lesson())
-            self.sic.subscribe_touch_listener('MiddleTactilTouched', Head_For_Start_Lesson())
-            self.sic.subscribe_touch_listener('RearTactilTouched', Head_For_Start_Lesson())
+        self.prompts.play('instructions')
 
-            if self.waiting_for_start_lesson is False:
-                self.sic.unsubscribe_touch_listener('FrontTactilTouched')
-                self.sic.unsubscribe_touch_listener('MiddleTactilTouched')
-                self.sic.unsubscribe_touch_listener('RearTactilTouched')
+        self.action_runner.wait_for_first({'head': HEAD})
+        print('Head pressed to start the lesson')
 
-                sleep(1)
-                self.action_runner.run_waiting_action('say', 'Oke, dan ga ik nu de eerste oefening aan je vertellen, vergeet niet om de som op te schrijven!')
+        self.clock.sleep(1)
+        self.prompts.play('first_exercise')
 
     def play_conclusion(self):
-        self.action_runner.run_waiting_action('say', 'Onze rekenles zit erop! Ik vind dat je heel goed je best hebt gedaan. Ik denk dat jij nog veel beter gaat worden in rekenen, vooral blijven oefenen! Ik ga nu even pauzeren, misschien tot een andere keer!')
+        self.prompts.play('conclusion')
 
 
 
-    def on_intent_number(self, detection_result: DetectionResult) -> None:
+    def on_intent_number(self, detection_result: DetectedIntent) -> None:
         if detection_result:
-            try:
-                print(detection_result.parameters['number'].number_value)
-                self.user_model['number'] = detection_result.parameters['number'].number_value
+            number = detection_result.parameters.get('number')
+            if not isinstance(number, float):
+                # Dialogflow did not fill in the number, try to read it from the recognized text before asking again
+                number = parse_number(detection_result.text)
+                if number is not None:
+                    self.logger.info('- number read from text: %s' % (detection_result.text))
+
+            if number is not None:
+                print(number)
+                self.user_model['number'] = int(number)
                 self.recognition_manager['attempt_success'] = True
-      
-            except:
-                self.recognition_manager['attempt_number'] += 1
-                self.action_runner.run_action('set_eye_color', 'white')
-                print('no number recognized, else statement')
-                self.robot_did_not_hear_number += 1
-                logging.info('- robot_did_not_hear_number += 1')
-                logging.info('- else')
-                self.action_runner.run_action('say', 'Sorry, ik heb je niet goed verstaan. Wil je je antwoord opnieuw zeggen?')
-                sleep(7)
 
+            else:
+                #this runs on the thread that delivers the events of all sessions, so the robot asks again on the
+                #thread of the lesson, see not_heard
+                self.user_model['not_heard'] = True
+
+
+    def not_heard(self) -> None:
+        #an intent came in, but without a number: tell the student and give them time before they answer again
+        self.recognition_manager['attempt_number'] += 1
+        print('no number recognized, else statement')
+        self.metrics.count('robot_did_not_hear_number')
+        self.logger.info('- else')
+        self.prompts.play('not_heard', wait=False)
+        self.clock.sleep(7)
 
-    def on_intent_name(self, detection_result: DetectionResult) -> None:
+
+    def on_intent_name(self, detection_result: DetectedIntent) -> None:
         if detection_result:
             try:
-                self.user_model['name'] = detection_result.parameters['name'].list_value.values[0].struct_value['name']
+                self.user_model['name'] = detection_result.parameters['name'][0]['name']
                 self.recognition_manager['attempt_success'] = True
                 print('Name recognized')
                 print('Name is ', self.user_model['name'])
@@ -905,8 +450,29 @@ class Lesson:
         self.recognition_manager.update({'attempt_success': False, 'attempt_number': 0})
 
 
-lesson = Lesson('127.0.0.1',
-              'nl-NL',
-              'math-tutor-n9yf-5f3ba0e72a70.json',
-              'math-tutor-n9yf')
-lesson.run()
+if __name__ == '__main__':
+
+    #--profile shows where the time of every phase of the lesson went, --capture also runs cProfile and tracemalloc
+    profiler = None
+    if '--capture' in sys.argv:
+        profiler = CaptureProfiler()
+    elif '--profile' in sys.argv:
+        profiler = AggregateProfiler()
+
+### ### Change before each session: ### ###
+
+    lesson = Lesson('127.0.0.1',
+                  'nl-NL',
+                  'math-tutor-n9yf-5f3ba0e72a70.json',
+                  'math-tutor-n9yf',
+                  level=1, #change level of the student
+                  student='student_x', #change filename of the log
+                  profiler=profiler)
+
+### ### End change before each session  ### ###
+
+    #after a crash, start the code with --resume to continue the session where it stopped
+    if '--resume' in sys.argv:
+        lesson.resume()
+    else:
+        lesson.run()
@@ -0,0 +1,232 @@
+import numpy as np
+
+# All exercises are built from two tens (20-90) and two units, like generate_exercise always did:
+# - over (met overbrugging): different tens and different units (1-8); the first number gets the smaller units, so
+#   subtracting goes past the ten;
+# - not over (zonder overbrugging): any tens and units (1-9), the first number gets the larger ones. When one of the
+#   tens is 90, the units are different and at most 8, so the first number stays below 100.
+# The chance of every exercise is the same as with the rejection loops of the original generate_exercise.
+
+_TENS = np.arange(2, 10) * 10
+
+LEVELS = (1, 2, 3, 4)
+
+# Most steps an exercise can take: nine jumps of ten (e.g. 98 - 91), then the units in two steps
+MAX_STEPS = 11
+
+
+def _enumerate():
+    tens_a, tens_b, units_a, units_b = np.meshgrid(_TENS, _TENS, np.arange(1, 10), np.arange(1, 10), indexing='ij')
+    tens_a, tens_b, units_a, units_b = (values.ravel() for values in (tens_a, tens_b, units_a, units_b))
+    high_tens, low_tens = np.maximum(tens_a, tens_b), np.minimum(tens_a, tens_b)
+    high_units, low_units = np.maximum(units_a, units_b), np.minimum(units_a, units_b)
+    draws_per_tens = 1.0 / len(_TENS) ** 2
+
+    # over: units are drawn from 1-8 until they differ, tens until they differ
+    over = (tens_a != tens_b) & (units_a != units_b) & (high_units <= 8)
+    over_weight = draws_per_tens / (len(_TENS) - 1) * len(_TENS) / (8 * 7)
+
+    # not over: units are drawn from 1-9, or from 1-8 until they differ when one of the tens is 90
+    capped = high_tens == 90
+    not_over = ~capped | ((units_a != units_b) & (high_units <= 8))
+    not_over_weight = np.where(capped, draws_per_tens / (8 * 7), draws_per_tens / (9 * 9))
+
+    first = np.concatenate([(high_tens + low_units)[over], (high_tens + high_units)[not_over]])
+    second = np.concatenate([(low_tens + high_units)[over], (low_tens + low_units)[not_over]])
+    is_over = np.concatenate([np.ones(over.sum(), dtype=bool), np.zeros(not_over.sum(), dtype=bool)])
+    weight = np.concatenate([np.full(over.sum(), over_weight), not_over_weight[not_over]])
+
+    # different draws can give the same exercise, so add up their chances
+    keys = is_over * 10000 + first * 100 + second
+    keys, index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return first[index], second[index], is_over[index], np.bincount(inverse, weights=weight)
+
+
+def _solution_steps(first: np.ndarray, second: np.ndarray, level: int) -> np.ndarray:
+    """
+    The usual steps of the level (the steps the robot takes itself in level 1): jumps of ten (levels 1 and 2) or all
+    tens at once (levels 3 and 4), then the units, split at the ten when the sum goes past it (levels 1 to 3) or all
+    at once (level 4).
+
+    :return: array with a row of MAX_STEPS steps per exercise, padded with zeros
+    """
+    tens = second // 10
+    units = second % 10
+    to_the_ten = first % 10
+    split = (to_the_ten != 0) & (units > to_the_ten) & (level < 4)
+    unit_steps = np.stack([np.where(split, to_the_ten, units), np.where(split, units - to_the_ten, 0)], axis=1)
+
+    steps = np.zeros((len(first), MAX_STEPS), dtype=np.int64)
+    rows = np.arange(len(first))
+    if level <= 2:
+        steps[np.arange(MAX_STEPS) < tens[:, None]] = 10
+        steps[rows, tens] = unit_steps[:, 0]
+        steps[rows, tens + 1] = unit_steps[:, 1]
+    else:
+        steps[:, 0] = tens * 10
+        steps[:, 1:3] = unit_steps
+    return steps
+
+
+def _alias_table(probabilities: np.ndarray):
+    """Vose's alias method: after this, a sample takes one random index and one random number."""
+    count = len(probabilities)
+    scaled = probabilities * count / probabilities.sum()
+    threshold = np.ones(count)
+    alias = np.arange(count)
+    small = [i for i in range(count) if scaled[i] < 1.0]
+    large = [i for i in range(count) if scaled[i] >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        threshold[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    return threshold, alias
+
+
+class ExerciseCatalogue:
+    """
+    All exercises that generate_exercise can give, enumerated once.
+
+    Exercises are stored in arrays (first_number, second_number, over, probability) and indexed by their difficulty:
+    over, and the number of tens and units of the second number. Sampling takes constant time, with the same chances
+    as the original generate_exercise, and uses a seedable NumPy generator.
+    """
+
+    def __init__(self, seed: int = None):
+        """
+        :param seed: seed of the random generator, None for a random seed
+        """
+        self.first_number, self.second_number, self.over, self.probability = _enumerate()
+        self.tens = self.second_number // 10
+        self.units = self.second_number % 10
+        self.random = np.random.default_rng(seed)
+        self.__groups = {}
+
+        # the steps and the answers after every step, per level; zero where the exercise is already done
+        self.steps = {}
+        self.answers = {}
+        for level in LEVELS:
+            steps = _solution_steps(self.first_number, self.second_number, level)
+            self.steps[level] = steps
+            self.answers[level] = np.where(steps > 0, self.first_number[:, None] - np.cumsum(steps, axis=1), 0)
+
+    def __len__(self) -> int:
+        return len(self.first_number)
+
+    def seed(self, seed: int = None) -> None:
+        self.random = np.random.default_rng(seed)
+
+    def indices(self, over: bool = None, tens: int = None, units: int = None) -> np.ndarray:
+        """
+        :return: indices of the exercises with the given features (None for any)
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for values, wanted in ((self.over, over), (self.tens, tens), (self.units, units)):
+            if wanted is not None:
+                selected &= values == wanted
+        return np.flatnonzero(selected)
+
+    def sample(self, over: bool = None, tens: int = None, units: int = None) -> tuple:
+        """
+        :param over: whether the exercise goes past the tens
+        :param tens: number of tens of the second number
+        :param units: number of units of the second number
+        :return: (first_number, second_number) of a random exercise with these features
+        """
+        i = self.sample_index(over, tens, units)
+        return int(self.first_number[i]), int(self.second_number[i])
+
+    def sample_index(self, over: bool = None, tens: int = None, units: int = None) -> int:
+        indices, threshold, alias = self.__group(over, tens, units)
+        column = self.random.integers(len(indices))
+        return indices[column] if self.random.random() < threshold[column] else indices[alias[column]]
+
+    def sample_indices(self, count: int, over: bool = None, tens: int = None, units: int = None) -> np.ndarray:
+        """Vectorized sample_index: indices of count random exercises with the given features."""
+        indices, threshold, alias = self.__group(over, tens, units)
+        columns = self.random.integers(len(indices), size=count)
+        keep = self.random.random(count) < threshold[columns]
+        return indices[np.where(keep, columns, alias[columns])]
+
+    def batch(self, count: int, over=None, tens: int = None, units: int = None):
+        """
+        Draw many exercises at once.
+
+        :param count: number of exercises
+        :param over: True or False for all exercises, None for any, or a boolean array with a value per exercise
+        :param tens: number of tens of the second number, None for any
+        :param units: number of units of the second number, None for any
+        :return: ExerciseBatch
+        """
+        if isinstance(over, np.ndarray):
+            indices = np.where(over, self.sample_indices(count, True, tens, units),
+                               self.sample_indices(count, False, tens, units))
+        else:
+            indices = self.sample_indices(count, over, tens, units)
+        return ExerciseBatch(self, indices)
+
+    def __group(self, over, tens, units):
+        key = (over, tens, units)
+        group = self.__groups.get(key)
+        if group is None:
+            indices = self.indices(over, tens, units)
+            if not len(indices):
+                raise ValueError('There are no exercises with over=%s, tens=%s, units=%s' % key)
+            group = self.__groups[key] = (indices,) + _alias_table(self.probability[indices])
+        return group
+
+
+class ExerciseBatch:
+    """
+    Many exercises from an ExerciseCatalogue, as arrays with one value (or row) per exercise.
+
+    The arrays are only looked up in the catalogue when they are used.
+    """
+
+    def __init__(self, catalogue: ExerciseCatalogue, indices: np.ndarray):
+        self.catalogue = catalogue
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @property
+    def first_number(self) -> np.ndarray:
+        return self.catalogue.first_number[self.indices]
+
+    @property
+    def second_number(self) -> np.ndarray:
+        return self.catalogue.second_number[self.indices]
+
+    @property
+    def over(self) -> np.ndarray:
+        return self.catalogue.over[self.indices]
+
+    def steps(self, level: int) -> np.ndarray:
+        """:return: the steps of the level, MAX_STEPS per exercise padded with zeros"""
+        return self.catalogue.steps[level][self.indices]
+
+    def answers(self, level: int) -> np.ndarray:
+        """:return: the answer after every step of the level, padded with zeros"""
+        return self.catalogue.answers[level][self.indices]
+
+    def step_counts(self, level: int) -> np.ndarray:
+        return np.count_nonzero(self.steps(level), axis=1)
+
+    def worksheet(self, level: int) -> list:
+        """
+        :return: a line per exercise with the sum and the steps of the level, e.g. '73 - 28 = 45 (73 - 10 = 63, ...)'
+        """
+        lines = []
+        for first, second, steps, answers in zip(self.first_number.tolist(), self.second_number.tolist(),
+                                                 self.steps(level).tolist(), self.answers(level).tolist()):
+            previous = [first] + answers
+            worked = ', '.join('%d - %d = %d' % (previous[i], step, answers[i])
+                               for i, step in enumerate(steps) if step)
+            lines.append('%d - %d = %d (%s)' % (first, second, first - second, worked))
+        return lines
+
+
+CATALOGUE = ExerciseCatalogue()
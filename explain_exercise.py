@@ -1,64 +1,69 @@
-def explain_exercise(level=None, first_number=None, second_number=None):
-    over = (first_number % 10) < (second_number % 10)
+import json
+import os
+
+from solution_paths import solution_graph
+
+# explanations that were already made, per (level, first_number, second_number): as one text and as the separate
+# sentences (or steps of a few sentences) that the robot can say one after the other
+_explanations = {}
+_parts = {}
 
+
+def explain_exercise(level=None, first_number=None, second_number=None):
+    """
+    :return: the explanation of the exercise, made only the first time it is asked for
+    """
+    key = (level, first_number, second_number)
+    explanation = _explanations.get(key)
+    if explanation is None:
+        explanation = _explanations[key] = ' '.join(explanation_parts(level, first_number, second_number))
+    return explanation
+
+
+def explanation_parts(level=None, first_number=None, second_number=None):
+    """
+    :return: the sentences of the explanation of the exercise, see explain_exercise
+    """
+    key = (level, first_number, second_number)
+    parts = _parts.get(key)
+    if parts is None:
+        parts = _parts[key] = tuple(render_explanation(level, first_number, second_number))
+    return parts
+
+
+def render_explanation(level=None, first_number=None, second_number=None):
     number_of_units = second_number % 10
-    number_of_tens = int((second_number - number_of_units) / 10)
     first_nr_explanation = first_number
     second_nr_explanation = second_number
 
     explanation = ['Dit is hoe ik de som ' + str(first_nr_explanation) + ' min ' + str(second_nr_explanation) + ' op heb gelost. Ik moet van het getal ' + str(first_nr_explanation) + ' er ' + str(second_nr_explanation) + ' afhalen.']
 
-    if level == 1 or level == 2:
-        explanation.append('Ik begin met 10 eraf.')
-        explanation.append(str(first_nr_explanation) + ' min 10 is ' + str(first_nr_explanation - 10) + '.')
-        number_of_tens -= 1
-        first_nr_explanation -= 10
-
-        for i in range(number_of_tens):
-            explanation.append('Dan haal ik er nog een keer 10 van af.')
-            explanation.append(str(first_nr_explanation) + ' min 10 is ' + str(first_nr_explanation - 10) + '.')
-            first_nr_explanation -= 10
-
-        if number_of_units == 1:
-            explanation.append('Dan heb ik alle tientallen eraf gehaald. Nu de eenheden. Dat is er ' + str(number_of_units) + '.')
-        else:
-            explanation.append('Dan heb ik alle tientallen eraf gehaald. Nu de eenheden. Dat zijn er ' + str(number_of_units)  + '.')
-
-        if over:
-            units_first_number = first_number % 10
-            units_to_go_under = number_of_units - units_first_number
-
-            explanation.append('Ik spring eerst van ' + str(first_nr_explanation) + ' naar het tiental. Dus haal ik er eerst ' + str(units_first_number) + ' af.')
-            explanation.append(str(first_nr_explanation) + ' min ' + str(units_first_number) + ' is ' + str(first_nr_explanation - units_first_number) + '.')
-
-            first_nr_explanation -= units_first_number
-
-            explanation.append('Van de ' + str(number_of_units) + ' heb ik er nu ' + str(units_first_number) + ' afgehaald. Nu moeten er dus nog ' + str(units_to_go_under) + ' af.')
-            explanation.append(str(first_nr_explanation) + ' min ' + str(units_to_go_under) + ' is ' + str(first_nr_explanation - units_to_go_under) + '.')
-
-            first_nr_explanation -= units_to_go_under
-
+    if level in (1, 2, 3, 4):
+        #the robot explains the usual steps of the level, see solution_paths.py
+        path = solution_graph(first_number, second_number, level).usual_path()
+        tens_steps = [step for step, action_level in path if action_level.endswith('tens')]
+        units_steps = [step for step, action_level in path if action_level.endswith('units')]
+
+        for i, step in enumerate(tens_steps):
+            if level == 1 or level == 2:
+                if i == 0:
+                    explanation.append('Ik begin met 10 eraf.')
+                else:
+                    explanation.append('Dan haal ik er nog een keer 10 van af.')
+            else:
+                explanation.append('Ik begin met de tientallen. Dat is ' + str(step) + '.')
+            explanation.append(str(first_nr_explanation) + ' min ' + str(step) + ' is ' + str(first_nr_explanation - step) + '.')
+            first_nr_explanation -= step
+
+        units_word = 'is' if number_of_units == 1 else 'zijn'
+        if level == 4:
+            explanation.append('Daarna haal ik de eenheden eraf. Dat ' + units_word + ' er ' + str(number_of_units) + '.')
         else:
-            explanation.append(str(first_nr_explanation) + ' min ' + str(number_of_units) + ' is ' + str(first_nr_explanation - number_of_units) + '.')
-
-            first_nr_explanation -= number_of_units
-
+            explanation.append('Dan heb ik alle tientallen eraf gehaald. Nu de eenheden. Dat ' + units_word + ' er ' + str(number_of_units) + '.')
 
-
-    if level == 3:
-        explanation.append('Ik begin met de tientallen. Dat is ' + str(number_of_tens * 10) + '.')
-        explanation.append(str(first_nr_explanation) + ' min ' + str(number_of_tens * 10) + ' is ' + str(first_nr_explanation - (number_of_tens * 10)) + '.')
-
-        first_nr_explanation -= (number_of_tens * 10)
-
-        if number_of_units == 1:
-            explanation.append('Dan heb ik alle tientallen eraf gehaald. Nu de eenheden. Dat is er ' + str(number_of_units) + '.')
-        else:
-            explanation.append('Dan heb ik alle tientallen eraf gehaald. Nu de eenheden. Dat zijn er ' + str(number_of_units)  + '.')
-
-        if over:
-            units_first_number = first_number % 10
-            units_to_go_under = number_of_units - units_first_number
+        #splitting the units, to get to a ten
+        if len(units_steps) == 2:
+            units_first_number, units_to_go_under = units_steps
 
             explanation.append('Ik spring eerst van ' + str(first_nr_explanation) + ' naar het tiental. Dus haal ik er eerst ' + str(units_first_number) + ' af.')
             explanation.append(str(first_nr_explanation) + ' min ' + str(units_first_number) + ' is ' + str(first_nr_explanation - units_first_number) + '.')
@@ -70,32 +75,40 @@ def explain_exercise(level=None, first_number=None, second_number=None):
 
             first_nr_explanation -= units_to_go_under
 
+        #all units at once
         else:
-            explanation.append(str(first_nr_explanation) + ' min ' + str(number_of_units) + ' is ' + str(first_nr_explanation - number_of_units) + '.')
-
-            first_nr_explanation -= number_of_units
-
-
+            for step in units_steps:
+                minus = ' eraf ' if level == 4 else ' min '
+                explanation.append(str(first_nr_explanation) + minus + str(step) + ' is ' + str(first_nr_explanation - step) + '.')
 
-    if level == 4:
-        explanation.append('Ik begin met de tientallen. Dat is ' + str(number_of_tens * 10) + '.')
-        explanation.append(str(first_nr_explanation) + ' min ' + str(number_of_tens * 10) + ' is ' + str(first_nr_explanation - (number_of_tens * 10)) + '.')
-
-        first_nr_explanation -= (number_of_tens * 10)
+                first_nr_explanation -= step
 
+    explanation.append('Het antwoord is dus ' + str(first_nr_explanation) + '.')
 
-        if number_of_units == 1:
-            explanation.append('Daarna haal ik de eenheden eraf. Dat is er ' + str(number_of_units) + '.')
-        else:
-            explanation.append('Daarna haal ik de eenheden eraf. Dat zijn er ' + str(number_of_units) + '.')
 
-        explanation.append(str(first_nr_explanation) + ' eraf ' + str(number_of_units) + ' is ' + str(first_nr_explanation - number_of_units) + '.')
 
-        first_nr_explanation -= number_of_units
+    return explanation
 
 
-    explanation.append('Het antwoord is dus ' + str(first_nr_explanation) + '.')
+def precompute(levels=(1, 2, 3, 4), path=None):
+    """
+    Make the explanations of all exercises in the catalogue, so explain_exercise only has to look them up.
 
+    :param levels: levels to make the explanations for
+    :param path: JSON file to load the explanations from; when it does not exist yet, they are made and saved there
+    """
+    if path and os.path.isfile(path):
+        with open(path) as file:
+            for level, first_number, second_number, parts in json.load(file):
+                _parts[(level, first_number, second_number)] = tuple(parts)
+                _explanations[(level, first_number, second_number)] = ' '.join(parts)
+        return
 
+    from exercise_catalogue import CATALOGUE
+    for level in levels:
+        for first_number, second_number in zip(CATALOGUE.first_number.tolist(), CATALOGUE.second_number.tolist()):
+            explain_exercise(level, first_number, second_number)
 
-    return ' '.join(explanation)
+    if path:
+        with open(path, 'w') as file:
+            json.dump([list(key) + [list(parts)] for key, parts in _parts.items()], file)
@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lesson_metrics import SUMMARY
+from log_index import LogIndex
+
+# Session logs, also the rotated ones: <student>.log, <student>.log.1.gz, ...
+LOG_NAME = re.compile(r'^(?P<student>.+)\.log(\.\d+\.gz)?$')
+
+CACHE_DIRECTORY = '.analytics_cache'
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_log(path: str) -> dict:
+    """
+    :return: the session and exercise columns of the log (see LogIndex), as 'sessions.<column>' and
+    'exercises.<column>'
+    """
+    index = LogIndex(path)
+    index.update()
+    tables = {'sessions.' + name: column for name, column in index.sessions.items()}
+    tables.update(('exercises.' + name, column) for name, column in index.exercises.items())
+    return tables
+
+
+def load_logs(directory: str, cache_directory: str = None, workers: int = None) -> tuple:
+    """
+    Index all session logs in the directory, on a pool of processes. The tables of every log are cached by the hash of
+    the file, so only new and changed logs are read again.
+
+    :param directory: directory with the logs
+    :param cache_directory: directory of the cache, <directory>/.analytics_cache by default
+    :param workers: number of processes, the number of CPUs by default
+    :return: the sessions of all logs (columns of the LogIndex, with student added) and the number of logs that were
+    read (not cached)
+    """
+    cache_directory = cache_directory or os.path.join(directory, CACHE_DIRECTORY)
+    os.makedirs(cache_directory, exist_ok=True)
+
+    logs = []
+    for name in sorted(os.listdir(directory)):
+        match = LOG_NAME.match(name)
+        path = os.path.join(directory, name)
+        if match and os.path.isfile(path):
+            logs.append((match.group('student'), path, os.path.join(cache_directory, file_hash(path) + '.npz')))
+
+    changed = {path: cache_path for _, path, cache_path in logs if not os.path.isfile(cache_path)}
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for path, tables in zip(changed, executor.map(index_log, changed, chunksize=max(1, len(changed) // 32))):
+                np.savez(changed[path], **tables)
+
+    parts = []
+    for student, path, cache_path in logs:
+        with np.load(cache_path) as data:
+            sessions = {name[len('sessions.'):]: data[name] for name in data.files if name.startswith('sessions.')}
+        sessions['student'] = np.full(len(sessions['offset']), student)
+        parts.append(sessions)
+    if not parts:
+        return {}, 0
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}, len(changed)
+
+
+def analyse(sessions: dict) -> dict:
+    """
+    :param sessions: sessions as returned by load_logs
+    :return: per student the sessions in order with their correct rate and the trend of it (change per session), and
+    for the whole cohort the totals of the summary counters, the correct rate per level and per day
+    """
+    if not sessions or not len(sessions['offset']):
+        return {'students': {}, 'cohort': {'students': 0, 'sessions': 0, 'exercises': 0}}
+    done = sessions['exercises'] > 0
+    sessions = {name: column[done] for name, column in sessions.items()}
+    correct = sessions['times_finished_sum_correct']
+    exercises = sessions['exercises']
+    rate = correct / np.maximum(exercises, 1)
+    days = (sessions['start'] // 86400).astype(np.int64)
+
+    students = {}
+    for student in np.unique(sessions['student']).tolist():
+        rows = np.flatnonzero(sessions['student'] == student)
+        rows = rows[np.argsort(sessions['start'][rows], kind='stable')]
+        trend = float(np.polyfit(np.arange(len(rows)), rate[rows], 1)[0]) if len(rows) > 1 else None
+        students[student] = {
+            'sessions': len(rows),
+            'exercises': int(exercises[rows].sum()),
+            'level': int(sessions['level'][rows[-1]]),
+            'correct_rate': [round(float(value), 3) for value in rate[rows]],
+            'trend': round(trend, 4) if trend is not None else None,
+            'mean_per_session': {name: round(float(sessions[name][rows].mean()), 2) for name, _ in SUMMARY
+                                 if name != 'number_of_exercises_done'},
+        }
+
+    def correct_rate(selection):
+        return round(float(correct[selection].sum() / max(exercises[selection].sum(), 1)), 3)
+
+    cohort = {
+        'students': len(students),
+        'sessions': int(len(exercises)),
+        'exercises': int(exercises.sum()),
+        'correct_rate': correct_rate(slice(None)),
+        'correct_rate_per_level': {int(level): correct_rate(sessions['level'] == level)
+                                   for level in np.unique(sessions['level']).tolist()},
+        'correct_rate_per_day': {time.strftime('%Y-%m-%d', time.gmtime(day * 86400)): correct_rate(days == day)
+                                 for day in np.unique(days).tolist()},
+        'totals': {label: int(exercises.sum()) if name == 'number_of_exercises_done' else int(sessions[name].sum())
+                   for name, label in SUMMARY},
+    }
+    return {'students': students, 'cohort': cohort}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Statistics of all session logs in a directory.')
+    parser.add_argument('directory', help='directory with the session logs (<student>.log)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default=None, help='directory of the cache, <directory>/.analytics_cache by default')
+    parser.add_argument('--json', default=None, help='write the statistics to this file')
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    sessions, read = load_logs(arguments.directory, arguments.cache, arguments.workers)
+    statistics = analyse(sessions)
+    cohort = statistics['cohort']
+
+    for student, result in statistics['students'].items():
+        print('%s: %d sessions, %d exercises, level %d, correct rate %s, trend %s' % (
+            student, result['sessions'], result['exercises'], result['level'], result['correct_rate'][-1],
+            result['trend']))
+    print('')
+    print('%d students, %d sessions, %d exercises' % (cohort['students'], cohort['sessions'], cohort['exercises']))
+    if cohort['sessions']:
+        print('Correct rate: %s, per level: %s' % (cohort['correct_rate'], cohort['correct_rate_per_level']))
+        for label, total in cohort['totals'].items():
+            print('- %s: %s' % (label, total))
+    print('%d logs read, the rest from the cache, in %.2f s' % (read, time.perf_counter() - start))
+
+    if arguments.json:
+        with open(arguments.json, 'w') as file:
+            json.dump(statistics, file, indent=2)
@@ -0,0 +1,119 @@
+import json
+import os
+
+
+class Checkpoint:
+    """
+    Keeps the state of a session on disk, so that it can be resumed after a crash.
+
+    The state is a flat dict of JSON values. save() only appends the keys that changed since the previous save to a
+    journal (<path>.journal), one JSON line per save; lists that only grew are stored as the new items. Every
+    compact_every saves, the whole state is written to <path> and the journal is emptied. The snapshot is written to a
+    temporary file first and then moved over the old one, so there is always one complete snapshot. Every save is
+    numbered, so journal lines that are already part of the snapshot are skipped by load(), as is a line that was only
+    half written when the process stopped.
+    """
+
+    def __init__(self, path: str, compact_every: int = 25):
+        """
+        :param path: file of the snapshot, the journal is written next to it
+        :param compact_every: number of saves after which the journal is merged into the snapshot
+        """
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.compact_every = compact_every
+        self.state = {}
+        self.__saves = 0
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        :return: the last saved state, or None when there is no checkpoint
+        """
+        number, state = _read(path)
+        return state
+
+    @classmethod
+    def resume(cls, path: str, compact_every: int = 25):
+        """
+        :return: a Checkpoint that continues from the state saved at path
+        """
+        checkpoint = cls(path, compact_every)
+        checkpoint.__saves, state = _read(path)
+        checkpoint.state = state or {}
+        if state is not None:
+            # start from a clean snapshot, without a half written line at the end of the journal
+            checkpoint.compact()
+        return checkpoint
+
+    def save(self, state: dict) -> None:
+        """
+        :param state: the full state of the session; only what changed is written
+        """
+        delta = {}
+        for key, value in state.items():
+            previous = self.state.get(key)
+            if key in self.state and previous == value:
+                continue
+            if isinstance(value, list) and isinstance(previous, list) and value[:len(previous)] == previous:
+                delta[key + '+'] = value[len(previous):]
+            else:
+                delta[key] = value
+        for key in self.state.keys() - state.keys():
+            delta[key + '-'] = None
+
+        self.state = json.loads(json.dumps(state))
+        self.__saves += 1
+        if self.__saves % self.compact_every == 0:
+            self.compact()
+        elif delta:
+            with open(self.journal_path, 'a') as journal:
+                journal.write(json.dumps([self.__saves, delta], separators=(',', ':')) + '\n')
+
+    def compact(self) -> None:
+        """Write the whole state to the snapshot and empty the journal."""
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as snapshot:
+            json.dump({'number': self.__saves, 'state': self.state}, snapshot, separators=(',', ':'))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary_path, self.path)
+        if os.path.isfile(self.journal_path):
+            os.remove(self.journal_path)
+
+    def clear(self) -> None:
+        """Remove the checkpoint, e.g. when the session has ended normally."""
+        for path in (self.path, self.journal_path):
+            if os.path.isfile(path):
+                os.remove(path)
+        self.state = {}
+
+
+def _read(path: str):
+    number, state = 0, None
+    if os.path.isfile(path):
+        with open(path) as snapshot:
+            data = json.load(snapshot)
+        number, state = data['number'], data['state']
+    if os.path.isfile(path + '.journal'):
+        state = state if state is not None else {}
+        with open(path + '.journal') as journal:
+            for line in journal:
+                try:
+                    line_number, delta = json.loads(line)
+                except ValueError:
+                    break
+                if line_number > number:
+                    _apply(state, delta)
+                    number = line_number
+    return number, state
+
+
+def _apply(state: dict, delta: dict) -> None:
+    for key, value in delta.items():
+        if key.endswith('+'):
+            state[key[:-1]].extend(value)
+        elif key.endswith('-'):
+            state.pop(key[:-1], None)
+        else:
+            state[key] = value
@@ -0,0 +1,79 @@
+import gzip
+import logging
+import os
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+
+LOG_FORMAT = '%(asctime)s %(message)s'
+DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+
+def _gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, 'rb') as plain, gzip.open(dest, 'wb') as compressed:
+        shutil.copyfileobj(plain, compressed)
+    os.remove(source)
+
+
+class SessionLog:
+    """
+    Log of one lesson session that never blocks the thread that logs.
+
+    Records are put on a queue by the lesson thread (and by the pubsub thread, in the speech recognition callbacks) and
+    written to <student>.log by a background thread. When the file grows past max_bytes it is rotated to
+    <student>.log.1.gz, <student>.log.2.gz, ... and the rotated files are compressed, also on the background thread.
+    stop() writes everything that is still on the queue before it returns.
+    """
+
+    def __init__(self, student: str, directory: str = '.', max_bytes: int = 1000000, backup_count: int = 5):
+        """
+        :param student: name of the student, used for the name of the logger and of the file
+        :param directory: directory the log files are written to
+        :param max_bytes: size at which the log file is rotated
+        :param backup_count: number of compressed old log files that are kept
+        """
+        self.path = os.path.join(directory, student + '.log')
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.logger = logging.getLogger('lesson.' + student)
+        self.__queue = SimpleQueue()
+        self.__queue_handler = None
+        self.__listener = None
+
+    def start(self) -> logging.Logger:
+        """
+        Start the background writer and connect the logger to it.
+
+        :return: the logger of the session
+        """
+        if self.__listener:
+            return self.logger
+
+        file_handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                                           delay=True)
+        file_handler.namer = _gzip_namer
+        file_handler.rotator = _gzip_rotator
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+        self.__listener = QueueListener(self.__queue, file_handler)
+        self.__queue_handler = QueueHandler(self.__queue)
+        self.logger.addHandler(self.__queue_handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.__listener.start()
+        return self.logger
+
+    def stop(self) -> None:
+        """Write the records that are still queued, then close the file."""
+        if not self.__listener:
+            return
+        self.logger.removeHandler(self.__queue_handler)
+        self.__listener.stop()
+        for handler in self.__listener.handlers:
+            handler.close()
+        self.__listener = None
+        self.__queue_handler = None
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from code_exercise import Exercise
+from explain_exercise import explanation_parts
+from utterance_templates import TEMPLATES
+
+ANNOUNCEMENT = TEMPLATES.register('announcement', 'De som die we nu gaan doen is {first_number} min {second_number}')
+
+
+class PreparedExercise:
+    """An exercise with everything the robot says about it that does not depend on the answers of the student."""
+
+    def __init__(self, level: int, exercise: Exercise, over: bool):
+        """
+        :param level: level of the student, needed for the explanation
+        :param exercise: the generated exercise
+        :param over: whether the exercise goes past the tens
+        """
+        self.over = over
+        self.exercise = exercise
+        self.announcement = ANNOUNCEMENT.render({'first_number': self.exercise.first_number,
+                                                 'second_number': self.exercise.second_number})
+        # the sentences of the explanation, said one after the other (see SpeechStream)
+        self.explanation = list(explanation_parts(level, first_number=self.exercise.first_number,
+                                                  second_number=self.exercise.second_number))
+
+
+class Lookahead:
+    """
+    Prepares the next exercise on a background thread while the student is still answering the current one.
+
+    Whether the next exercise goes past the tens depends on how the current exercise ends, so both versions are
+    prepared. take() returns the one that is needed and cancels (or discards) the other. The numbers of both exercises
+    are drawn on the calling thread, so a seeded catalogue always gives the same exercises; only the sentences are
+    made in the background.
+    """
+
+    def __init__(self, level: int):
+        """
+        :param level: level of the student, needed for the explanation
+        """
+        self.level = level
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lookahead')
+        self.__branches = {}
+
+    def prepare(self) -> None:
+        """Start preparing the next exercise, for both outcomes of the current one."""
+        self.__discard()
+        for over in (True, False):
+            self.__branches[over] = self.__executor.submit(PreparedExercise, self.level, _generate(over), over)
+
+    def take(self, over: bool) -> PreparedExercise:
+        """
+        :param over: whether the next exercise should go past the tens
+        :return: the prepared exercise, waiting for it if it is not ready yet
+        """
+        future = self.__branches.pop(over, None)
+        self.__discard()
+        if future is None:
+            return PreparedExercise(self.level, _generate(over), over)
+        return future.result()
+
+    def close(self) -> None:
+        self.__discard()
+        self.__executor.shutdown(wait=False)
+
+    def __discard(self) -> None:
+        for future in self.__branches.values():
+            future.cancel()
+        self.__branches = {}
+
+
+def _generate(over: bool) -> Exercise:
+    exercise = Exercise()
+    exercise.generate_exercise(over=over)
+    return exercise
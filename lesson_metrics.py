@@ -0,0 +1,158 @@
+import json
+
+from social_interaction_cloud.clock import Clock, SystemClock
+
+# Counters of a session, with the description used in the summary at the end of the session log
+SUMMARY = [
+    ('number_of_exercises_done', 'Number of exercises done'),
+    ('times_finished_sum_correct', 'Times finished sum correctly'),
+    ('times_finished_sum_incorrect', 'Times student did not finish the sum'),
+    ('times_asked_for_explanation', 'Times asked for explanation'),
+    ('times_tried_sum_again', 'Times tried sum again'),
+    ('mistake_in_tens', 'Times student made mistake in tens'),
+    ('end_in_tens', 'Times student stranded while doing the tens'),
+    ('mistake_in_units', 'Times student made mistake in units'),
+    ('end_in_units', 'Times student stranded while doing the units'),
+    ('mistake_in_step', 'Times student made mistake in step'),
+    ('end_in_step', 'Times student stranded while giving a steps'),
+    ('mistake_in_answer', 'Times student made mistake in answer'),
+    ('end_in_answer', 'Times student stranded while giving an answer'),
+    ('robot_did_not_hear_number', 'Times the robot did not hear the student'),
+    ('bigger_steps_than_level_tens', 'Exercises where student took bigger steps in tens than level'),
+    ('bigger_steps_than_level_units', 'Exercises where student took bigger steps in units than level'),
+    ('steps_on_level_tens', 'Exercises where student took steps on level in tens'),
+    ('steps_on_level_units', 'Exercises where student took steps on level in units'),
+    ('smaller_steps_than_level_tens', 'Exercises where student took smaller steps in tens than level'),
+    ('smaller_steps_than_level_units', 'Exercises where student took smaller steps in units than level'),
+]
+
+COUNTERS = tuple(name for name, _ in SUMMARY if name != 'number_of_exercises_done')
+
+# Columns of an exercise record, in the order they are written
+COLUMNS = ('student', 'level', 'index', 'first_number', 'second_number', 'over', 'started', 'duration', 'inputs',
+           'latencies', 'counts', 'outcome')
+
+
+class SessionMetrics:
+    """
+    Counters and per-exercise records of one lesson session.
+
+    Every exercise becomes one record with the numbers of the sum, the steps and answers the student gave, how long
+    the student took for each of them, the counters that were incremented and the outcome. Records are kept in a
+    buffer and written to a JSON lines file in bulk, one line per exercise. The totals of the session are computed from
+    the records.
+
+    The first line of the file holds the column names (COLUMNS), every next line the values of one exercise.
+    """
+
+    def __init__(self, student: str, level: int, path: str = None, buffer_size: int = 20, clock: Clock = None):
+        """
+        :param student: name of the student
+        :param level: level of the student
+        :param path: JSON lines file the records are appended to, None to keep them in memory only
+        :param buffer_size: number of records that are buffered before they are written
+        :param clock: clock for the start and duration of exercises, the system clock by default
+        """
+        self.student = student
+        self.level = level
+        self.path = path
+        self.buffer_size = buffer_size
+        self.clock = clock if clock else SystemClock()
+        self.records = []
+        self.current = None
+        # counters that were incremented outside of an exercise, e.g. during the introduction
+        self.session_counts = {}
+        # number of records that were written to the file
+        self.flushed = 0
+        self.__buffer = []
+
+    @property
+    def number_of_exercises_done(self) -> int:
+        return len(self.records)
+
+    def start_exercise(self, first_number: int, second_number: int, over: bool) -> None:
+        self.current = {'student': self.student, 'level': self.level, 'index': len(self.records),
+                        'first_number': first_number, 'second_number': second_number, 'over': over,
+                        'started': self.clock.time(), 'duration': None, 'inputs': [], 'latencies': [], 'counts': {},
+                        'outcome': None}
+
+    def count(self, name: str) -> None:
+        """Increment a counter (see COUNTERS) for the current exercise."""
+        if name not in COUNTERS:
+            raise ValueError('Unknown counter: ' + name)
+        counts = self.current['counts'] if self.current else self.session_counts
+        counts[name] = counts.get(name, 0) + 1
+
+    def record_input(self, kind: str, value, accepted: bool) -> None:
+        """
+        :param kind: 'step', 'answer' or 'choice'
+        :param value: what the student gave
+        :param accepted: whether it was correct
+        """
+        if self.current:
+            self.current['inputs'].append([kind, value, accepted])
+
+    def record_latency(self, seconds: float) -> None:
+        """Time the student took before pressing the robot's feet to give a step or answer."""
+        if self.current:
+            self.current['latencies'].append(round(seconds, 3))
+
+    def end_exercise(self, outcome: str) -> dict:
+        """
+        :param outcome: 'correct' or 'incorrect'
+        :return: the record of the exercise
+        """
+        record = self.current
+        record['duration'] = round(self.clock.time() - record['started'], 3)
+        record['outcome'] = outcome
+        self.records.append(record)
+        self.current = None
+
+        self.__buffer.append(record)
+        if len(self.__buffer) >= self.buffer_size:
+            self.flush()
+        return record
+
+    def totals(self) -> dict:
+        totals = dict.fromkeys(COUNTERS, 0)
+        totals['number_of_exercises_done'] = len(self.records)
+        for counts in [self.session_counts] + [record['counts'] for record in self.records]:
+            for name, value in counts.items():
+                totals[name] += value
+        return totals
+
+    def summary(self) -> dict:
+        """
+        :return: the totals of all counters, plus the mean time the student took to give a step or answer
+        """
+        summary = self.totals()
+        latencies = [latency for record in self.records for latency in record['latencies']]
+        summary['mean_latency'] = round(sum(latencies) / len(latencies), 3) if latencies else None
+        return summary
+
+    def flush(self) -> None:
+        """Write the buffered records to the file in one go."""
+        if self.path and self.__buffer:
+            lines = ''.join(json.dumps([record[column] for column in COLUMNS]) + '\n' for record in self.__buffer)
+            with open(self.path, 'a') as file:
+                if file.tell() == 0:
+                    file.write(json.dumps(COLUMNS) + '\n')
+                file.write(lines)
+            self.flushed += len(self.__buffer)
+        self.__buffer = []
+
+    def to_dict(self) -> dict:
+        return {'records': self.records, 'current': self.current, 'session_counts': self.session_counts,
+                'flushed': self.flushed}
+
+    @classmethod
+    def from_dict(cls, data: dict, student: str, level: int, path: str = None, buffer_size: int = 20,
+                  clock: Clock = None):
+        metrics = cls(student, level, path, buffer_size, clock)
+        metrics.records = data['records']
+        metrics.current = data['current']
+        metrics.session_counts = data['session_counts']
+        metrics.flushed = data['flushed']
+        # records that were not written before the session stopped
+        metrics.__buffer = metrics.records[metrics.flushed:]
+        return metrics
@@ -0,0 +1,116 @@
+import logging
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from code_lesson import Lesson
+from social_interaction_cloud.abstract_connector import SICTransport
+
+
+class LessonServer:
+    """
+    Runs the lessons of a whole classroom in one process, one Lesson per robot (and student).
+
+    Every lesson has its own connector, log and counters, but all connectors share one SICTransport (one Redis
+    connection and one pubsub thread). The lessons run on a bounded pool of worker threads: when there are more sessions
+    than workers, the remaining sessions start as soon as a worker is free.
+    """
+
+    def __init__(self, server_ip, dialogflow_language, dialogflow_key_file, dialogflow_agent_id, max_workers=4, transport=None):
+        """
+        :param server_ip: IP address of Social Interaction Cloud server
+        :param dialogflow_language: the full language key to use in Dialogflow (e.g. nl-NL)
+        :param dialogflow_key_file: path to Google's Dialogflow key file (JSON)
+        :param dialogflow_agent_id: ID number of Dialogflow agent to be used (project ID)
+        :param max_workers: maximum number of lessons that run at the same time
+        :param transport: optional transport to use, by default a connection to server_ip is made
+        """
+        self.server_ip = server_ip
+        self.dialogflow_language = dialogflow_language
+        self.dialogflow_key_file = dialogflow_key_file
+        self.dialogflow_agent_id = dialogflow_agent_id
+        self.max_workers = max_workers
+        self.transport = transport if transport else SICTransport.connect(server_ip)
+        self.sessions = []
+
+    def add_session(self, student, devices, level=1, profiler=None):
+        """
+        Add a lesson for one student.
+
+        :param student: name of the student, also used as the name of the log file
+        :param devices: devices of the robot of this student, e.g. {'mic': ['user-nao1'], 'robot': ['user-nao1'], ...}
+        :param level: level of the student
+        :param profiler: optional profiler of this lesson, see social_interaction_cloud/profiling.py
+        :return: the Lesson
+        """
+        lesson = Lesson(self.server_ip, self.dialogflow_language, self.dialogflow_key_file, self.dialogflow_agent_id,
+                        level=level, student=student, transport=self.transport, devices=devices,
+                        profiler=profiler)
+        self.sessions.append({'student': student, 'lesson': lesson, 'status': 'waiting',
+                              'cpu_seconds': 0.0, 'wall_seconds': 0.0})
+        return lesson
+
+    def run(self):
+        """
+        Run all lessons and wait until they are finished.
+
+        :return: the report (see report())
+        """
+        self.transport.start()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='lesson') as executor:
+            wait([executor.submit(self.__run_session, session) for session in self.sessions])
+        self.transport.stop()
+        return self.report()
+
+    def report(self):
+        """
+        Resource usage per session. CPU time is measured on the thread that runs the lesson (callbacks on the shared
+        pubsub thread are not included). Python threads share one heap, so memory is reported for the whole process.
+
+        :return: list with a dict per session
+        """
+        max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return [{'student': session['student'],
+                 'status': session['status'],
+                 'level': session['lesson'].level,
+                 'exercises': session['lesson'].metrics.number_of_exercises_done if hasattr(session['lesson'], 'metrics') else 0,
+                 'cpu_seconds': round(session['cpu_seconds'], 3),
+                 'wall_seconds': round(session['wall_seconds'], 3),
+                 'process_max_rss_kb': max_rss_kb}
+                for session in self.sessions]
+
+    @staticmethod
+    def __run_session(session):
+        session['status'] = 'running'
+        start_wall = time.time()
+        start_cpu = time.thread_time()
+        try:
+            session['lesson'].run()
+            session['status'] = 'done'
+        except Exception as err:
+            logging.exception('Lesson of %s failed', session['student'])
+            session['status'] = 'failed: ' + repr(err)
+            session['lesson'].stop()
+        finally:
+            session['cpu_seconds'] = time.thread_time() - start_cpu
+            session['wall_seconds'] = time.time() - start_wall
+
+
+if __name__ == '__main__':
+
+### ### Change before each session: ### ###
+
+    server = LessonServer('127.0.0.1',
+                          'nl-NL',
+                          'math-tutor-n9yf-5f3ba0e72a70.json',
+                          'math-tutor-n9yf',
+                          max_workers=4)
+
+    #one session per robot: name of the student (and log file), devices of the robot and level of the student
+    server.add_session('student_a', {'cam': ['default-nao1'], 'mic': ['default-nao1'], 'robot': ['default-nao1'], 'speaker': ['default-nao1']}, level=1)
+    server.add_session('student_b', {'cam': ['default-nao2'], 'mic': ['default-nao2'], 'robot': ['default-nao2'], 'speaker': ['default-nao2']}, level=2)
+
+### ### End change before each session  ### ###
+
+    for row in server.run():
+        print(row)
@@ -0,0 +1,278 @@
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from code_lesson import FEET, HEAD, Lesson
+from exercise_catalogue import CATALOGUE
+from solution_paths import solution_graph
+from social_interaction_cloud.clock import SimulatedClock
+from social_interaction_cloud.profiling import NO_PROFILER
+
+# Rules for choosing whether the next exercise goes past the tens
+OVER_RULES = {
+    'after_correct': lambda lesson: lesson.previous_exercise_correct,
+    'always': lambda lesson: True,
+    'never': lambda lesson: False,
+    'alternate': lambda lesson: lesson.metrics.number_of_exercises_done % 2 == 0,
+}
+
+# Seconds the robot takes to say one word
+SECONDS_PER_WORD = 0.4
+
+
+class SimulatedIntent:
+    """What the simulated speech recognition gives to the intent callbacks, like a DetectedIntent."""
+
+    def __init__(self, intent: str, parameters: dict, text: str):
+        self.intent = intent
+        self.parameters = parameters
+        self.text = text
+        self.confidence = 1.0 if parameters else 0.0
+        self.source = 'simulator'
+
+
+class ScriptedStudent:
+    """
+    A student that answers at random.
+
+    When the robot listens, the student gives a correct step or answer with probability accuracy, otherwise a wrong
+    number; with probability not_heard the robot hears nothing. After a mistake, the student asks for the explanation
+    with probability explain, otherwise the student tries again.
+    """
+
+    def __init__(self, accuracy: float = 0.8, response_time: tuple = (3.0, 15.0), not_heard: float = 0.05,
+                 explain: float = 0.5, seed: int = None):
+        """
+        :param accuracy: chance that a step or answer is correct
+        :param response_time: minimum and maximum number of seconds before the student presses the feet
+        :param not_heard: chance that the robot does not recognize the number
+        :param explain: chance that the student chooses the explanation after a mistake
+        :param seed: seed of the random generator, for repeatable sessions
+        """
+        self.accuracy = accuracy
+        self.response_time = response_time
+        self.not_heard = not_heard
+        self.explain = explain
+        self.random = random.Random(seed)
+
+    def thinking_time(self) -> float:
+        return self.random.uniform(*self.response_time)
+
+    def chooses_explanation(self) -> bool:
+        return self.random.random() < self.explain
+
+    def number(self, lesson: Lesson):
+        """
+        :return: the step or answer for the current state of the exercise of the lesson, or None when the robot does
+        not hear it
+        """
+        if self.random.random() < self.not_heard:
+            return None
+        exercise = lesson.exercise
+        if lesson.machine.expecting == 'step':
+            graph = solution_graph(exercise.first_number, exercise.second_number, lesson.level)
+            correct = list(graph.steps(exercise.current_first, exercise.current_second))
+        else:
+            correct = [exercise.current_first]
+        if correct and self.random.random() < self.accuracy:
+            return self.random.choice(correct)
+        return self.random.choice([number for number in range(1, 100) if number not in correct])
+
+
+class SimulatedRobot:
+    """
+    Stands in for the BasicSICConnector of a Lesson. Every action is done at once, with the clock moved forward by the
+    time it would take on a real robot. The student responds through an idle hook of the SimulatedClock, whenever the
+    lesson waits for a touch.
+    """
+
+    def __init__(self, student: ScriptedStudent, profiler=None):
+        self.student = student
+        self.lesson = None
+        self.clock = SimulatedClock()
+        self.profiler = profiler if profiler else NO_PROFILER
+        self.clock.idle_hooks.append(self.__on_idle)
+        self.touch_listeners = {}
+        self.event_listeners = {}
+        self.sentences = 0
+
+    def __getattr__(self, action_name: str):
+        # actions without effect in the simulation, like set_eye_color, wake_up and rest
+        def action(*args, callback: callable = None):
+            if callback:
+                callback()
+        action.__name__ = action_name
+        return action
+
+    def say(self, text: str, callback: callable = None) -> None:
+        self.sentences += 1
+        listeners = self.event_listeners.get('TextStarted')
+        if listeners:
+            listeners.pop(0)()
+        self.clock.advance(len(text.split()) * SECONDS_PER_WORD)
+        if callback:
+            callback()
+
+    def do_gesture(self, gesture: str, callback: callable = None) -> None:
+        if callback:
+            callback()
+
+    def speech_recognition(self, context: str, max_duration: int, callback: callable = None) -> None:
+        self.clock.advance(1)
+        if context == 'answer_name':
+            intent = SimulatedIntent('answer_name', {'name': [{'name': 'Sim'}]}, 'Sim')
+        else:
+            number = self.student.number(self.lesson)
+            if number is None:
+                intent = SimulatedIntent('answer_sum', {}, '')
+            else:
+                intent = SimulatedIntent('answer_sum', {'number': float(number)}, str(number))
+        if callback:
+            callback(intent)
+
+    def subscribe_event_listener(self, event: str, callback: callable) -> None:
+        self.event_listeners.setdefault(event, []).append(callback)
+
+    def subscribe_touch_listener(self, touch_event: str, callback: callable) -> None:
+        self.touch_listeners[touch_event] = callback
+
+    def unsubscribe_touch_listener(self, touch_event: str) -> None:
+        self.touch_listeners.pop(touch_event, None)
+
+    def subscribe_tablet_listener(self, callback: callable) -> None:
+        pass
+
+    def unsubscribe_tablet_listener(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def __on_idle(self) -> None:
+        head = [event for event in HEAD if event in self.touch_listeners]
+        feet = [event for event in FEET if event in self.touch_listeners]
+        if head and feet:
+            # the choice after a mistake
+            self.clock.advance(self.student.random.uniform(1, 3))
+            touched = feet if self.student.chooses_explanation() else head
+        elif feet:
+            self.clock.advance(self.student.thinking_time())
+            touched = feet
+        elif head:
+            self.clock.advance(self.student.random.uniform(1, 3))
+            touched = head
+        else:
+            return
+        self.touch_listeners[touched[0]]()
+
+
+class SimulatedLesson(Lesson):
+    """A Lesson with a SimulatedRobot, that uses one of the OVER_RULES."""
+
+    def __init__(self, robot: SimulatedRobot, level: int, over_rule: str, student: str, directory: str,
+                 duration_lesson: int, seed: int = None):
+        super(SimulatedLesson, self).__init__(None, None, None, None, level=level, student=student, sic=robot,
+                                              directory=directory, duration_lesson=duration_lesson, seed=seed)
+        robot.lesson = self
+        self.over_rule = OVER_RULES[over_rule]
+
+    def next_over(self):
+        return self.over_rule(self)
+
+
+def simulate_session(settings: dict) -> dict:
+    """
+    Run one lesson from start to end.
+
+    :param settings: level, over_rule, duration_lesson, seed and the settings of the ScriptedStudent
+    :return: the summary of the SessionMetrics of the lesson, with the settings
+    """
+    student = ScriptedStudent(accuracy=settings['accuracy'], response_time=settings['response_time'],
+                              not_heard=settings['not_heard'], explain=settings['explain'], seed=settings['seed'])
+    robot = SimulatedRobot(student)
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        random.seed(settings['seed'])
+        CATALOGUE.seed(settings['seed'])
+        lesson = SimulatedLesson(robot, settings['level'], settings['over_rule'], 'sim_%d' % settings['seed'],
+                                 directory, settings['duration_lesson'], settings['seed'])
+        lesson.run()
+    summary = lesson.metrics.summary()
+    summary['correct_exercises'] = sum(record['outcome'] == 'correct' for record in lesson.metrics.records)
+    summary['over_exercises'] = sum(record['over'] for record in lesson.metrics.records)
+    summary['sentences'] = robot.sentences
+    summary.update(level=settings['level'], over_rule=settings['over_rule'])
+    return summary
+
+
+def aggregate(summaries: list) -> dict:
+    """
+    :return: per level and over rule: the number of sessions and the mean of every statistic per session
+    """
+    groups = {}
+    for summary in summaries:
+        groups.setdefault((summary['level'], summary['over_rule']), []).append(summary)
+    result = {}
+    for (level, over_rule), group in sorted(groups.items()):
+        means = {}
+        for name, value in group[0].items():
+            if name in ('level', 'over_rule'):
+                continue
+            values = [summary[name] for summary in group if summary[name] is not None]
+            means[name] = round(sum(values) / len(values), 3) if values else None
+        exercises = sum(summary['number_of_exercises_done'] for summary in group)
+        means['correct_rate'] = round(sum(summary['correct_exercises'] for summary in group) / exercises, 3) \
+            if exercises else None
+        result['level %s, %s' % (level, over_rule)] = dict(sessions=len(group), **means)
+    return result
+
+
+def simulate(sessions: int, levels: list, over_rules: list, workers: int = None, duration_lesson: int = 20 * 60,
+             accuracy: float = 0.8, response_time: tuple = (3.0, 15.0), not_heard: float = 0.05, explain: float = 0.5,
+             seed: int = 0) -> dict:
+    """
+    Simulate the given number of sessions for every combination of level and over rule, on a pool of processes.
+
+    :return: the aggregate statistics (see aggregate), the number of sessions and the sessions per second
+    """
+    settings = [{'level': level, 'over_rule': over_rule, 'duration_lesson': duration_lesson, 'accuracy': accuracy,
+                 'response_time': response_time, 'not_heard': not_heard, 'explain': explain,
+                 'seed': seed + len(levels) * len(over_rules) * i + j}
+                for i in range(sessions)
+                for j, (level, over_rule) in enumerate((level, over_rule) for level in levels
+                                                       for over_rule in over_rules)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summaries = list(executor.map(simulate_session, settings, chunksize=max(1, len(settings) // 64)))
+    seconds = time.perf_counter() - start
+    return {'statistics': aggregate(summaries), 'sessions': len(summaries),
+            'sessions_per_second': round(len(summaries) / seconds, 1)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulate lessons with scripted students.')
+    parser.add_argument('--sessions', type=int, default=100, help='sessions per level and over rule')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 3, 4])
+    parser.add_argument('--over-rules', nargs='+', default=['after_correct'], choices=sorted(OVER_RULES))
+    parser.add_argument('--minutes', type=float, default=20, help='duration of a lesson')
+    parser.add_argument('--accuracy', type=float, default=0.8)
+    parser.add_argument('--response-time', type=float, nargs=2, default=[3.0, 15.0])
+    parser.add_argument('--not-heard', type=float, default=0.05)
+    parser.add_argument('--explain', type=float, default=0.5)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    result = simulate(arguments.sessions, arguments.levels, arguments.over_rules, workers=arguments.workers,
+                      duration_lesson=int(arguments.minutes * 60), accuracy=arguments.accuracy,
+                      response_time=tuple(arguments.response_time), not_heard=arguments.not_heard,
+                      explain=arguments.explain, seed=arguments.seed)
+    for group, statistics in result['statistics'].items():
+        print(group)
+        for name, value in statistics.items():
+            print('  %s: %s' % (name, value))
+    print('%s sessions, %s sessions per second' % (result['sessions'], result['sessions_per_second']))
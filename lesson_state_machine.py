@@ -0,0 +1,268 @@
+from code_exercise import Exercise
+from utterance_templates import TEMPLATES
+
+# States of a single exercise
+STEP = 'step'
+ANSWER = 'answer'
+CHOICE_STEP = 'choice_step'
+CHOICE_ANSWER = 'choice_answer'
+DONE = 'done'
+
+# What the lesson has to get from the student in each state ('choice' is 'explain' or 'retry')
+EXPECTING = {STEP: 'step', ANSWER: 'answer', CHOICE_STEP: 'choice', CHOICE_ANSWER: 'choice', DONE: None}
+
+SENTENCES = {
+    'heard': 'Volgens mij zei je {given}.',
+    'context': 'De som was {first_number} min {second_number}. Er moet nog {previous_second} af. '
+               'We zijn gebleven bij {previous_first}.',
+}
+
+LOG_MESSAGES = {
+    'wrong': '- wrong {expecting} given: {given}',
+}
+
+# Effects are (kind, key) pairs. Counter names containing {kind} are resolved to tens or units, depending on the
+# part of the sum the student made the mistake in.
+_incorrect = (('log', 'wrong'), ('count', 'mistake_in_{kind}'))
+_respond_incorrect = (('say', 'heard'), ('feedback', 'incorrect'))
+
+TRANSITIONS = {
+    (STEP, 'correct'): (ANSWER, ()),
+    (STEP, 'incorrect'): (CHOICE_STEP, _incorrect + (('count', 'mistake_in_step'),) + _respond_incorrect),
+    (STEP, 'incorrect_final'): (DONE, _incorrect + (('count', 'end_in_{kind}'), ('count', 'mistake_in_step'))
+                                + _respond_incorrect + (('explain', None), ('count', 'end_in_step'),
+                                                        ('count', 'times_finished_sum_incorrect'))),
+    (CHOICE_STEP, 'explain'): (DONE, (('count', 'times_asked_for_explanation'), ('explain', None),
+                                      ('count', 'end_in_step'), ('count', 'end_in_{kind}'),
+                                      ('count', 'times_finished_sum_incorrect'))),
+    (CHOICE_STEP, 'retry'): (STEP, (('count', 'times_tried_sum_again'), ('say', 'context'))),
+
+    (ANSWER, 'correct'): (STEP, ()),
+    (ANSWER, 'finished'): (DONE, (('feedback', 'correct'), ('count', 'times_finished_sum_correct'))),
+    (ANSWER, 'incorrect'): (CHOICE_ANSWER, _incorrect + (('count', 'mistake_in_answer'),) + _respond_incorrect),
+    (ANSWER, 'incorrect_final'): (DONE, _incorrect + (('count', 'end_in_{kind}'), ('count', 'mistake_in_answer'))
+                                  + _respond_incorrect + (('explain', None), ('count', 'end_in_answer'),
+                                                          ('count', 'times_finished_sum_incorrect'))),
+    (CHOICE_ANSWER, 'explain'): (DONE, (('count', 'times_asked_for_explanation'), ('explain', None),
+                                        ('count', 'end_in_answer'), ('count', 'end_in_{kind}'),
+                                        ('count', 'times_finished_sum_incorrect'))),
+    (CHOICE_ANSWER, 'retry'): (ANSWER, (('count', 'times_tried_sum_again'), ('say', 'context'))),
+}
+
+_student_step_prompts = {STEP: 'Welk getal haal je er af?',
+                         ANSWER: 'Op welk getal kom je uit?'}
+
+# In level 1 the robot chooses the steps and the student only gives the answers, in the other levels the student
+# chooses the step and gives the answer.
+LEVELS = {
+    1: {'robot_steps': True,
+        'introduction': 'Als we {first_number} min {second_number} moeten doen, gaan we eerst de tientallen eraf '
+                        'halen. Dit kunnen we best in sprongen van 10 tegelijk doen!',
+        'prompts': {ANSWER: 'Wat is {previous_first} min {step}?'},
+        'transitions': TRANSITIONS},
+    2: {'robot_steps': False, 'introduction': None, 'prompts': _student_step_prompts, 'transitions': TRANSITIONS},
+    3: {'robot_steps': False, 'introduction': None, 'prompts': _student_step_prompts, 'transitions': TRANSITIONS},
+    4: {'robot_steps': False, 'introduction': None, 'prompts': _student_step_prompts, 'transitions': TRANSITIONS},
+}
+
+
+def _register_templates():
+    # every sentence of the state machine is compiled once, see utterance_templates.py. Sentences with only a number
+    # or two that are below 100 are kept once they are made.
+    for key, text in SENTENCES.items():
+        TEMPLATES.register('sentence_' + key, text, cache=key == 'heard')
+    for key, text in LOG_MESSAGES.items():
+        TEMPLATES.register('log_' + key, text)
+    for level, spec in LEVELS.items():
+        if spec['introduction']:
+            TEMPLATES.register('introduction_level_%d' % level, spec['introduction'])
+        for state, text in spec['prompts'].items():
+            TEMPLATES.register('question_%s_level_%d' % (state, level), text, cache=True)
+
+
+_register_templates()
+
+# Steps the student took compared to their level, counted once per exercise
+ACTION_LEVEL_COUNTERS = {
+    'above tens': 'bigger_steps_than_level_tens',
+    'on level tens': 'steps_on_level_tens',
+    'below tens': 'smaller_steps_than_level_tens',
+    'above units': 'bigger_steps_than_level_units',
+    'on level units': 'steps_on_level_units',
+    'below units': 'smaller_steps_than_level_units',
+}
+
+_MISTAKE_KINDS = {'incorrect tens': 'tens', 'incorrect units': 'units'}
+
+
+class ExerciseStateMachine:
+    """
+    Table driven replacement of the nested answer structure of a single exercise.
+
+    The machine does not talk to the robot itself. start() and feed() return a list of effects that the lesson has to
+    perform, in order:
+    - ('say', text): let the robot say the text;
+    - ('feedback', 'correct' or 'incorrect'): give one of the randomized responses;
+    - ('explain', None): explain the exercise;
+    - ('count', name): increment the session counter with that name;
+    - ('log', message): write the message to the session log.
+    After that, expecting tells what the lesson should get from the student next (see EXPECTING) and prompt() what the
+    robot should ask for it. All state lives on the instance and can be stored with to_dict().
+    """
+
+    def __init__(self, level: int, exercise: Exercise):
+        """
+        :param level: level of the student (1-4)
+        :param exercise: the exercise to do, as generated by Exercise.generate_exercise
+        """
+        self.level = level
+        self.exercise = exercise
+        self.spec = LEVELS[level]
+
+        self.state = STEP
+        self.wrong_responses = 0
+        self.kind = None
+        self.given = None
+        self.step = None
+        self.previous_first = exercise.current_first
+        self.previous_second = exercise.current_second
+        self.action_levels = set()
+        self.asked_for_help = False
+        self.outcome = None
+
+    @property
+    def expecting(self):
+        return EXPECTING[self.state]
+
+    @property
+    def done(self) -> bool:
+        return self.state == DONE
+
+    def start(self) -> list:
+        """
+        Starts the exercise.
+
+        :return: effects to perform
+        """
+        effects = []
+        if self.spec['introduction']:
+            effects.append(('say', self.render(self.spec['introduction'])))
+        self.__enter(STEP, effects)
+        return effects
+
+    def prompt(self) -> str:
+        """
+        :return: the question for the current state, or None when the state has no question
+        """
+        template = self.spec['prompts'].get(self.state)
+        return self.render(template) if template else None
+
+    def feed(self, value) -> list:
+        """
+        Processes the input of the student for the current state.
+
+        :param value: the step or answer (int), or 'explain' or 'retry' after a choice
+        :return: effects to perform
+        """
+        if self.state == STEP:
+            outcome = self.__take_step(value)
+        elif self.state == ANSWER:
+            outcome = self.__check_answer(value)
+        elif self.state in (CHOICE_STEP, CHOICE_ANSWER):
+            outcome = value
+            self.asked_for_help = value == 'explain'
+        else:
+            raise ValueError('The exercise is already done.')
+
+        next_state, transition_effects = self.spec['transitions'][(self.state, outcome)]
+        effects = [self.__resolve(effect) for effect in transition_effects]
+        effects = [effect for effect in effects if effect]
+        self.__enter(next_state, effects)
+        return effects
+
+    def render(self, template: str) -> str:
+        values = {'first_number': self.exercise.first_number, 'second_number': self.exercise.second_number,
+                  'previous_first': self.previous_first, 'previous_second': self.previous_second, 'step': self.step,
+                  'given': self.given, 'expecting': self.expecting}
+        return TEMPLATES.compile(template).render(values)
+
+    def to_dict(self) -> dict:
+        return {'level': self.level, 'state': self.state, 'wrong_responses': self.wrong_responses, 'kind': self.kind,
+                'given': self.given, 'step': self.step, 'previous_first': self.previous_first,
+                'previous_second': self.previous_second, 'action_levels': sorted(self.action_levels),
+                'asked_for_help': self.asked_for_help, 'outcome': self.outcome}
+
+    @classmethod
+    def from_dict(cls, data: dict, exercise: Exercise):
+        machine = cls(data['level'], exercise)
+        machine.state = data['state']
+        machine.wrong_responses = data['wrong_responses']
+        machine.kind = data['kind']
+        machine.given = data['given']
+        machine.step = data['step']
+        machine.previous_first = data['previous_first']
+        machine.previous_second = data['previous_second']
+        machine.action_levels = set(data['action_levels'])
+        machine.asked_for_help = data['asked_for_help']
+        machine.outcome = data['outcome']
+        return machine
+
+    def __enter(self, state: str, effects: list) -> None:
+        self.state = state
+        if state == STEP:
+            self.previous_first = self.exercise.current_first
+            self.previous_second = self.exercise.current_second
+            if self.spec['robot_steps']:
+                self.step = self.__robot_step()
+                self.exercise.take_step(self.step, self.level)
+                self.state = ANSWER
+        elif state == DONE:
+            self.outcome = 'correct' if (self.wrong_responses < 2 and not self.asked_for_help) else 'incorrect'
+            for action_level in sorted(self.action_levels):
+                effects.append(('count', ACTION_LEVEL_COUNTERS[action_level]))
+
+    def __robot_step(self) -> int:
+        current_first = self.exercise.current_first
+        current_second = self.exercise.current_second
+        # jumps of 10, then the units, split at the ten when the sum goes past it
+        if current_second >= 10:
+            return 10
+        to_the_ten = current_first % 10
+        if to_the_ten != 0 and current_second > to_the_ten:
+            return to_the_ten
+        return current_second
+
+    def __take_step(self, step: int) -> str:
+        self.given = self.step = step
+        accepted, action_level = self.exercise.take_step(step, self.level)
+        if accepted:
+            if action_level in ACTION_LEVEL_COUNTERS:
+                self.action_levels.add(action_level)
+            return 'correct'
+        return self.__mistake(action_level)
+
+    def __check_answer(self, answer: int) -> str:
+        self.given = answer
+        accepted, answer_type = self.exercise.acceptable_answer(answer)
+        if accepted:
+            return 'finished' if self.exercise.current_second == 0 else 'correct'
+        return self.__mistake(answer_type)
+
+    def __mistake(self, mistake_type: str) -> str:
+        self.kind = _MISTAKE_KINDS.get(mistake_type)
+        self.wrong_responses += 1
+        return 'incorrect' if self.wrong_responses < 2 else 'incorrect_final'
+
+    def __resolve(self, effect: tuple):
+        kind, key = effect
+        if kind == 'count':
+            if '{kind}' in key:
+                if self.kind is None:
+                    return None
+                key = key.format(kind=self.kind)
+            return kind, key
+        elif kind == 'say':
+            return kind, self.render(SENTENCES[key])
+        elif kind == 'log':
+            return kind, self.render(LOG_MESSAGES[key])
+        return effect
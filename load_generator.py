@@ -0,0 +1,250 @@
+import argparse
+import heapq
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from google.protobuf.struct_pb2 import Value
+from redis import Redis
+
+from social_interaction_cloud.abstract_connector import SICTransport
+from social_interaction_cloud.basic_connector import BasicSICConnector
+from social_interaction_cloud.detection_result_pb2 import DetectionResult
+
+TOPICS = ['events', 'detected_person', 'audio_intent', 'picture_newfile']
+
+TOUCH_EVENTS = ['RightBumperPressed', 'RightBumperReleased', 'LeftBumperPressed', 'LeftBumperReleased',
+                'BackBumperPressed', 'BackBumperReleased', 'FrontTactilTouched', 'FrontTactilReleased',
+                'MiddleTactilTouched', 'MiddleTactilReleased', 'RearTactilTouched', 'RearTactilReleased']
+
+
+def connect(address: str, tls: bool = False) -> Redis:
+    """
+    :param address: host or host:port of the Redis server
+    :param tls: connect like SICTransport.connect (TLS with cert.pem and the default user), for a Social Interaction
+    Cloud server
+    """
+    host, _, port = address.partition(':')
+    if tls:
+        return Redis(host=host, port=int(port or 6379), username='default', password='changemeplease', ssl=True,
+                     ssl_ca_certs='cert.pem')
+    return Redis(host=host, port=int(port or 6379))
+
+
+def intent_payloads() -> list:
+    """:return: serialized DetectionResults of the answers 0 to 99, like the ones Dialogflow sends"""
+    payloads = []
+    for number in range(100):
+        message = DetectionResult(intent='answer', confidence=80 + number % 20, text=str(number), source='dialogflow')
+        message.parameters['number'].CopyFrom(Value(number_value=number))
+        payloads.append(message.SerializeToString())
+    return payloads
+
+
+class Receiver(BasicSICConnector):
+    """
+    The connector of one simulated device, which keeps the time at which every message of the load reached its
+    handler. Several receivers share one transport, like the lessons of a LessonServer.
+    """
+
+    def __init__(self, device: str, transport: SICTransport):
+        self.received = {topic: [] for topic in TOPICS}
+        self.received_bytes = 0
+        super(Receiver, self).__init__('localhost', transport=transport, devices={'robot': [device], 'mic': [device]})
+
+    def on_event(self, event: str) -> None:
+        self.received['events'].append(time.time())
+        super(Receiver, self).on_event(event)
+
+    def on_person_detected(self) -> None:
+        self.received['detected_person'].append(time.time())
+        super(Receiver, self).on_person_detected()
+
+    def on_audio_intent(self, detection_result) -> None:
+        self.received['audio_intent'].append(time.time())
+        super(Receiver, self).on_audio_intent(detection_result)
+
+    def on_new_picture_file(self, picture_file: str) -> None:
+        self.received['picture_newfile'].append(time.time())
+        self.received_bytes += os.path.getsize(picture_file)
+        super(Receiver, self).on_new_picture_file(picture_file)
+
+
+def publish(address: str, tls: bool, devices: list, rates: dict, picture_size: int, duration: float,
+            start_at: float, seed: int) -> dict:
+    """
+    Publish the load of some of the devices, on one connection. Touch events and intents come at random moments
+    (rates[topic] per second on average), detected_person and pictures at a fixed rate, like a camera.
+
+    :return: the times at which the messages were published, per channel
+    """
+    redis = connect(address, tls)
+    rng = random.Random(seed)
+    intents = intent_payloads()
+    picture = os.urandom(picture_size)
+    payloads = {
+        'events': lambda: rng.choice(TOUCH_EVENTS),
+        'detected_person': lambda: b'',
+        'audio_intent': lambda: rng.choice(intents),
+        'picture_newfile': lambda: picture,
+    }
+    random_topics = ('events', 'audio_intent')
+
+    def interval(topic):
+        return rng.expovariate(rates[topic]) if topic in random_topics else 1.0 / rates[topic]
+
+    # the next message of every stream, by the time it is due
+    streams = []
+    for device in devices:
+        for topic in TOPICS:
+            if rates[topic] > 0:
+                streams.append((start_at + rng.uniform(0, interval(topic)), device + '_' + topic, topic))
+    heapq.heapify(streams)
+    sent = {channel: [] for _, channel, _ in streams}
+
+    end = start_at + duration
+    while streams and streams[0][0] < end:
+        due, channel, topic = streams[0]
+        delay = due - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        payload = payloads[topic]()
+        sent[channel].append(time.time())
+        redis.publish(channel, payload)
+        heapq.heapreplace(streams, (due + interval(topic), channel, topic))
+    redis.close()
+    return sent
+
+
+def run_load(address: str, devices: int, rates: dict, picture_size: int = 200000, duration: float = 10.0,
+             processes: int = None, tls: bool = False, user: str = 'load', drain: float = 5.0) -> dict:
+    """
+    Publish synthetic robot traffic for the given number of devices and receive it with one connector per device on a
+    shared transport (one pubsub thread).
+
+    A message is counted as dropped when it was not received before the drain time after the load ended. The
+    latency is the time from publishing to the handler of the connector. Redis delivers the messages of a channel in
+    order, so the n-th message received on a channel is the n-th one published; after a drop this is no longer true,
+    and the latencies that follow are too high.
+
+    :param address: host or host:port of the Redis server
+    :param devices: number of simulated devices, named <user>-nao1, <user>-nao2, ...
+    :param rates: messages per second per device, per topic (see TOPICS)
+    :param picture_size: bytes of every picture_newfile
+    :param duration: seconds to publish
+    :param processes: number of publishing processes, one per 10 devices (at most the number of CPUs) by default
+    :param tls: see connect
+    :param user: first part of the device names
+    :param drain: seconds to wait for the last messages after the load ended
+    :return: per topic the numbers of messages that were sent, received and dropped and the latency percentiles (ms),
+    and the total throughput
+    """
+    names = ['%s-nao%d' % (user, i + 1) for i in range(devices)]
+    processes = processes or max(1, min(os.cpu_count() or 1, (devices + 9) // 10))
+    transport = SICTransport(connect(address, tls))
+    receivers = [Receiver(name, transport) for name in names]
+    transport.start()
+
+    # pictures are written to the working directory by the connector
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            start_at = time.time() + 1.0
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(publish, address, tls, names[i::processes], rates, picture_size, duration,
+                                           start_at, i) for i in range(processes)]
+                sent = {}
+                for future in futures:
+                    sent.update(future.result())
+
+            expected = sum(len(times) for times in sent.values())
+            deadline = time.time() + drain
+            while time.time() < deadline and _received(receivers) < expected:
+                time.sleep(0.05)
+        finally:
+            transport.stop()
+            os.chdir(working_directory)
+
+    topics = {}
+    latencies = []
+    for topic in TOPICS:
+        topic_latencies = []
+        sent_count = received_count = 0
+        for name, receiver in zip(names, receivers):
+            published = sent.get(name + '_' + topic, [])
+            received = receiver.received[topic]
+            sent_count += len(published)
+            received_count += len(received)
+            count = min(len(published), len(received))
+            topic_latencies.append(np.array(received[:count]) - np.array(published[:count]))
+        topic_latencies = np.concatenate(topic_latencies) * 1000
+        latencies.append(topic_latencies)
+        topics[topic] = dict(sent=sent_count, received=received_count, dropped=sent_count - received_count,
+                             **_percentiles(topic_latencies))
+
+    return {
+        'devices': devices,
+        'seconds': duration,
+        'topics': topics,
+        'sent_per_second': round(sum(topic['sent'] for topic in topics.values()) / duration, 1),
+        'received_per_second': round(_received(receivers) / duration, 1),
+        'picture_mb_per_second': round(sum(receiver.received_bytes for receiver in receivers) / duration / 1e6, 2),
+        'dropped': sum(topic['dropped'] for topic in topics.values()),
+        'latency': _percentiles(np.concatenate(latencies)),
+    }
+
+
+def _received(receivers: list) -> int:
+    return sum(len(times) for receiver in receivers for times in receiver.received.values())
+
+
+def _percentiles(latencies: np.ndarray) -> dict:
+    if not len(latencies):
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 2), 'p95_ms': round(float(p95), 2), 'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(latencies.max()), 2)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Publish synthetic robot events and measure their delivery.')
+    parser.add_argument('--redis', default='localhost', help='host or host:port of the Redis server')
+    parser.add_argument('--tls', action='store_true', help='connect like to a Social Interaction Cloud server')
+    parser.add_argument('--devices', type=int, nargs='+', default=[10],
+                        help='numbers of simulated devices; every number is a separate run, e.g. 10 20 50 100')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to publish per run')
+    parser.add_argument('--touch-rate', type=float, default=0.5, help='touch events per second per device')
+    parser.add_argument('--person-rate', type=float, default=10.0, help='detected_person per second per device')
+    parser.add_argument('--intent-rate', type=float, default=0.2, help='audio_intent per second per device')
+    parser.add_argument('--picture-rate', type=float, default=1.0, help='picture_newfile per second per device')
+    parser.add_argument('--picture-size', type=int, default=200000, help='bytes per picture')
+    parser.add_argument('--processes', type=int, default=None, help='number of publishing processes')
+    parser.add_argument('--user', default='load', help='first part of the device names')
+    parser.add_argument('--json', default=None, help='write the results to this file')
+    arguments = parser.parse_args()
+
+    rates = {'events': arguments.touch_rate, 'detected_person': arguments.person_rate,
+             'audio_intent': arguments.intent_rate, 'picture_newfile': arguments.picture_rate}
+    results = []
+    print('%7s %10s %10s %8s %9s %9s %9s %9s' % ('devices', 'sent/s', 'received/s', 'dropped', 'p50 ms', 'p95 ms',
+                                                 'p99 ms', 'MB/s'))
+    for devices in arguments.devices:
+        result = run_load(arguments.redis, devices, rates, arguments.picture_size, arguments.duration,
+                          arguments.processes, arguments.tls, arguments.user)
+        results.append(result)
+        latency = result['latency']
+        print('%7d %10.1f %10.1f %8d %9s %9s %9s %9.2f' % (
+            devices, result['sent_per_second'], result['received_per_second'], result['dropped'], latency['p50_ms'],
+            latency['p95_ms'], latency['p99_ms'], result['picture_mb_per_second']))
+        for topic, counts in result['topics'].items():
+            print('  %-16s sent %6d, dropped %5d, p50 %s ms, p99 %s ms, max %s ms' % (
+                topic, counts['sent'], counts['dropped'], counts['p50_ms'], counts['p99_ms'], counts['max_ms']))
+
+    if arguments.json:
+        with open(arguments.json, 'w') as file:
+            json.dump(results, file, indent=2)
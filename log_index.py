@@ -0,0 +1,289 @@
+import argparse
+import calendar
+import gzip
+import json
+import os
+
+import numpy as np
+
+from lesson_metrics import COUNTERS, SUMMARY
+
+# Counter names of older logs
+LEGACY_COUNTERS = {'times_finshed_sum_incorrect': 'times_finished_sum_incorrect'}
+
+# Description in the summary at the end of a session -> counter
+SUMMARY_LABELS = {label: name for name, label in SUMMARY}
+
+# Columns of the tables, with their type. offset is the byte offset of the first line of the session or exercise.
+SESSION_COLUMNS = [('offset', np.int64), ('start', np.float64), ('end', np.float64), ('level', np.int8),
+                   ('name', 'U64'), ('resumed', bool), ('ended', bool), ('exercises', np.int32),
+                   ('mean_latency', np.float64)] + [(name, np.int32) for name in COUNTERS]
+EXERCISE_COLUMNS = [('session', np.int32), ('offset', np.int64), ('start', np.float64), ('end', np.float64),
+                    ('first_number', np.int8), ('second_number', np.int8), ('steps', np.int16), ('answers', np.int16),
+                    ('wrong', np.int16), ('left_to_subtract', np.int8), ('finished', bool), ('resumed', bool)] + \
+                   [(name, np.int16) for name in COUNTERS]
+
+# Length of the time stamp in front of every line, e.g. '02/23/2021 12:44:00 PM '
+_STAMP = 23
+
+
+def _timestamp(line: str, cache: dict) -> float:
+    """
+    :return: the time stamp of the line in seconds since 1970, as if the (local) time of the log were UTC
+    """
+    day = line[:10]
+    seconds = cache.get(day)
+    if seconds is None:
+        seconds = cache[day] = calendar.timegm((int(line[6:10]), int(line[0:2]), int(line[3:5]), 0, 0, 0))
+    hour = int(line[11:13]) % 12 + (12 if line[20] == 'P' else 0)
+    return seconds + hour * 3600 + int(line[14:16]) * 60 + int(line[17:19])
+
+
+class LogIndex:
+    """
+    Columnar tables of the sessions and exercises in a session log (like student_x.log), made by reading the log once.
+
+    Several sessions can be appended to one log. Every session and exercise becomes a row; the tables are dicts of
+    NumPy arrays with the SESSION_COLUMNS and EXERCISE_COLUMNS. The offset column is the byte offset of the first line
+    of the row, so the lines of a session or exercise can be read back with read_lines().
+
+    The counters of a session come from the summary at the end of the session. Older logs also have a '- <counter> += 1'
+    line for every increment, which fill in the counters of their exercises; newer logs do not, the counts of every
+    exercise are in the records of SessionMetrics (<student>.jsonl).
+
+    update() only reads what was written after the previous update. The last session can still change, so it is parsed
+    again from its first line on every update; all other rows are final. save() writes the final rows (as two record
+    arrays) and the position to <log>.index.npz, load() continues from there.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: the log, plain or gzip compressed (a rotated log)
+        """
+        self.path = path
+        self.index_path = path + '.index.npz'
+        # records of the sessions and exercises before the last session
+        self.__sessions = _records([], SESSION_COLUMNS)
+        self.__exercises = _records([], EXERCISE_COLUMNS)
+        # byte offset of the first line that is not part of a final row yet
+        self.position = 0
+        self.__size = 0
+        self.sessions = _columns(self.__sessions)
+        self.exercises = _columns(self.__exercises)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        :return: the index of the log, from the saved index if there is one, updated with what was written after it
+        """
+        index = cls(path)
+        if os.path.isfile(index.index_path) and os.path.isfile(path):
+            with np.load(index.index_path) as data:
+                size = int(data['size'])
+                if size <= os.path.getsize(path):
+                    index.position = int(data['position'])
+                    index.__size = size
+                    index.__sessions = data['sessions']
+                    index.__exercises = data['exercises']
+        index.update()
+        return index
+
+    def save(self) -> None:
+        """Write the final rows and the position, so the next load() only reads the rest of the log."""
+        temporary_path = self.index_path + '.tmp.npz'
+        np.savez(temporary_path, position=self.position, size=self.__size, sessions=self.__sessions,
+                 exercises=self.__exercises)
+        os.replace(temporary_path, self.index_path)
+
+    def update(self) -> int:
+        """
+        Read the lines that were written since the previous update.
+
+        :return: number of bytes that were read
+        """
+        if not os.path.isfile(self.path):
+            return 0
+        size = os.path.getsize(self.path)
+        if size < self.__size and not self.path.endswith('.gz'):
+            # the log was rotated: start again
+            self.__init__(self.path)
+        self.__size = size
+
+        parser = _Parser(len(self.__sessions))
+        with _open(self.path) as log:
+            log.seek(self.position)
+            offset = self.position
+            for line in log:
+                if not line.endswith(b'\n'):
+                    # the line is still being written
+                    break
+                parser.feed(offset, line.decode('utf-8', 'replace').rstrip('\r\n'))
+                offset += len(line)
+        read = offset - self.position
+        parser.close()
+
+        # everything before the last session is final
+        sessions = _records(parser.sessions, SESSION_COLUMNS)
+        exercises = _records(parser.exercises, EXERCISE_COLUMNS)
+        if parser.sessions:
+            last = len(self.__sessions) + len(sessions) - 1
+            final = exercises['session'] < last
+            self.__sessions = np.concatenate([self.__sessions, sessions[:-1]])
+            self.__exercises = np.concatenate([self.__exercises, exercises[final]])
+            self.position = parser.sessions[-1]['offset']
+            sessions, exercises = sessions[-1:], exercises[~final]
+        else:
+            self.position = offset
+        self.sessions = _columns(np.concatenate([self.__sessions, sessions]))
+        self.exercises = _columns(np.concatenate([self.__exercises, exercises]))
+        return read
+
+    def read_lines(self, table: str, row: int) -> list:
+        """
+        :param table: 'sessions' or 'exercises'
+        :param row: number of the row
+        :return: the lines of the log of that session or exercise
+        """
+        rows = self.sessions if table == 'sessions' else self.exercises
+        start = int(rows['offset'][row])
+        # the row ends where the next row, or the next session, starts
+        later = rows['offset'][row + 1:row + 2].tolist() + \
+            self.sessions['offset'][self.sessions['offset'] > start][:1].tolist()
+        end = min(later) if later else None
+        lines = []
+        with _open(self.path) as log:
+            log.seek(start)
+            for line in log:
+                if end is not None and start >= end:
+                    break
+                start += len(line)
+                lines.append(line.decode('utf-8', 'replace').rstrip('\r\n'))
+        return lines
+
+
+class _Parser:
+    """Turns the lines of a log into rows, one line at a time."""
+
+    def __init__(self, first_session: int):
+        self.first_session = first_session
+        self.sessions = []
+        self.exercises = []
+        self.session = None
+        self.exercise = None
+        self.time = 0.0
+        self.__days = {}
+
+    def feed(self, offset: int, line: str) -> None:
+        if len(line) < _STAMP or line[2] != '/':
+            return
+        self.time = _timestamp(line, self.__days)
+        message = line[_STAMP:]
+        # a line that starts a session or exercise belongs to the new one
+        if self.session is not None and (not message.startswith('---------') or 'END OF SESSION' in message):
+            self.session['end'] = self.time
+            if self.exercise is not None and not self.exercise['finished']:
+                self.exercise['end'] = self.time
+
+        if message.startswith('- '):
+            if self.session is None:
+                return
+            self.__statement(message[2:])
+        elif message.startswith('---------'):
+            if 'OF SESSION' in message:
+                if 'END OF SESSION' in message:
+                    if self.session:
+                        self.__end_exercise()
+                        self.session['ended'] = True
+                    return
+                self.__start_session(offset, resumed='RESUME OF SESSION' in message)
+            elif 'um: ' in message and self.session is not None:
+                # '--------- Sum: 83 - 64 ---------' or '--------- Resume sum: 83 - 64 ---------'
+                first, _, second = message.split('um: ', 1)[1].split(' ')[:3]
+                self.__start_exercise(offset, int(first), int(second), resumed=message.startswith('--------- Resume'))
+
+    def close(self) -> None:
+        self.__end_exercise()
+
+    def __statement(self, statement: str) -> None:
+        session, exercise = self.session, self.exercise
+        if statement.endswith(' += 1'):
+            name = statement[:-5]
+            name = LEGACY_COUNTERS.get(name, name)
+            if name in session:
+                session[name] += 1
+                if exercise is not None and name in exercise:
+                    exercise[name] += 1
+            return
+        name, _, value = statement.partition(': ')
+        if not value:
+            if name.startswith('Level = '):
+                session['level'] = int(name[8:])
+            return
+        if name in SUMMARY_LABELS:
+            # the totals at the end of the session replace the counted ones
+            if SUMMARY_LABELS[name] != 'number_of_exercises_done':
+                session[SUMMARY_LABELS[name]] = int(value)
+        elif name == 'Summary':
+            mean_latency = json.loads(value).get('mean_latency')
+            session['mean_latency'] = mean_latency if mean_latency is not None else np.nan
+        elif exercise is None:
+            if name == 'name detected':
+                session['name'] = value
+        elif name == 'step':
+            exercise['steps'] += 1
+        elif name == 'answer':
+            exercise['answers'] += 1
+        elif name.startswith('wrong ') and name.endswith(' given'):
+            exercise['wrong'] += 1
+        elif name == 'End of the exercise, left to subtract':
+            exercise['left_to_subtract'] = int(value)
+            exercise['finished'] = True
+
+    def __start_session(self, offset: int, resumed: bool) -> None:
+        self.__end_exercise()
+        self.session = dict(offset=offset, start=self.time, end=self.time, level=0, name='', resumed=resumed,
+                            ended=False, exercises=0, mean_latency=np.nan, **dict.fromkeys(COUNTERS, 0))
+        self.sessions.append(self.session)
+
+    def __start_exercise(self, offset: int, first_number: int, second_number: int, resumed: bool) -> None:
+        self.__end_exercise()
+        self.session['exercises'] += 1
+        self.exercise = dict(session=self.first_session + len(self.sessions) - 1, offset=offset, start=self.time,
+                             end=self.time, first_number=first_number, second_number=second_number, steps=0,
+                             answers=0, wrong=0, left_to_subtract=-1, finished=False, resumed=resumed,
+                             **dict.fromkeys(COUNTERS, 0))
+        self.exercises.append(self.exercise)
+
+    def __end_exercise(self) -> None:
+        self.exercise = None
+
+
+def _open(path: str):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _records(rows: list, columns: list) -> np.ndarray:
+    names = [name for name, _ in columns]
+    return np.array([tuple([row[name] for name in names]) for row in rows], dtype=columns)
+
+
+def _columns(records: np.ndarray) -> dict:
+    return {name: records[name] for name in records.dtype.names}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Index session logs and print their sessions.')
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--no-save', action='store_true', help='do not write <log>.index.npz')
+    arguments = parser.parse_args()
+
+    for path in arguments.logs:
+        index = LogIndex.load(path)
+        if not arguments.no_save:
+            index.save()
+        sessions = index.sessions
+        print('%s: %d sessions, %d exercises' % (path, len(sessions['offset']), len(index.exercises['offset'])))
+        for i in range(len(sessions['offset'])):
+            print('  level %d, %d exercises, %d correct, %.0f s%s' % (
+                sessions['level'][i], sessions['exercises'][i], sessions['times_finished_sum_correct'][i],
+                sessions['end'][i] - sessions['start'][i], '' if sessions['ended'][i] else ' (not ended)'))
@@ -0,0 +1,115 @@
+import re
+import unicodedata
+
+# Lookup tables are built once at import time, parse_number itself only does dictionary lookups.
+
+_dutch_units = ['nul', 'een', 'twee', 'drie', 'vier', 'vijf', 'zes', 'zeven', 'acht', 'negen',
+                'tien', 'elf', 'twaalf', 'dertien', 'veertien', 'vijftien', 'zestien', 'zeventien', 'achttien',
+                'negentien']
+_dutch_tens = ['', '', 'twintig', 'dertig', 'veertig', 'vijftig', 'zestig', 'zeventig', 'tachtig', 'negentig']
+
+_english_units = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine',
+                  'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen',
+                  'nineteen']
+_english_tens = ['', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
+
+
+def _build_number_words():
+    words = {}
+    for value in range(20):
+        words[_dutch_units[value]] = value
+        words[_english_units[value]] = value
+    for tens in range(2, 10):
+        words[_dutch_tens[tens]] = tens * 10
+        words[_english_tens[tens]] = tens * 10
+        for units in range(1, 10):
+            # zevenenveertig, tweeentwintig (the diaeresis of tweeëntwintig is stripped before the lookup)
+            words[_dutch_units[units] + 'en' + _dutch_tens[tens]] = tens * 10 + units
+            words[_english_tens[tens] + _english_units[units]] = tens * 10 + units
+    words['honderd'] = words['eenhonderd'] = 100
+    words['hundred'] = words['onehundred'] = 100
+    return words
+
+
+def _build_split_numbers():
+    # the only numbers that are said as more than one word; other words next to each other are separate numbers
+    split = {}
+    for tens in range(2, 10):
+        for units in range(1, 10):
+            # 'zeven en veertig'
+            split[(_dutch_units[units], 'en', _dutch_tens[tens])] = tens * 10 + units
+            # 'forty seven', also 'forty-seven' as the hyphen is not part of a token
+            split[(_english_tens[tens], _english_units[units])] = tens * 10 + units
+    split[('een', 'honderd')] = split[('one', 'hundred')] = 100
+    return split
+
+
+NUMBER_WORDS = _build_number_words()
+SPLIT_NUMBERS = _build_split_numbers()
+
+# 'een' is also the Dutch indefinite article, so it only counts as 1 when no other number was said.
+AMBIGUOUS_WORDS = frozenset(['een'])
+
+# 'drie komma twee' and '3,2' are not whole numbers, so they are not an answer.
+DECIMAL_WORDS = frozenset(['komma', 'punt', 'point'])
+
+_token_pattern = re.compile(r'[a-z]+|\d+(?:[.,]\d+)?')
+
+
+def _normalize(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def parse_number(text: str):
+    """
+    Read a number from recognized speech, e.g. '47', 'zevenenveertig', 'zeven en veertig' or 'forty-seven'. Words
+    that are not one number together are separate numbers: 'negen tien' is 9 and 10, not 19.
+    When more than one number is mentioned the last one is returned, as children often repeat the sum before
+    giving the answer ('83 min 10 is 73').
+
+    :param text: recognized text (DetectionResult.text)
+    :return: the number as an int, or None when no number was found
+    """
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+
+    tokens = _token_pattern.findall(_normalize(text))
+    found = None
+    ambiguous = None
+    i = 0
+    while i < len(tokens):
+        value, length = _number_at(tokens, i)
+        if value is None:
+            i += 1
+            continue
+        word = tokens[i] if length == 1 else None
+        i += length
+        if i + 1 < len(tokens) and tokens[i] in DECIMAL_WORDS:
+            decimals, decimals_length = _number_at(tokens, i + 1)
+            if decimals is not None:
+                # a decimal number: skip the part after the comma as well
+                i += 1 + decimals_length
+                continue
+        if word in AMBIGUOUS_WORDS:
+            ambiguous = value
+        else:
+            found = value
+
+    return found if found is not None else ambiguous
+
+
+def _number_at(tokens: list, i: int):
+    """:return: the number that starts at tokens[i] (None if there is none) and the number of tokens it takes"""
+    token = tokens[i]
+    if token.isdigit():
+        return int(token), 1
+    for length in (3, 2):
+        value = SPLIT_NUMBERS.get(tuple(tokens[i:i + length]))
+        if value is not None:
+            return value, length
+    return NUMBER_WORDS.get(token), 1
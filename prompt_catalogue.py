@@ -0,0 +1,182 @@
+import os
+import sys
+from functools import partial
+
+import randomized_responses
+from lesson_state_machine import LEVELS
+from utterance_templates import TEMPLATES
+
+# Directory with the pre-rendered audio of the prompts, one <prompt id>.wav per prompt
+AUDIO_DIRECTORY = 'prompts'
+
+# Seconds to wait for the robot to confirm that a prompt was loaded
+LOAD_TIMEOUT = 5
+
+# Fixed sentences of the lesson. Sentences with numbers in them are said with text to speech.
+PROMPTS = {
+    'ask_name': 'Hoi, ik ben Nao. Hoe heet jij?',
+    'welcome': 'Leuk dat je er bent! Wij gaan vandaag sámen rekenen. We gaan minsommen oefenen. Ik ga je eerst kort '
+               'uitleggen hoe we dit ook alweer doen. Daarna gaan we 20 minuten sommen maken. Als je een fout maakt is '
+               'dat niet erg, dan proberen we het gewoon opnieuw. Of leg ik je uit hoe ik het zou doen. Volgens mij kan '
+               'je dat!',
+    'subject': 'We gaan straks minsommen oefenen onder de honderd. We doen eerst de tientallen eraf, en dan de eenheden '
+               'eraf.',
+    'level_1': 'Zullen we samen de sommen maken? Dan zeg ik steeds welk getal we eraf halen, en dan mag jij zeggen op '
+               'welk getal we uitkomen. ',
+    'level_2': 'Zullen we sprongen van 10 tegelijk nemen? Dan doen we daarna de eenheden.',
+    'level_3': 'Zullen we grote sprongen van alle tientallen tegelijk nemen, en daarna de eenheden eraf doen?',
+    'level_4': 'Zullen we grote sprongen van alle tientallen tegelijk nemen? Dan halen we daarna alle eenheden er in 1 '
+               'keer af.',
+    'instructions': 'Zorg ervoor dat je de som die ik zeg altijd meteen opschrijft. Als je het antwoord weet, kan je '
+                    'tegen een van mijn voeten drukken. Zodra mijn ogen groen zijn, kan jij je antwoord geven! Zorg '
+                    'ervoor dat je duidelijk en hardop je antwoord geeft. Zullen we dan nu beginnen met rekenen? Als je '
+                    'er klaar voor bent mag je zachtjes op mijn hoofd drukken!',
+    'first_exercise': 'Oke, dan ga ik nu de eerste oefening aan je vertellen, vergeet niet om de som op te schrijven!',
+    'choice': 'Wil je deze som nog een keer proberen, of zal ik uitleggen hoe ik hem heb opgelost? Als je het nog een '
+              'keer wilt proberen mag je zachtjes op mijn hoofd drukken, en als je wilt dat ik de som voordoe kan je '
+              'tegen mijn voet-en drukken.',
+    'not_heard': 'Sorry, ik heb je niet goed verstaan. Wil je je antwoord opnieuw zeggen?',
+    'conclusion': 'Onze rekenles zit erop! Ik vind dat je heel goed je best hebt gedaan. Ik denk dat jij nog veel beter '
+                  'gaat worden in rekenen, vooral blijven oefenen! Ik ga nu even pauzeren, misschien tot een andere '
+                  'keer!',
+}
+
+
+def _build_catalogue():
+    catalogue = dict(PROMPTS)
+    for pool in randomized_responses.session_pools().values():
+        catalogue.update(zip(pool.prompt_ids(), pool.lines))
+    # questions of the state machine that do not depend on the exercise
+    for spec in LEVELS.values():
+        for state, template in spec['prompts'].items():
+            if not TEMPLATES.compile(template).slots:
+                catalogue['question_' + state] = template
+    return catalogue
+
+
+CATALOGUE = _build_catalogue()
+PROMPT_IDS = {text: prompt_id for prompt_id, text in CATALOGUE.items()}
+
+
+def audio_file(prompt_id: str, directory: str = AUDIO_DIRECTORY) -> str:
+    return os.path.join(directory, prompt_id + '.wav')
+
+
+class PromptCatalogue:
+    """
+    Plays the fixed sentences of the lesson from audio that is loaded on the robot once, at the start of the session,
+    instead of synthesizing them on the robot every time they are said.
+
+    Only prompts that have a pre-rendered audio file (see synthesize) are loaded. Everything else, like sentences with
+    the numbers of the exercise, is said with text to speech as before.
+    """
+
+    def __init__(self, action_runner, directory: str = AUDIO_DIRECTORY):
+        """
+        :param action_runner: ActionRunner of the lesson
+        :param directory: directory with the pre-rendered audio files
+        """
+        self.action_runner = action_runner
+        self.directory = directory
+        self.loaded = {}
+        # False once the robot did not confirm loading a prompt
+        self.supported = True
+
+    def warm_up(self) -> int:
+        """
+        Load the audio of all prompts that have an audio file on the robot.
+
+        :return: number of prompts that were loaded
+        """
+        for prompt_id in CATALOGUE:
+            self.load(prompt_id)
+            if not self.supported:
+                break
+        return len(self.loaded)
+
+    def load(self, prompt_id: str) -> bool:
+        """
+        Load the audio of one prompt on the robot, if it has an audio file and was not loaded yet.
+
+        :return: whether the prompt is loaded
+        """
+        path = audio_file(prompt_id, self.directory)
+        if prompt_id in self.loaded or not self.supported or not os.path.isfile(path):
+            return prompt_id in self.loaded
+        action = self.action_runner.action_factory.build_waiting_action(
+            'load_audio', path, additional_callback=partial(self.loaded.__setitem__, prompt_id))
+        if not self.action_runner.clock.wait(action.perform(), LOAD_TIMEOUT):
+            # the robot does not support loading audio, keep using text to speech
+            print('Could not load prompt ' + prompt_id)
+            self.supported = False
+        return prompt_id in self.loaded
+
+    def play(self, prompt_id: str, wait: bool = True) -> None:
+        """
+        Say a prompt from the catalogue.
+
+        :param prompt_id: key in CATALOGUE
+        :param wait: if True, wait until the robot is done speaking
+        """
+        if prompt_id in self.loaded:
+            self.__run('play_loaded_audio', self.loaded[prompt_id], wait)
+        else:
+            self.__run('say', CATALOGUE[prompt_id], wait)
+
+    def say(self, text: str, wait: bool = True) -> None:
+        """
+        Say a text, from the loaded audio when the text is a prompt in the catalogue.
+
+        :param text: text to say
+        :param wait: if True, wait until the robot is done speaking
+        """
+        prompt_id = PROMPT_IDS.get(text)
+        if prompt_id:
+            self.play(prompt_id, wait)
+        else:
+            self.__run('say', text, wait)
+
+    def clear(self) -> None:
+        """Remove the loaded audio from the robot."""
+        if self.loaded:
+            self.action_runner.run_waiting_action('clear_loaded_audio')
+            self.loaded = {}
+
+    def __run(self, action_name: str, argument, wait: bool) -> None:
+        if wait:
+            self.action_runner.run_waiting_action(action_name, argument)
+        else:
+            self.action_runner.run_action(action_name, argument)
+
+
+def synthesize(dialogflow_key_file: str, language: str = 'nl-NL', directory: str = AUDIO_DIRECTORY) -> list:
+    """
+    Render the prompts that have no audio file yet with Google Cloud Text-to-Speech (google-cloud-texttospeech), using
+    the same key file as Dialogflow.
+
+    :return: ids of the prompts that were rendered
+    """
+    from google.cloud import texttospeech
+
+    client = texttospeech.TextToSpeechClient.from_service_account_file(dialogflow_key_file)
+    voice = texttospeech.VoiceSelectionParams(language_code=language)
+    audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.LINEAR16)
+
+    os.makedirs(directory, exist_ok=True)
+    rendered = []
+    for prompt_id, text in CATALOGUE.items():
+        path = audio_file(prompt_id, directory)
+        if os.path.isfile(path):
+            continue
+        response = client.synthesize_speech(input=texttospeech.SynthesisInput(text=text), voice=voice,
+                                            audio_config=audio_config)
+        with open(path, 'wb') as wav:
+            wav.write(response.audio_content)
+        rendered.append(prompt_id)
+    return rendered
+
+
+if __name__ == '__main__':
+    # python prompt_catalogue.py <dialogflow key file>
+    for prompt_id in synthesize(sys.argv[1]):
+        print('Rendered ' + prompt_id)
@@ -18,11 +18,78 @@ lines_next_sum = ['Op naar de volgende som!',
                  'Laten we nog een som maken!',
                  'Laten we nog een som doen!']
 
+class ResponsePool:
+    """
+    Lines the robot chooses from, e.g. the responses to a correct exercise.
+
+    Lines are drawn from a shuffle bag: every line is put in the bag as often as its weight, and lines are taken from
+    the bag at random until it is empty. A line is never said twice in a row (unless the weights make that
+    impossible): the line that was said last is not taken, and when it is the only one left a new bag is added. Every
+    lesson makes its own pools (see session_pools), so the bags are per session.
+    """
+
+    def __init__(self, name: str, lines: list, weights: list = None, rng: random.Random = None):
+        """
+        :param name: name of the pool, the prompt ids of the lines are <name>_<index>
+        :param lines: the lines
+        :param weights: how many times every line is in the bag, 1 for all lines by default
+        :param rng: random generator, a new one of the pool by default
+        """
+        if weights is not None and len(weights) != len(lines):
+            raise ValueError('Every line of %s needs a weight' % name)
+        self.name = name
+        self.lines = lines
+        self.weights = weights if weights is not None else [1] * len(lines)
+        self.random = rng if rng else random.Random()
+        self.last = None
+        self.__bag = []
+
+    def prompt_ids(self) -> list:
+        """:return: the ids of the lines in the prompt catalogue"""
+        return ['%s_%d' % (self.name, i) for i in range(len(self.lines))]
+
+    def draw(self) -> str:
+        candidates = [j for j, i in enumerate(self.__bag) if i != self.last]
+        if not candidates:
+            # only the line that was said last is left: it stays in the bag (at most as often as its weight) and a
+            # new bag is added
+            self.__bag = self.__bag[:self.weights[self.last]] if self.__bag else []
+            self.__bag.extend(i for i, weight in enumerate(self.weights) for _ in range(weight))
+            candidates = [j for j, i in enumerate(self.__bag) if i != self.last] or range(len(self.__bag))
+        i = self.__bag.pop(self.random.choice(candidates))
+        self.last = i
+        return self.lines[i]
+
+    def preload(self, prompts) -> int:
+        """
+        Load the audio of the lines on the robot, so they can be played without waiting for text to speech.
+
+        :param prompts: PromptCatalogue of the lesson
+        :return: number of lines that are loaded
+        """
+        return sum(prompts.load(prompt_id) for prompt_id in self.prompt_ids())
+
+
+def session_pools(seed: int = None) -> dict:
+    """
+    :param seed: seed of the random generators of the pools, so the lines of a session can be drawn again in the same
+    order; None for a different order every session
+    :return: new pools for a lesson: 'correct', 'incorrect' and 'next_sum'
+    """
+    seeds = random.Random(seed)
+    return {'correct': ResponsePool('correct', responses_correct_exercise, rng=random.Random(seeds.getrandbits(64))),
+            'incorrect': ResponsePool('incorrect', responses_incorrect_answer,
+                                      rng=random.Random(seeds.getrandbits(64))),
+            'next_sum': ResponsePool('next_sum', lines_next_sum, rng=random.Random(seeds.getrandbits(64)))}
+
+
+_pools = session_pools()
+
 def response_correct_exercise():
-    return responses_correct_exercise[random.randint(0, 4)]
+    return _pools['correct'].draw()
 
 def response_incorrect_answer():
-    return responses_incorrect_answer[random.randint(0, 4)]
+    return _pools['incorrect'].draw()
 
 def text_next_sum():
-    return lines_next_sum[random.randint(0,2)]
+    return _pools['next_sum'].draw()
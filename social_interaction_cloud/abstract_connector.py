@@ -2,14 +2,77 @@ from enum import Enum
 from io import open
 from itertools import chain, product
 from pathlib import Path
-from threading import Event, Thread
+from threading import Event, Lock, Thread, current_thread
 from time import strftime, time
 from tkinter import Tk, Checkbutton, Label, Entry, IntVar, StringVar, Button, E, W
 
 from redis import Redis
 from simplejson import dumps
 
-from .detection_result_pb2 import DetectionResult
+from .detected_intent import DetectedIntent
+from .profiling import NO_PROFILER, Profiler
+
+
+class SICTransport(object):
+    """
+    Redis connection and pubsub thread to the Social Interaction Cloud. A transport can be shared by several
+    connectors (e.g. one per robot), which then all receive their events on the same pubsub thread.
+    """
+
+    def __init__(self, redis: Redis):
+        """
+        :param redis: Redis client connected to the Social Interaction Cloud server
+        """
+        self.redis = redis
+        self.__pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        self.__pubsub_thread = None
+        self.__lock = Lock()
+
+    @classmethod
+    def connect(cls, server_ip: str, username: str = 'default', password: str = 'changemeplease'):
+        """
+        Connect to a (local) Social Interaction Cloud server.
+
+        :param server_ip: IP address of Social Interaction Cloud server
+        :param username:
+        :param password:
+        :return: SICTransport
+        """
+        return cls(Redis(host=server_ip, username=username, password=password, ssl=True, ssl_ca_certs='cert.pem'))
+
+    def subscribe(self, channels: list, handler: callable) -> None:
+        """
+        Subscribe a handler to the given channels. The handler is called with each message on the pubsub thread.
+        Connectors that share a transport should subscribe before it is started.
+
+        :param channels: full channel names, i.e. device + '_' + topic
+        :param handler:
+        :return:
+        """
+        with self.__lock:
+            self.__pubsub.subscribe(**dict.fromkeys(channels, handler))
+
+    def unsubscribe(self, channels: list) -> None:
+        with self.__lock:
+            self.__pubsub.unsubscribe(*channels)
+
+    def start(self) -> None:
+        """Start the pubsub thread, if it is not running yet."""
+        with self.__lock:
+            if self.__pubsub_thread is None:
+                self.__pubsub_thread = self.__pubsub.run_in_thread(sleep_time=0.001)
+
+    def stop(self) -> None:
+        """Stop the pubsub thread and close the connection."""
+        with self.__lock:
+            if self.__pubsub_thread is not None:
+                self.__pubsub_thread.stop()
+                # wait for the thread to finish reading, before its connection is closed
+                if self.__pubsub_thread is not current_thread():
+                    self.__pubsub_thread.join()
+                self.__pubsub_thread = None
+            self.__pubsub.close()
+        self.redis.close()
 
 
 class AbstractSICConnector(object):
@@ -17,12 +80,21 @@ class AbstractSICConnector(object):
     Abstract class that can be used as a template for a connector to connect with the Social Interaction Cloud.
     """
 
-    def __init__(self, server_ip: str):
+    def __init__(self, server_ip: str, transport: SICTransport = None, devices: dict = None,
+                 profiler: Profiler = None):
         """
         :param server_ip:
+        :param transport: optional transport shared with other connectors, which should be started with
+        SICTransport.start() once all its connectors are created. If not given, the connector makes (and starts) its
+        own connection and asks for the user information when needed.
+        :param devices: optional map from device type (cam, mic, robot, speaker or tablet) to the devices to use,
+        e.g. {'robot': ['user-nao1'], 'mic': ['user-nao1']}. Required when a transport is given, otherwise the
+        devices are selected in a dialog.
+        :param profiler: optional profiler (see profiling.py); when it is enabled, the handling of every received
+        message and every publish are spans
         """
         topics = ['events', 'detected_person', 'recognised_face', 'audio_language', 'audio_intent',
-                  'audio_newfile', 'picture_newfile', 'detected_emotion',  # robot_audio_loaded?
+                  'audio_newfile', 'picture_newfile', 'detected_emotion', 'robot_audio_loaded',
                   'robot_posture_changed', 'robot_stiffness_changed', 'robot_battery_charge_changed',
                   'robot_charging_changed', 'robot_hot_device_detected', 'robot_motion_recording',
                   'tablet_connection', 'tablet_answer']
@@ -62,28 +134,45 @@ class AbstractSICConnector(object):
 
         self.time_format = '%H-%M-%S'
 
-        if server_ip.startswith('127.') or server_ip.startswith('192.') or server_ip == 'localhost':
-            self.username = 'default'
-            self.password = 'changemeplease'
-            self.redis = Redis(host=server_ip, username=self.username, password=self.password, ssl=True,
-                               ssl_ca_certs='cert.pem')
+        self.profiler = profiler if profiler else NO_PROFILER
+        listen = self.__listen
+        if self.profiler.enabled:
+            listen = self.__profiled_listen
+            self.__send = self.__profiled_send
+
+        self.__owns_transport = transport is None
+        if transport is None:
+            if server_ip.startswith('127.') or server_ip.startswith('192.') or server_ip == 'localhost':
+                self.username = 'default'
+                self.password = 'changemeplease'
+                transport = SICTransport.connect(server_ip, self.username, self.password)
+            else:
+                self.__dialog1 = Tk()
+                self.username = StringVar()
+                self.password = StringVar()
+                self.provide_user_information()
+                transport = SICTransport(Redis(host=server_ip, username=self.username, password=self.password,
+                                               ssl=True))
+        elif devices is None:
+            raise ValueError('To use a shared transport, you need to supply the devices.')
+        self.__transport = transport
+        self.redis = transport.redis
+
+        if devices is None:
+            self.__dialog2 = Tk()
+            self.__checkboxes = {}
+            self.select_devices()
         else:
-            self.__dialog1 = Tk()
-            self.username = StringVar()
-            self.password = StringVar()
-            self.provide_user_information()
-            self.redis = Redis(host=server_ip, username=self.username, password=self.password, ssl=True)
-        self.__dialog2 = Tk()
-        self.__checkboxes = {}
-        self.select_devices()
-        all_topics = []
+            for device_type, device_list in devices.items():
+                self.devices[self.device_types[device_type]].extend(device_list)
+        self.__channels = []
         for device_list in self.devices.values():
             for device in device_list:
                 for topic in topics:
-                    all_topics.append(device + '_' + topic)
-        self.__pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
-        self.__pubsub.subscribe(**dict.fromkeys(all_topics, self.__listen))
-        self.__pubsub_thread = self.__pubsub.run_in_thread(sleep_time=0.001)
+                    self.__channels.append(device + '_' + topic)
+        self.__transport.subscribe(self.__channels, listen)
+        if self.__owns_transport:
+            self.__transport.start()
 
         self.__running_thread = Thread(target=self.__run)
         self.__stop_event = Event()
@@ -176,9 +265,10 @@ class AbstractSICConnector(object):
         Given is the full language key (e.g. nl-NL or en-US)."""
         pass
 
-    def on_audio_intent(self, detection_result: DetectionResult) -> None:
+    def on_audio_intent(self, detection_result: DetectedIntent) -> None:
         """Triggered whenever an intent was detected (by Dialogflow) on a user's speech.
-        Given is the name of the intent, a list of optional parameters (following from the dialogflow spec), and a confidence value.
+        Given is the name of the intent, a dict of optional parameters (following from the dialogflow spec, converted
+        to native Python values), and a confidence value. The underlying protobuf is only parsed once it is accessed.
         See https://cloud.google.com/dialogflow/docs/intents-loaded_actions-parameters.
         The recognized text itself is provided as well, even when no intent was actually matched (i.e. a failure).
         These are sent as soon as an intent is recognised, which is always after some start_listening action,
@@ -193,6 +283,10 @@ class AbstractSICConnector(object):
         All audio received between the last start_listening and stop_listening calls is recorded."""
         pass
 
+    def on_audio_loaded(self, identifier: int) -> None:
+        """Gives the unique identifier for the audio that was just loaded (see load_audio)"""
+        pass
+
     def on_new_picture_file(self, picture_file: str) -> None:
         """Triggered whenever a new picture has been stored to an image (JPG) file. See take_picture.
         Given is the path to the taken picture."""
@@ -363,6 +457,23 @@ class AbstractSICConnector(object):
         with open(audio_file, 'rb') as file:
             self.__send('action_play_audio', file.read())
 
+    def load_audio(self, audio_file: str) -> None:
+        """Preloads the given audio file on the robot's speakers, so that it can be played without sending it again.
+        The identifier of the loaded audio is given in on_audio_loaded; use it with play_loaded_audio."""
+        with open(audio_file, 'rb') as file:
+            self.__send('action_load_audio', file.read())
+
+    def play_loaded_audio(self, identifier: int) -> None:
+        """Plays audio that was preloaded with load_audio on the robot's speakers.
+        A PlayAudioStarted event will be sent when the audio starts and a PlayAudioDone event after it is finished.
+        Any previously playing audio will be cancelled first."""
+        self.__send('action_play_audio', str(identifier))
+
+    def clear_loaded_audio(self) -> None:
+        """Removes all audio that was preloaded with load_audio from the robot.
+        A ClearLoadedAudioDone event will be sent when this is done."""
+        self.__send('action_clear_loaded_audio', '')
+
     def set_eye_color(self, color: str) -> None:
         """Sets the robot's eye LEDs to one of the following colours:
         white, red, green, blue, yellow, magenta, cyan, greenyellow or rainbow.
@@ -565,13 +676,16 @@ class AbstractSICConnector(object):
         self.__running_thread.start()
 
     def stop(self) -> None:
-        """Stop listening to incoming events (which is done in a thread) so the Python application can close."""
+        """Stop listening to incoming events (which is done in a thread) so the Python application can close.
+        A shared transport is left running for the other connectors."""
         self.__running = False
         self.__stop_event.set()
         print('Trying to exit gracefully...')
         try:
-            self.__pubsub_thread.stop()
-            self.redis.close()
+            if self.__owns_transport:
+                self.__transport.stop()
+            else:
+                self.__transport.unsubscribe(self.__channels)
             print('Graceful exit was successful.')
         except Exception as err:
             print('Graceful exit has failed: ' + err.message)
@@ -595,14 +709,14 @@ class AbstractSICConnector(object):
         elif channel == 'audio_language':
             self.on_audio_language(language_key=data.decode('utf-8'))
         elif channel == 'audio_intent':
-            detection_result = DetectionResult()
-            detection_result.ParseFromString(data)
-            self.on_audio_intent(detection_result=detection_result)
+            self.on_audio_intent(detection_result=DetectedIntent(data))
         elif channel == 'audio_newfile':
             audio_file = strftime(self.time_format) + '.wav'
             with open(audio_file, 'wb') as wav:
                 wav.write(data)
             self.on_new_audio_file(audio_file=audio_file)
+        elif channel == 'robot_audio_loaded':
+            self.on_audio_loaded(identifier=int(data.decode('utf-8')))
         elif channel == 'picture_newfile':
             picture_file = strftime(self.time_format) + '.jpg'
             with open(picture_file, 'wb') as jpg:
@@ -629,6 +743,15 @@ class AbstractSICConnector(object):
         else:
             print('Unknown channel: ' + channel)
 
+    def __profiled_listen(self, message) -> None:
+        raw_channel = message['channel'].decode('utf-8')
+        with self.profiler.span('listen.' + raw_channel[raw_channel.index('_') + 1:]):
+            self.__listen(message)
+
+    def __profiled_send(self, channel: str, data) -> None:
+        with self.profiler.span('send.' + channel):
+            AbstractSICConnector.__send(self, channel, data)
+
     def __send(self, channel: str, data) -> None:
         pipe = self.redis.pipeline()
         target_type = self.__topic_map[channel]
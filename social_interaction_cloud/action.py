@@ -1,7 +1,8 @@
 from functools import partial
-from threading import Condition, Event
+from threading import Event
 
 from social_interaction_cloud.basic_connector import BasicSICConnector
+from social_interaction_cloud.profiling import NO_PROFILER, Profiler
 
 
 class Action:
@@ -12,7 +13,8 @@ class Action:
     a threading.Event() object should be provided as lock.
     """
 
-    def __init__(self, action: callable, *args, callback: callable = None, lock: Event = None):
+    def __init__(self, action: callable, *args, callback: callable = None, lock: Event = None,
+                 profiler: Profiler = None):
         """
 
         :param action: a callable from the BasicSICConnector
@@ -20,18 +22,24 @@ class Action:
         :param callback: optional callback function that will be triggered when the result
         of the BasicSICConnector action becomes available
         :param lock: optional lock to create a waiting Action.
+        :param profiler: optional profiler, performing the action is a span 'action.<name of the callable>'
         """
         self.action = action
         self.callback = callback
         self.lock = lock
         self.args = args
+        self.profiler = profiler if profiler else NO_PROFILER
 
     def perform(self) -> Event:
         """
         Calls the action callable.
         :return: the lock
         """
-        self.action(*self.args, callback=self.callback)
+        if self.profiler.enabled:
+            with self.profiler.span('action.' + self.action.__name__):
+                self.action(*self.args, callback=self.callback)
+        else:
+            self.action(*self.args, callback=self.callback)
         return self.lock
 
 
@@ -58,7 +66,7 @@ class ActionFactory:
         :return:
         """
         action = getattr(self.sic, action_name)
-        return Action(action, *args, callback=callback, lock=lock)
+        return Action(action, *args, callback=callback, lock=lock, profiler=getattr(self.sic, 'profiler', None))
 
     def build_waiting_action(self, action_name: str, *args, additional_callback: callable = None) -> Action:
         """
@@ -189,6 +197,8 @@ class ActionRunner:
         :param sic: a BasicSICConnector object
         """
         self.cbsr = sic
+        self.clock = sic.clock
+        self.profiler = getattr(sic, 'profiler', NO_PROFILER)
         self.action_factory = ActionFactory(sic)
         self.loaded_actions = []
 
@@ -264,12 +274,11 @@ class ActionRunner:
                 locks.append(lock)
         print(locks)
         if locks:
-            condition = Condition()
-            self.cbsr.subscribe_condition(condition)
-            with condition:
-                condition.wait_for(lambda: all([_lock.is_set() for _lock in locks]))
-            self.cbsr.unsubscribe_condition(condition)
-        print("clear:" + clear)
+            # waiting for every lock in turn is waiting until all are set, and goes through the clock
+            with self.profiler.span('wait.loaded_actions'):
+                for lock in locks:
+                    self.clock.wait(lock)
+        print("clear:" + str(clear))
         if clear:
             self.clear()
         else:
@@ -301,7 +310,22 @@ class ActionRunner:
         """
         action = self.action_factory.build_waiting_action(action_name, *args, additional_callback=additional_callback)
         lock = action.perform()
-        lock.wait()
+        self.wait(lock, action_name)
+
+    def wait(self, lock: Event, *names: str, timeout: float = None) -> bool:
+        """
+        Waits through the clock until the lock is set. With an enabled profiler, the wait is a span
+        'wait.<names joined by _or_>'.
+
+        :param lock: lock of a waiting Action or listener
+        :param names: what is waited for, e.g. the name of the action
+        :param timeout: maximum number of seconds to wait. None waits until the lock is set.
+        :return: True if the lock was set, False if the timeout expired
+        """
+        if not self.profiler.enabled:
+            return self.clock.wait(lock, timeout)
+        with self.profiler.span('wait.' + '_or_'.join(names)):
+            return self.clock.wait(lock, timeout)
 
     def run_vision_listener(self, vision_type: str, callback: callable = None, continuous: bool = False) -> None:
         """
@@ -318,7 +342,7 @@ class ActionRunner:
         action = self.action_factory.build_vision_listener(vision_type, callback, continuous)
         lock = action.perform()
         if lock:
-            lock.wait()
+            self.wait(lock, vision_type)
 
     def run_touch_listener(self, touch_event: str, callback: callable = None, continuous: bool = False) -> None:
         """
@@ -332,4 +356,43 @@ class ActionRunner:
         action = self.action_factory.build_touch_listener(touch_event, callback, continuous)
         lock = action.perform()
         if lock:
-            lock.wait()
+            self.wait(lock, touch_event)
+
+    def wait_for_first(self, touch_events: dict, tablet_answers: dict = None, timeout: float = None):
+        """
+        Blocks until the first of several inputs arrives, without polling.
+
+        Example: wait_for_first({'feet': ['LeftBumperPressed', 'RightBumperPressed'], 'head': ['MiddleTactilTouched']},
+        timeout=30) returns 'feet' or 'head', depending on what was pressed first, or None after 30 seconds.
+
+        :param touch_events: maps a label to the touch events that select it.
+        :param tablet_answers: optional map from a tablet button answer (see on_tablet_answer) to a label.
+        :param timeout: maximum number of seconds to wait. None waits until one of the inputs arrives.
+        :return: the label of the first input, or None when the timeout expired.
+        """
+        lock = Event()
+        first = []
+
+        def select(label: str) -> None:
+            if not lock.is_set():
+                first.append(label)
+                lock.set()
+
+        for label, events in touch_events.items():
+            for touch_event in events:
+                self.cbsr.subscribe_touch_listener(touch_event, partial(select, label))
+        if tablet_answers:
+            def tablet_callback(answer: str) -> None:
+                if answer in tablet_answers:
+                    select(tablet_answers[answer])
+            self.cbsr.subscribe_tablet_listener(tablet_callback)
+
+        self.wait(lock, *touch_events, timeout=timeout)
+
+        for events in touch_events.values():
+            for touch_event in events:
+                self.cbsr.unsubscribe_touch_listener(touch_event)
+        if tablet_answers:
+            self.cbsr.unsubscribe_tablet_listener()
+
+        return first[0] if first else None
@@ -2,10 +2,11 @@ from enum import Enum
 from functools import partial
 from queue import Queue
 from threading import Condition, Event, Thread
-from time import sleep
 
-from social_interaction_cloud.abstract_connector import AbstractSICConnector
-from .detection_result_pb2 import DetectionResult
+from social_interaction_cloud.abstract_connector import AbstractSICConnector, SICTransport
+from .clock import Clock, SystemClock
+from .detected_intent import DetectedIntent
+from .profiling import Profiler
 
 
 class RobotPosture(Enum):
@@ -31,14 +32,23 @@ class BasicSICConnector(AbstractSICConnector):
     """
 
     def __init__(self, server_ip: str, dialogflow_language: str = None,
-                 dialogflow_key_file: str = None, dialogflow_agent_id: str = None):
+                 dialogflow_key_file: str = None, dialogflow_agent_id: str = None,
+                 transport: SICTransport = None, devices: dict = None, clock: Clock = None,
+                 profiler: Profiler = None):
         """
         :param server_ip: IP address of Social Interaction Cloud server
         :param dialogflow_language: the full language key to use in Dialogflow (e.g. en-US)
         :param dialogflow_key_file: path to Google's Dialogflow key file (JSON)
         :param dialogflow_agent_id: ID number of Dialogflow agent to be used (project ID)
+        :param transport: optional transport shared with other connectors (see AbstractSICConnector)
+        :param devices: devices to use with a shared transport (see AbstractSICConnector)
+        :param clock: optional clock used for all waiting, e.g. a SimulatedClock in tests; the system clock by default
+        :param profiler: optional profiler (see profiling.py), also used by the ActionRunner and the lesson
         """
-        super(BasicSICConnector, self).__init__(server_ip=server_ip)
+        self.clock = clock if clock else SystemClock()
+
+        super(BasicSICConnector, self).__init__(server_ip=server_ip, transport=transport, devices=devices,
+                                                profiler=profiler)
 
         self.robot_state = {'posture': RobotPosture.UNKNOWN,
                             'is_awake': False,
@@ -49,7 +59,7 @@ class BasicSICConnector(AbstractSICConnector):
 
         if dialogflow_language and dialogflow_key_file and dialogflow_agent_id:
             self.enable_service('intent_detection')
-            sleep(1)  # give the service some time to load
+            self.clock.sleep(1)  # give the service some time to load
             self.set_dialogflow_language(dialogflow_language)
             self.set_dialogflow_key(dialogflow_key_file)
             self.set_dialogflow_agent(dialogflow_agent_id)
@@ -58,6 +68,8 @@ class BasicSICConnector(AbstractSICConnector):
         self.__conditions = []
         self.__vision_listeners = {}
         self.__touch_listeners = {}
+        # kept apart from the vision listeners, which decide whether the camera is needed
+        self.__tablet_listener = None
 
     ###########################
     # Event handlers          #
@@ -74,12 +86,15 @@ class BasicSICConnector(AbstractSICConnector):
     def on_audio_language(self, language_key: str) -> None:
         self.__notify_listeners('onAudioLanguage', language_key)
 
-    def on_audio_intent(self, detection_result: DetectionResult) -> None:
+    def on_audio_intent(self, detection_result: DetectedIntent) -> None:
         self.__notify_listeners('onAudioIntent', detection_result)
 
     def on_new_audio_file(self, audio_file: str) -> None:
         self.__notify_listeners('onNewAudioFile', audio_file)
 
+    def on_audio_loaded(self, identifier: int) -> None:
+        self.__notify_listeners('onAudioLoaded', identifier)
+
     def on_new_picture_file(self, picture_file: str) -> None:
         if not self.__vision_listeners:
             self.stop_looking()
@@ -117,7 +132,9 @@ class BasicSICConnector(AbstractSICConnector):
         self.__notify_listeners('onTabletConnection')
 
     def on_tablet_answer(self, answer: str) -> None:
-        self.__notify_vision_listeners('onTabletAnswer', answer)
+        if self.__tablet_listener:
+            self.__tablet_listener(answer)
+            self.__notify_conditions()
 
     ###########################
     # Speech Recognition      #
@@ -157,13 +174,13 @@ class BasicSICConnector(AbstractSICConnector):
         self.stop_listening()
         self.set_dialogflow_context(context)
         self.start_listening(max_duration)
-        lock.wait()
+        self.clock.wait(lock)
 
     def __recording(self, lock: Event, max_duration: int) -> None:
         self.stop_listening()
         self.set_record_audio(True)
         self.start_listening(max_duration)
-        lock.wait()
+        self.clock.wait(lock)
         self.set_record_audio(False)
 
     @staticmethod
@@ -278,12 +295,34 @@ class BasicSICConnector(AbstractSICConnector):
 
     def unsubscribe_touch_listener(self, touch_event: str) -> None:
         """
-        Unsubscribe touch listener.
+        Unsubscribe touch listener. Does nothing if no listener is subscribed to the touch_event.
 
         :param touch_event:
         :return:
         """
-        del self.__touch_listeners[touch_event]
+        self.__touch_listeners.pop(touch_event, None)
+
+    ###########################
+    # Tablet                  #
+    ###########################
+
+    def subscribe_tablet_listener(self, callback: callable) -> None:
+        """
+        Subscribe a tablet listener. The callback function will be called with the answer each time a button has been
+        pressed on the tablet display.
+
+        :param callback:
+        :return:
+        """
+        self.__tablet_listener = callback
+
+    def unsubscribe_tablet_listener(self) -> None:
+        """
+        Unsubscribe tablet listener. Does nothing if no listener is subscribed.
+
+        :return:
+        """
+        self.__tablet_listener = None
 
     ###########################
     # Robot actions           #
@@ -324,6 +363,21 @@ class BasicSICConnector(AbstractSICConnector):
             self.__register_listener('PlayAudioDone', callback)
         super(BasicSICConnector, self).play_audio(audio_file)
 
+    def load_audio(self, audio_file: str, callback: callable = None) -> None:
+        if callback:
+            self.__register_listener('onAudioLoaded', callback)
+        super(BasicSICConnector, self).load_audio(audio_file)
+
+    def play_loaded_audio(self, identifier: int, callback: callable = None) -> None:
+        if callback:
+            self.__register_listener('PlayAudioDone', callback)
+        super(BasicSICConnector, self).play_loaded_audio(identifier)
+
+    def clear_loaded_audio(self, callback: callable = None) -> None:
+        if callback:
+            self.__register_listener('ClearLoadedAudioDone', callback)
+        super(BasicSICConnector, self).clear_loaded_audio()
+
     def set_eye_color(self, color: str, callback: callable = None) -> None:
         if callback:
             self.__register_listener('EyeColourDone', callback)
@@ -434,6 +488,16 @@ class BasicSICConnector(AbstractSICConnector):
         if condition in self.__conditions:
             self.__conditions.remove(condition)
 
+    def subscribe_event_listener(self, event: str, callback: callable) -> None:
+        """
+        Subscribe a callback that is called once, the next time the event (e.g. 'TextStarted') becomes available.
+
+        :param event: name of the event
+        :param callback: callback function, called with the arguments of the event
+        :return:
+        """
+        self.__register_listener(event, callback)
+
     def __notify_conditions(self) -> None:
         for condition in self.__conditions:
             with condition:
@@ -491,3 +555,4 @@ class BasicSICConnector(AbstractSICConnector):
         self.__conditions = []
         self.__vision_listeners = {}
         self.__touch_listeners = {}
+        self.__tablet_listener = None
@@ -0,0 +1,87 @@
+import time
+from abc import ABC, abstractmethod
+from threading import Event, Lock
+
+
+class Clock(ABC):
+    """
+    Source of time for the connector, the ActionRunner and the lesson.
+
+    All waiting goes through the clock, so a simulated clock can make it instant.
+    """
+
+    @abstractmethod
+    def time(self) -> float:
+        """:return: the current time in seconds"""
+
+    @abstractmethod
+    def sleep(self, seconds: float) -> None:
+        """Wait for the given number of seconds."""
+
+    @abstractmethod
+    def wait(self, event: Event, timeout: float = None) -> bool:
+        """
+        Wait until the event is set.
+
+        :param event: threading.Event() to wait for
+        :param timeout: maximum number of seconds to wait, None to wait until the event is set
+        :return: True if the event was set, False if the timeout expired
+        """
+
+
+class SystemClock(Clock):
+    """The real time of the system."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def wait(self, event: Event, timeout: float = None) -> bool:
+        return event.wait(timeout)
+
+
+class SimulatedClock(Clock):
+    """
+    A clock that only moves when it is told to. sleep() and waits that time out advance the clock immediately,
+    so a lesson of 20 minutes can run in milliseconds.
+
+    Before a wait blocks, the idle hooks are called: a simulated robot can use them to respond (and move the clock
+    forward by the time that takes) on the waiting thread itself. A wait without a timeout then still blocks until the
+    event is set. A wait with a timeout gives other threads patience (real) seconds to set the event; if that does not
+    happen, the whole timeout is added to the clock.
+    """
+
+    def __init__(self, start: float = 0.0, patience: float = 0.0):
+        """
+        :param start: time the clock starts at
+        :param patience: real seconds to wait for an event before a timeout is simulated
+        """
+        self.__now = start
+        self.__lock = Lock()
+        self.patience = patience
+        self.idle_hooks = []
+
+    def time(self) -> float:
+        return self.__now
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward."""
+        with self.__lock:
+            self.__now += seconds
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def wait(self, event: Event, timeout: float = None) -> bool:
+        for hook in self.idle_hooks:
+            if event.is_set():
+                break
+            hook()
+        if timeout is None:
+            return event.wait()
+        if event.wait(self.patience):
+            return True
+        self.advance(timeout)
+        return False
@@ -0,0 +1,82 @@
+from google.protobuf.struct_pb2 import ListValue, Struct
+
+from .detection_result_pb2 import DetectionResult
+
+
+def to_native(value):
+    """
+    Convert a google.protobuf Value, Struct or ListValue into the equivalent native Python value.
+
+    :param value: Value, Struct or ListValue message
+    :return: None, bool, float, str, dict or list
+    """
+    if isinstance(value, Struct):
+        return {key: to_native(item) for key, item in value.fields.items()}
+    if isinstance(value, ListValue):
+        return [to_native(item) for item in value.values]
+
+    kind = value.WhichOneof('kind')
+    if kind == 'struct_value':
+        return to_native(value.struct_value)
+    elif kind == 'list_value':
+        return to_native(value.list_value)
+    elif kind == 'null_value' or kind is None:
+        return None
+    return getattr(value, kind)
+
+
+class DetectedIntent(object):
+    """
+    Lazily decoded DetectionResult as received on the audio_intent channel.
+
+    The protobuf is only parsed when one of the attributes is read for the first time, so an intent that nobody
+    listens to costs nothing. The parameters are converted once into native Python values (see to_native) and the
+    resulting dict is shared by every listener that receives this object, so listeners should not modify it.
+    """
+
+    __slots__ = ('__data', '__message', '__parameters')
+
+    def __init__(self, data: bytes):
+        """
+        :param data: serialized DetectionResult protobuf
+        """
+        self.__data = data
+        self.__message = None
+        self.__parameters = None
+
+    @property
+    def message(self) -> DetectionResult:
+        """The parsed DetectionResult protobuf."""
+        if self.__message is None:
+            message = DetectionResult()
+            message.ParseFromString(self.__data)
+            self.__message = message
+            self.__data = None
+        return self.__message
+
+    @property
+    def intent(self) -> str:
+        return self.message.intent
+
+    @property
+    def parameters(self) -> dict:
+        """Intent parameters as native Python values, e.g. {'number': 47.0} or {'name': [{'name': 'Sanne'}]}."""
+        if self.__parameters is None:
+            self.__parameters = {key: to_native(value) for key, value in self.message.parameters.items()}
+        return self.__parameters
+
+    @property
+    def confidence(self) -> int:
+        return self.message.confidence
+
+    @property
+    def text(self) -> str:
+        return self.message.text
+
+    @property
+    def source(self) -> str:
+        return self.message.source
+
+    def __repr__(self) -> str:
+        return 'DetectedIntent(intent=%r, parameters=%r, confidence=%r, text=%r)' % (
+            self.intent, self.parameters, self.confidence, self.text)
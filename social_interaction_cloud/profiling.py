@@ -0,0 +1,255 @@
+import cProfile
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import nullcontext
+from threading import Lock, local
+
+
+class Profiler(object):
+    """
+    Named spans around the parts of a lesson that take time: the handling of received messages ('listen.<topic>'),
+    publishing ('send.<topic>'), actions ('action.<name>'), waiting for the robot or the student ('wait.<name>') and
+    the explanation. The phases of the lesson (the introduction, every exercise and the conclusion) are the turns the
+    spans are counted in.
+
+    This profiler is off: a span is one shared empty context manager, and the connector does not wrap its handling of
+    messages at all (see enabled). AggregateProfiler and CaptureProfiler measure.
+    """
+
+    enabled = False
+
+    def span(self, name: str):
+        """
+        :param name: name of the part, e.g. 'action.say'
+        :return: context manager around the part
+        """
+        return _NO_SPAN
+
+    def phase(self, name: str):
+        """
+        :param name: name of the phase of the lesson, e.g. 'introduction' or 'exercise 3'
+        :return: context manager around the phase
+        """
+        return _NO_SPAN
+
+    def start(self) -> None:
+        """Called when the session starts."""
+        pass
+
+    def stop(self) -> None:
+        """Called when the session ends."""
+        pass
+
+    def report(self) -> dict:
+        return {}
+
+    def summary(self) -> list:
+        """:return: lines that tell where the time of every phase went"""
+        return []
+
+    def save(self, path: str) -> None:
+        """
+        Write the report.
+
+        :param path: path without extension, e.g. the directory and name of the student
+        """
+        pass
+
+
+_NO_SPAN = nullcontext()
+
+# the profiler that is used when none is given
+NO_PROFILER = Profiler()
+
+
+class AggregateProfiler(Profiler):
+    """
+    Adds up the time of every span: in total and per phase. The own time of a span is its time minus the time of the
+    spans inside it (on the same thread), so the own times of a phase add up to its wall time. The messages are
+    handled on the pubsub thread, so the listen spans are counted in the phase they happened in, but overlap with the
+    wall time of the phase.
+    """
+
+    enabled = True
+
+    def __init__(self, timer: callable = time.perf_counter):
+        """
+        :param timer: source of the time of the spans, e.g. the time of a SimulatedClock to see the simulated time
+        """
+        self.timer = timer
+        # per span name: [count, seconds, own seconds, longest]
+        self.spans = {}
+        self.phases = []
+        self.__phase = None
+        self.__lock = Lock()
+        self.__local = local()
+
+    def span(self, name: str):
+        return _Span(self, name)
+
+    def phase(self, name: str):
+        return _Phase(self, name)
+
+    def report(self) -> dict:
+        """
+        :return: count, seconds, own seconds and the longest time of every span, and per phase its wall time and the
+        count, seconds and own seconds of the spans in it ('other' is the time of the phase outside of any span)
+        """
+        with self.__lock:
+            return {
+                'spans': {name: {'count': count, 'seconds': round(seconds, 6), 'own_seconds': round(own, 6),
+                                 'longest': round(longest, 6)}
+                          for name, (count, seconds, own, longest) in self.spans.items()},
+                'phases': [{'name': phase['name'], 'seconds': round(phase['seconds'], 6),
+                            'spans': {name: {'count': count, 'seconds': round(seconds, 6),
+                                             'own_seconds': round(own, 6)}
+                                      for name, (count, seconds, own) in phase['spans'].items()}}
+                           for phase in self.phases],
+            }
+
+    def summary(self) -> list:
+        lines = []
+        for phase in self.report()['phases']:
+            spans = sorted(phase['spans'].items(), key=lambda item: -item[1]['own_seconds'])
+            lines.append('%s: %.2f s (%s)' % (phase['name'], phase['seconds'], ', '.join(
+                '%s %.2f s' % (name, span['own_seconds']) for name, span in spans if span['own_seconds'] >= 0.005)))
+        return lines
+
+    def save(self, path: str) -> None:
+        with open(path + '.profile.json', 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def _stack(self) -> list:
+        stack = getattr(self.__local, 'stack', None)
+        if stack is None:
+            stack = self.__local.stack = []
+        return stack
+
+    def _record(self, name: str, seconds: float, own: float) -> None:
+        with self.__lock:
+            total = self.spans.get(name)
+            if total is None:
+                self.spans[name] = [1, seconds, own, seconds]
+            else:
+                total[0] += 1
+                total[1] += seconds
+                total[2] += own
+                if seconds > total[3]:
+                    total[3] = seconds
+            if self.__phase is not None:
+                spans = self.__phase['spans']
+                if name in spans:
+                    spans[name][0] += 1
+                    spans[name][1] += seconds
+                    spans[name][2] += own
+                else:
+                    spans[name] = [1, seconds, own]
+
+    def _start_phase(self, name: str):
+        with self.__lock:
+            previous = self.__phase
+            self.__phase = {'name': name, 'seconds': 0.0, 'spans': {}}
+            self.phases.append(self.__phase)
+            return previous
+
+    def _end_phase(self, previous, seconds: float, own: float) -> None:
+        with self.__lock:
+            self.__phase['seconds'] = seconds
+            self.__phase['spans']['other'] = [1, own, own]
+            self.__phase = previous
+
+
+class CaptureProfiler(AggregateProfiler):
+    """
+    An AggregateProfiler that also runs cProfile and tracemalloc during one session (from start() to stop(), on the
+    thread of the lesson). Later sessions are only aggregated. save() writes the cProfile statistics to <path>.prof,
+    e.g. for snakeviz or pstats, and the functions that took the most time and the lines that allocated the most
+    memory are added to the report.
+    """
+
+    def __init__(self, timer: callable = time.perf_counter, top: int = 20):
+        """
+        :param timer: see AggregateProfiler
+        :param top: number of functions and allocations in the report
+        """
+        super(CaptureProfiler, self).__init__(timer)
+        self.top = top
+        self.captured = False
+        self.functions = []
+        self.allocations = []
+        self.__profile = None
+        self.__statistics = None
+
+    def start(self) -> None:
+        if self.captured or self.__profile is not None:
+            return
+        tracemalloc.start()
+        self.__profile = cProfile.Profile()
+        self.__profile.enable()
+
+    def stop(self) -> None:
+        if self.__profile is None:
+            return
+        self.__profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        self.captured = True
+
+        self.__statistics = pstats.Stats(self.__profile)
+        functions = sorted(self.__statistics.stats.items(), key=lambda item: -item[1][3])[:self.top]
+        self.functions = [{'function': '%s:%d(%s)' % function, 'calls': calls, 'own_seconds': round(own, 6),
+                           'cumulative_seconds': round(cumulative, 6)}
+                          for function, (_, calls, own, cumulative, _) in functions]
+        self.allocations = [{'line': str(statistic.traceback), 'bytes': statistic.size, 'blocks': statistic.count}
+                            for statistic in snapshot.statistics('lineno')[:self.top]]
+        self.__profile = None
+
+    def report(self) -> dict:
+        report = super(CaptureProfiler, self).report()
+        report.update(functions=self.functions, allocations=self.allocations)
+        return report
+
+    def save(self, path: str) -> None:
+        super(CaptureProfiler, self).save(path)
+        if self.captured:
+            self.__statistics.dump_stats(path + '.prof')
+
+
+class _Span(object):
+    __slots__ = ('profiler', 'name', 'start', 'inner')
+
+    def __init__(self, profiler: AggregateProfiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.inner = 0.0
+        self.start = self.profiler.timer()
+        return self
+
+    def __exit__(self, *exception) -> None:
+        seconds = self.profiler.timer() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].inner += seconds
+        self.profiler._record(self.name, seconds, seconds - self.inner)
+
+
+class _Phase(_Span):
+    __slots__ = ('previous',)
+
+    def __enter__(self):
+        self.previous = self.profiler._start_phase(self.name)
+        return super(_Phase, self).__enter__()
+
+    def __exit__(self, *exception) -> None:
+        seconds = self.profiler.timer() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].inner += seconds
+        self.profiler._end_phase(self.previous, seconds, seconds - self.inner)
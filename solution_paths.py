@@ -0,0 +1,107 @@
+from functools import lru_cache
+
+from code_exercise import lookup_step
+
+# Order in which actions are chosen for the usual path of a level: steps on the level, then smaller, then bigger ones
+PREFERENCE = ('on level', 'below', 'above')
+
+
+class SolutionGraph:
+    """
+    All valid ways to solve first_number - second_number at a level, as a small DAG.
+
+    A node is a state of the exercise, (current_first, current_second); an edge is a step that Exercise.acceptable_step
+    accepts in that state, with its action level (e.g. 'on level tens'). The rules come from code_exercise, so the graph
+    always agrees with the validation of the lesson. Every path from start to end (current_second 0) is a solution.
+    """
+
+    def __init__(self, first_number: int, second_number: int, level: int):
+        self.first_number = first_number
+        self.second_number = second_number
+        self.level = level
+        self.start = (first_number, second_number)
+        self.end = (first_number - second_number, 0)
+        # node -> {step: (action_level, next node)}
+        self.edges = {}
+
+        nodes = [self.start]
+        while nodes:
+            node = nodes.pop()
+            if node in self.edges:
+                continue
+            self.edges[node] = self.__steps(*node)
+            nodes.extend(next_node for _, next_node in self.edges[node].values())
+
+    def __steps(self, current_first: int, current_second: int) -> dict:
+        # the only steps the rules can accept: a ten, all tens, to the ten and all that is left
+        candidates = {10, current_second - current_second % 10, current_first % 10, current_second}
+        steps = {}
+        for step in sorted(candidates):
+            if step <= 0:
+                continue
+            acceptable, action_level, _ = lookup_step(current_first, current_second, self.second_number, step,
+                                                      self.level)
+            if acceptable:
+                steps[step] = (action_level, (current_first - step, current_second - step))
+        return steps
+
+    def steps(self, current_first: int, current_second: int) -> dict:
+        """
+        :return: the valid steps in this state, with their action level: {step: action_level}
+        """
+        return {step: action_level for step, (action_level, _) in self.edges.get((current_first, current_second),
+                                                                                   {}).items()}
+
+    def paths(self) -> list:
+        """
+        :return: every solution, as a list of (step, action_level)
+        """
+        def paths_from(node):
+            if node == self.end:
+                return [[]]
+            return [[(step, action_level)] + path for step, (action_level, next_node) in self.edges[node].items()
+                    for path in paths_from(next_node)]
+        return paths_from(self.start)
+
+    def count_paths(self) -> int:
+        counts = {self.end: 1}
+
+        def count(node):
+            if node not in counts:
+                counts[node] = sum(count(next_node) for _, next_node in self.edges[node].values())
+            return counts[node]
+        return count(self.start)
+
+    def usual_path(self) -> list:
+        """
+        :return: the path the robot explains: in every state the step that fits the level best (see PREFERENCE)
+        """
+        path = []
+        node = self.start
+        while node != self.end:
+            step, (action_level, node) = min(self.edges[node].items(),
+                                             key=lambda edge: PREFERENCE.index(edge[1][0].rsplit(' ', 1)[0]))
+            path.append((step, action_level))
+        return path
+
+    def actions(self, steps: list):
+        """
+        :param steps: steps a student took, from the start of the exercise
+        :return: the action level of every step, or None when the steps are not part of a solution
+        """
+        node = self.start
+        actions = []
+        for step in steps:
+            edge = self.edges[node].get(step)
+            if edge is None:
+                return None
+            action_level, node = edge
+            actions.append(action_level)
+        return actions
+
+
+# every exercise of the catalogue at every level is only 9072 graphs, so they are all kept
+@lru_cache(maxsize=None)
+def solution_graph(first_number: int, second_number: int, level: int) -> SolutionGraph:
+    """The SolutionGraph of an exercise, built once and then shared."""
+    return SolutionGraph(first_number, second_number, level)
@@ -0,0 +1,76 @@
+from threading import Event
+
+
+class SpeechStream:
+    """
+    Says a long text as separate utterances, e.g. the explanation of an exercise sentence by sentence.
+
+    The robot gets the next utterance while it is still saying the current one (depth utterances are sent ahead), so it
+    can prepare it and go on without a pause. Every utterance is a waiting action: the stream waits for its TextDone
+    (or GestureDone for a gesture) before it sends the one after the next. Because the text is split up, the robot can
+    start speaking after the first sentence is synthesized instead of the whole text, and the stream can be stopped
+    between sentences; utterances that were already sent are still said.
+    """
+
+    def __init__(self, action_runner, depth: int = 2):
+        """
+        :param action_runner: ActionRunner of the lesson
+        :param depth: number of utterances the robot has at most: the one it is saying and the ones after it
+        """
+        self.action_runner = action_runner
+        self.clock = action_runner.clock
+        self.depth = depth
+        self.__stopped = Event()
+        # start of the stream that is being said, None when no stream is being said
+        self.__start = None
+        self.__first_word = None
+        # one listener for all streams, which subscribes itself again every time the robot starts speaking
+        self.action_runner.cbsr.subscribe_event_listener('TextStarted', self.__on_text_started)
+
+    def stop(self) -> None:
+        """Send no more utterances of the text that is being said."""
+        self.__stopped.set()
+
+    def say(self, items, interrupt_events: list = None) -> dict:
+        """
+        Say the items one after the other and wait until they are done.
+
+        :param items: sentences to say, or (action_name, argument) tuples for other waiting actions, e.g.
+        ('do_gesture', 'animations/Stand/Gestures/Explain_1')
+        :param interrupt_events: touch events that stop the stream, e.g. HEAD
+        :return: the number of items that were done, whether the stream was stopped, the seconds until the robot
+        started speaking (None if the robot did not report it) and the seconds the whole stream took
+        """
+        actions = [('say', item) if isinstance(item, str) else tuple(item) for item in items]
+        sic = self.action_runner.cbsr
+        self.__stopped.clear()
+        self.__first_word = None
+        start = self.__start = self.clock.time()
+        for touch_event in interrupt_events or []:
+            sic.subscribe_touch_listener(touch_event, lambda *args: self.stop())
+
+        locks = []
+        done = 0
+        while True:
+            while len(locks) < len(actions) and len(locks) - done < self.depth and not self.__stopped.is_set():
+                action = self.action_runner.action_factory.build_waiting_action(*actions[len(locks)])
+                locks.append(action.perform())
+            if done == len(locks):
+                # everything was said, or the stream was stopped and what was sent is done
+                break
+            self.action_runner.wait(locks[done], actions[done][0])
+            done += 1
+
+        self.__start = None
+        for touch_event in interrupt_events or []:
+            sic.unsubscribe_touch_listener(touch_event)
+
+        return {'done': done, 'stopped': done < len(actions), 'first_word': self.__first_word,
+                'seconds': round(self.clock.time() - start, 3)}
+
+    def __on_text_started(self, *args) -> None:
+        start = self.__start
+        if start is not None and self.__first_word is None:
+            self.__first_word = round(self.clock.time() - start, 3)
+        self.action_runner.cbsr.subscribe_event_listener('TextStarted', self.__on_text_started)
+
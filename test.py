@@ -1,6 +1,6 @@
 from social_interaction_cloud.action import ActionRunner
 from social_interaction_cloud.basic_connector import BasicSICConnector
-from social_interaction_cloud.detection_result_pb2 import DetectionResult
+from social_interaction_cloud.detected_intent import DetectedIntent
 
 
 class Example:
@@ -38,10 +38,10 @@ class Example:
 #        self.action_runner.run_waiting_action('rest')
         self.sic.stop()
 
-    def on_intent(self, detection_result: DetectionResult) -> None:
+    def on_intent(self, detection_result: DetectedIntent) -> None:
         print(detection_result.intent, detection_result.parameters)
         if detection_result and detection_result.intent == 'time_intent' and len(detection_result.parameters) > 0:
-            self.user_model['time'] = detection_result.parameters['time'].struct_value['time']
+            self.user_model['time'] = detection_result.parameters['time']['time']
             self.recognition_manager['attempt_success'] = True
         else:
             self.recognition_manager['attempt_number'] += 1
@@ -0,0 +1,101 @@
+import string
+from itertools import product
+
+
+class Template:
+    """
+    A sentence with slots for numbers and names, e.g. 'Wat is {previous_first} min {step}?'.
+
+    The text is parsed once, into a %-format pattern and the names of its slots, so rendering is a single format call.
+    With cache, every rendered text is kept per combination of slot values.
+    """
+
+    def __init__(self, template_id: str, text: str, cache: bool = False):
+        """
+        :param template_id: name of the template in the registry
+        :param text: the sentence, with slots in str.format style ({name}, without format specs)
+        :param cache: whether to keep the rendered texts
+        """
+        self.id = template_id
+        self.text = text
+        pattern = []
+        slots = []
+        for literal, slot, format_spec, conversion in string.Formatter().parse(text):
+            pattern.append(literal.replace('%', '%%'))
+            if slot is not None:
+                if format_spec or conversion or not slot.isidentifier():
+                    raise ValueError('Only plain slots like {name} are supported: ' + text)
+                pattern.append('%s')
+                slots.append(slot)
+        self.pattern = ''.join(pattern)
+        self.slots = tuple(slots)
+        self.cache = {} if cache else None
+
+    def render(self, values: dict) -> str:
+        """
+        :param values: value of every slot, other keys are ignored
+        :return: the sentence with the values filled in
+        """
+        arguments = tuple([values[slot] for slot in self.slots])
+        if self.cache is None:
+            return self.pattern % arguments
+        text = self.cache.get(arguments)
+        if text is None:
+            text = self.cache[arguments] = self.pattern % arguments
+        return text
+
+    def expand(self, **domains):
+        """
+        All sentences the template can give, e.g. to pre-render their audio.
+
+        :param domains: the possible values of every slot, e.g. given=range(100)
+        :return: generator of (values, sentence)
+        """
+        for combination in product(*(domains[slot] for slot in self.slots)):
+            values = dict(zip(self.slots, combination))
+            yield values, self.render(values)
+
+
+class TemplateRegistry:
+    """
+    All templates of the lesson, by id. A text that is registered under several ids (e.g. the same question in
+    several levels) is compiled only once.
+    """
+
+    def __init__(self):
+        self.templates = {}
+        self.__by_text = {}
+
+    def register(self, template_id: str, text: str, cache: bool = False) -> Template:
+        template = self.__by_text.get(text)
+        if template is None:
+            template = self.__by_text[text] = Template(template_id, text, cache)
+        elif cache and template.cache is None:
+            template.cache = {}
+        self.templates[template_id] = template
+        return template
+
+    def get(self, template_id: str) -> Template:
+        return self.templates[template_id]
+
+    def compile(self, text: str) -> Template:
+        """
+        :return: the template of a text, registered with a generated id if it was not registered yet
+        """
+        template = self.__by_text.get(text)
+        if template is None:
+            template = self.register('template_%d' % len(self.__by_text), text)
+        return template
+
+    def render(self, template_id: str, values: dict) -> str:
+        return self.templates[template_id].render(values)
+
+    def catalogue(self) -> dict:
+        """
+        :return: the text and the slots of every template, by id
+        """
+        return {template_id: {'text': template.text, 'slots': template.slots}
+                for template_id, template in self.templates.items()}
+
+
+TEMPLATES = TemplateRegistry()